@@ -1,12 +1,126 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-import shutil
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse, Response, FileResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import asyncio
+import json
+import logging
+import queue
 import os
-import tempfile
-from services.analyzer import analyze_video
+import threading
+import time
+
+_import_started = time.perf_counter()
+from services.analyzer import analyze_video, get_stats, get_cache_namespace, warm_up
+from services.profiling import ProfilerBusy
+from services.config import CONFIG
+from services.workers import AnalysisPool
+from services.replicas import ReplicaPool
+from services.jobs import JobStore, TERMINAL_STATUSES
+from services.result_cache import ResultCache
+from services.ingest import UploadTooLarge, choose_spool_dir, spool_chunks, iter_upload_file
+from services import metrics
 
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+logger.info(f"Imported analysis services in {(time.perf_counter() - _import_started) * 1000:.1f}ms")
+
+# Bounded pool so blocking decode + inference never runs on the event loop
+if CONFIG['worker_kind'] == 'replicas':
+    analysis_pool = ReplicaPool(
+        replicas=CONFIG['worker_count'],
+        max_queue=CONFIG['worker_queue_size'],
+        threads_per_replica=CONFIG['replica_threads'],
+        initializer=warm_up if CONFIG['preload_model'] else None,
+    )
+else:
+    analysis_pool = AnalysisPool(
+        max_workers=CONFIG['worker_count'],
+        max_queue=CONFIG['worker_queue_size'],
+        kind=CONFIG['worker_kind'],
+        initializer=warm_up if CONFIG['preload_model'] else None,
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load and warm up the model before accepting traffic, so the first
+    # request doesn't pay for it. Process workers warm up in their initializer.
+    if CONFIG['preload_model']:
+        if analysis_pool.kind == 'thread':
+            await run_in_threadpool(warm_up)
+        else:
+            await run_in_threadpool(analysis_pool.prestart)
+    if result_cache is not None:
+        # Hashes the weights file once, off the event loop
+        await run_in_threadpool(get_cache_namespace)
+    yield
+
+app = FastAPI(lifespan=lifespan)
+
+# Repeated uploads of the same clip are answered from here
+result_cache = None
+if CONFIG['result_cache_enabled']:
+    result_cache = ResultCache(
+        max_entries=CONFIG['result_cache_size'],
+        disk_dir=CONFIG['result_cache_dir'],
+        max_disk_entries=CONFIG['result_cache_disk_size'],
+    )
+
+# Background jobs share the same pool, so they count against the same limits
+job_store = JobStore(
+    analysis_pool,
+    analyze_video,
+    max_pending=CONFIG['job_backlog_size'],
+    retention_seconds=CONFIG['job_retention_seconds'],
+)
+
+# Worker and job backlog gauges are read at scrape time
+metrics.bind_pool(analysis_pool, job_store)
+
+# One profiled analysis at a time: torch.profiler is process-wide
+_profile_slot = threading.Lock()
+
+MAX_UPLOAD_BYTES = CONFIG['upload_max_mb'] * 1024 * 1024
+MEMORY_SPOOL_BYTES = CONFIG['upload_memory_threshold_mb'] * 1024 * 1024
+MAX_JOB_UPLOAD_BYTES = MAX_UPLOAD_BYTES * CONFIG['job_max_files']
+
+def _upload_limit(request: Request):
+    # Largest body a request may send, or None for routes without uploads
+    if request.method != "POST":
+        return None
+    if request.url.path.startswith("/analyze"):
+        return MAX_UPLOAD_BYTES
+    if request.url.path.rstrip("/") == "/jobs":
+        return MAX_JOB_UPLOAD_BYTES
+    return None
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Reject oversized uploads from the headers alone,
+    # before the body is read or parsed
+    limit = _upload_limit(request)
+    if limit is not None:
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": str(UploadTooLarge(limit))},
+            )
+    return await call_next(request)
+
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    response = await call_next(request)
+    # Label by route template (/jobs/{job_id}), not the raw path
+    route = request.scope.get("route")
+    metrics.HTTP_REQUESTS.labels(
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=str(response.status_code),
+    ).inc()
+    return response
 
 # Configure CORS
 origins = [
@@ -31,36 +145,273 @@ def read_root():
 def health_check():
     return {"status": "healthy"}
 
-@app.post("/analyze/")
-async def analyze_endpoint(file: UploadFile = File(...)):
-    # Validate file type
-    if not file.content_type.startswith('video/'):
-        raise HTTPException(status_code=400, detail="File must be a video.")
+@app.get("/stats")
+def stats():
+    stats = get_stats()
+    stats['workers'] = analysis_pool.stats()
+    stats['jobs'] = job_store.stats()
+    if result_cache is not None:
+        stats['result_cache'] = result_cache.stats()
+    return stats
+
+@app.get("/metrics")
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, trace: bool = False):
+    """
+    Summary (or with ?trace=1 the Chrome trace) of a profiled analysis.
+    """
+    if not CONFIG['profiling_enabled']:
+        raise HTTPException(status_code=403, detail="Profiling is disabled on this server.")
+    if not profile_id.isalnum():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    suffix = ".trace.json" if trace else ".json"
+    path = os.path.join(CONFIG['profile_dir'], f"{profile_id}{suffix}")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=f"{profile_id}{suffix}")
+
+def _remove_file(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+def _validate_video(file: UploadFile):
+    if not file.content_type or not file.content_type.startswith('video/'):
+        raise HTTPException(status_code=400, detail=f"File must be a video: {file.filename}")
+
+async def _spool(chunks, filename, expected_size):
+    """
+    Spool upload chunks to a temporary file (tmpfs for small uploads).
+    Returns (path, sha256 hex digest of the content), hashed while copying.
+    """
+    spool_dir = choose_spool_dir(
+        expected_size,
+        MEMORY_SPOOL_BYTES,
+        memory_dir=CONFIG['upload_memory_dir'],
+        disk_dir=CONFIG['upload_spool_dir'],
+    )
+    try:
+        with metrics.timed('upload_save'):
+            temp_path, content_hash, _ = await spool_chunks(
+                chunks,
+                suffix=os.path.splitext(filename or '')[1],
+                max_bytes=MAX_UPLOAD_BYTES,
+                spool_dir=spool_dir,
+            )
+        return temp_path, content_hash
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save uploaded file: {str(e)}")
+
+async def _save_upload(file: UploadFile):
+    try:
+        return await _spool(iter_upload_file(file), file.filename, file.size)
+    finally:
+        await file.close()
+
+def _service_busy(detail):
+    return HTTPException(
+        status_code=503,
+        detail=detail,
+        headers={"Retry-After": str(analysis_pool.retry_after())},
+    )
+
+def _reserve_worker():
+    # Reject before touching the upload so a saturated server doesn't pile up temp files
+    if not analysis_pool.try_acquire():
+        raise _service_busy("Server is busy, please retry later.")
+
+def _profile_requested(request: Request, profile: bool):
+    """
+    Per-request profiling switch: ?profile=1 or an X-Voxear-Profile: 1 header.
+    Only honoured when VOXEAR_PROFILING_ENABLED is set, and for one request at
+    a time (409 while another profile runs). A granted request holds the
+    profile slot until `_run_analysis` finishes.
+    """
+    requested = profile or request.headers.get("x-voxear-profile", "").lower() in ("1", "true", "yes")
+    if requested and not CONFIG['profiling_enabled']:
+        raise HTTPException(status_code=403, detail="Profiling is disabled on this server.")
+    if requested and not _profile_slot.acquire(blocking=False):
+        raise _profiler_busy()
+    return requested
+
+def _profiler_busy():
+    return HTTPException(status_code=409, detail="Another analysis is being profiled, please retry later.")
 
-    # Create a temporary file to save the uploaded video
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_video:
-        try:
-            # Copy uploaded file content to temp file
-            shutil.copyfileobj(file.file, temp_video)
-            temp_path = temp_video.name
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to save uploaded file: {str(e)}")
-        finally:
-            file.file.close()
+async def _run_analysis(save, profile=False, fast=False):
+    """
+    Shared flow of the synchronous analyze endpoints.
 
+    A worker slot is reserved before `save()` spools the upload, cached results
+    are returned without running anything, and identical in-flight uploads
+    share one analysis. Profiled requests always run their own analysis.
+    `fast` requests a keyframe-only screen (cached separately).
+    """
     try:
-        # Run analysis
-        result = analyze_video(temp_path)
+        with metrics.timed('total'):
+            return await _analyze_upload(save, profile, fast)
+    finally:
+        if profile:
+            _profile_slot.release()
+
+async def _analyze_upload(save, profile, fast):
+    _reserve_worker()
+    temp_path = None
+    started = False
+
+    try:
+        # Save the uploaded video to a temporary file
+        temp_path, content_hash = await save()
+
+        if profile:
+            future, started = analysis_pool.submit(analyze_video, temp_path, profile=True, fast=fast), True
+        elif result_cache is None:
+            future, started = analysis_pool.submit(analyze_video, temp_path, fast=fast), True
+        else:
+            namespace = await run_in_threadpool(get_cache_namespace)
+            cache_key = f"{content_hash}-{namespace}{'-fast' if fast else ''}"
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                metrics.ANALYSES.labels(outcome="cached").inc()
+                return cached
+
+            # Identical uploads already being analysed share that analysis
+            future, started = result_cache.coalesce(
+                cache_key, lambda: analysis_pool.submit(analyze_video, temp_path, fast=fast)
+            )
+    finally:
+        if not started:
+            analysis_pool.release()
+            _remove_file(temp_path)
+
+    # The worker owns the temp file from here on, even if the client disconnects
+    future.add_done_callback(lambda _: _remove_file(temp_path))
+
+    try:
+        result = await asyncio.wrap_future(future)
         
         if result.get("status") == "failed":
              raise HTTPException(status_code=500, detail=result.get("error", "Analysis failed"))
              
         return result
         
+    except HTTPException:
+        raise
+    except ProfilerBusy:
+        # A profile outlived its disconnected client and is still running
+        raise _profiler_busy()
     except Exception as e:
          raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        # Clean up: remove the temporary file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
 
+@app.post("/analyze/")
+async def analyze_endpoint(request: Request, file: UploadFile = File(...), profile: bool = False, fast: bool = False):
+    # Validate file type
+    _validate_video(file)
+    profile = _profile_requested(request, profile)
+
+    return await _run_analysis(lambda: _save_upload(file), profile, fast)
+
+@app.post("/analyze/stream")
+async def analyze_stream_endpoint(request: Request, filename: Optional[str] = None, profile: bool = False,
+                                  fast: bool = False):
+    """
+    Analyze a video sent as the raw request body (Content-Type: video/*).
+
+    The body is spooled straight from the socket, skipping the multipart
+    parser's own temporary file, and the size cap is enforced while the bytes
+    are still arriving.
+    """
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith('video/'):
+        raise HTTPException(status_code=400, detail="File must be a video.")
+    profile = _profile_requested(request, profile)
+
+    content_length = request.headers.get("content-length")
+    expected_size = int(content_length) if content_length and content_length.isdigit() else None
+    if filename is None:
+        filename = "upload." + content_type.split("/", 1)[1].split(";")[0]
+
+    return await _run_analysis(lambda: _spool(request.stream(), filename, expected_size), profile, fast)
+
+@app.post("/jobs")
+async def create_jobs(files: List[UploadFile] = File(...)):
+    """
+    Queue one or more videos for analysis and return their job ids immediately.
+    """
+    if len(files) > CONFIG['job_max_files']:
+        raise HTTPException(status_code=413, detail=f"At most {CONFIG['job_max_files']} videos per request.")
+    for file in files:
+        _validate_video(file)
+
+    if job_store.free_slots() < len(files):
+        raise _service_busy("Job backlog is full, please retry later.")
+
+    # Spool every upload before queueing any, so a failing file (too large,
+    # unreadable) never leaves earlier jobs running without their ids
+    spooled = []
+    try:
+        for file in files:
+            temp_path, _ = await _save_upload(file)
+            spooled.append((file.filename, temp_path))
+        created = job_store.create_many(spooled)
+    except queue.Full:
+        for _, temp_path in spooled:
+            _remove_file(temp_path)
+        raise _service_busy("Job backlog is full, please retry later.")
+    except BaseException:
+        for _, temp_path in spooled:
+            _remove_file(temp_path)
+        raise
+
+    jobs = [{"id": job.id, "filename": job.filename, "status": job.status} for job in created]
+    return {"jobs": jobs}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job, _ = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Server-Sent Events stream of job snapshots, one event per change.
+    The stream ends after the job completes or fails.
+    """
+    if job_store.get(job_id)[0] is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    async def event_stream():
+        last_version = None
+        idle = 0.0
+        while True:
+            job, version = job_store.get(job_id)
+            if job is None:
+                yield "event: error\ndata: {\"detail\": \"Job expired.\"}\n\n"
+                return
+
+            if version != last_version:
+                last_version = version
+                idle = 0.0
+                event = "result" if job["status"] in TERMINAL_STATUSES else "progress"
+                yield f"event: {event}\ndata: {json.dumps(job)}\n\n"
+                if event == "result":
+                    return
+            elif idle >= 15.0:
+                # Comment line keeps proxies from closing an idle connection
+                idle = 0.0
+                yield ": keep-alive\n\n"
+
+            await asyncio.sleep(0.5)
+            idle += 0.5
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
@@ -1,6 +1,7 @@
 
 import torch
 import torch.nn as nn
+from torch.nn.utils.rnn import pack_padded_sequence, pad_packed_sequence, pad_sequence
 from torchvision import models
 import os
 import logging
@@ -9,21 +10,65 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def classify_sequence(lstm, fc, features, lengths=None):
+    """
+    BiLSTM + classifier head over per-frame features (Batch, Seq_Len, 1280).
+    A standalone function so quantized copies of `lstm`/`fc` can reuse it.
+    """
+    if lengths is None:
+        # Process with LSTM
+        # output: (Batch, Seq, Num_Directions * Hidden_Size)
+        lstm_out, _ = lstm(features)
+
+        # Take the last time step's output
+        final_feature = lstm_out[:, -1, :]
+    else:
+        # Packing keeps the padded steps out of both LSTM directions, so each
+        # clip gets exactly the output it would get on its own
+        packed = pack_padded_sequence(features, lengths.cpu(), batch_first=True, enforce_sorted=False)
+        packed_out, _ = lstm(packed)
+        lstm_out, _ = pad_packed_sequence(packed_out, batch_first=True)
+
+        last_index = (lengths.to(lstm_out.device) - 1).view(-1, 1, 1).expand(-1, 1, lstm_out.size(2))
+        final_feature = lstm_out.gather(1, last_index).squeeze(1)
+
+    # Classification
+    return fc(final_feature)
+
 class DeepFakeDetector(nn.Module):
-    def __init__(self, weights_path: str = None):
+    def __init__(self, weights_path: str = None, hidden_size: int = 128, num_layers: int = 1,
+                 pretrained_backbone: bool = None):
+        """
+        Args:
+            weights_path: Optional state dict saved by train.py.
+            hidden_size: BiLSTM hidden size.
+            num_layers: BiLSTM layers.
+            pretrained_backbone: Initialise EfficientNet from ImageNet weights.
+                Defaults to True only when there is no weights file to load,
+                since a trained state dict overwrites the backbone anyway
+                (and fetching ImageNet weights needs network access).
+        """
         super(DeepFakeDetector, self).__init__()
+
+        if pretrained_backbone is None:
+            pretrained_backbone = not (weights_path and os.path.exists(weights_path))
+
+        # Architecture config, stored alongside the weights in model artifacts
+        self.config = {
+            'hidden_size': hidden_size,
+            'num_layers': num_layers,
+        }
         
         # 1. Spatial Feature Extractor: EfficientNet-B0
         # We use the pretrained model but remove the classifier head
-        original_model = models.efficientnet_b0(weights=models.EfficientNet_B0_Weights.DEFAULT)
+        backbone_weights = models.EfficientNet_B0_Weights.DEFAULT if pretrained_backbone else None
+        original_model = models.efficientnet_b0(weights=backbone_weights)
         self.cnn = nn.Sequential(*list(original_model.children())[:-1]) # Remove classifier, keeps AdaptiveAvgPool
         
         # EfficientNet-B0 outputs 1280 features
         cnn_out_features = 1280
         
         # 2. Temporal Analysis: BiLSTM
-        hidden_size = 128
-        num_layers = 1
         self.lstm = nn.LSTM(
             input_size=cnn_out_features,
             hidden_size=hidden_size,
@@ -43,7 +88,10 @@ class DeepFakeDetector(nn.Module):
         )
         
         # Load weights if provided
-        self._load_weights(weights_path)
+        # (weights_path=None means the caller fills the state dict itself,
+        # e.g. training from scratch or loading a model artifact)
+        if weights_path is not None:
+            self._load_weights(weights_path)
         
     def _load_weights(self, weights_path):
         if weights_path and os.path.exists(weights_path):
@@ -59,10 +107,62 @@ class DeepFakeDetector(nn.Module):
                  logger.warning(f"Weights file not found at {weights_path}")
              logger.warning("Using random initialization. Predictions will be random!")
 
-    def forward(self, x):
+    def extract_features(self, frames, chunk_size=None):
+        """
+        Args:
+            frames: Frame tensor of shape (N, Channels, Height, Width)
+            chunk_size: Run the CNN on at most this many frames at a time.
+                        Under no_grad only one chunk's activations are alive
+                        at once (only the (chunk, 1280) features are kept),
+                        so peak memory stops growing with N. None or 0
+                        runs all frames in one call.
+        Returns:
+            Tensor of shape (N, 1280)
+        """
+        if chunk_size and frames.size(0) > chunk_size:
+            return torch.cat([self.extract_features(chunk) for chunk in frames.split(chunk_size)])
+
+        # Output: (N, 1280, 1, 1) -> Squeeze -> (N, 1280)
+        features = self.cnn(frames)
+        return features.squeeze(-1).squeeze(-1)
+
+    def classify_features(self, features, lengths=None):
+        """
+        Args:
+            features: Tensor of shape (Batch, Seq_Len, 1280)
+            lengths: Optional sequence lengths when clips of different length
+                     are padded into one batch. None means every clip uses
+                     the full Seq_Len.
+        """
+        return classify_sequence(self.lstm, self.fc, features, lengths)
+
+    def forward_batch(self, clips, chunk_size=None):
+        """
+        Run several clips of possibly different length in one forward pass.
+
+        Frames of all clips are packed into a single CNN call (no padding frames
+        go through the backbone), then the features are padded and packed for
+        the BiLSTM.
+
+        Args:
+            clips: List of tensors of shape (Seq_Len_i, Channels, Height, Width)
+            chunk_size: CNN frames per call (see `extract_features`).
+        Returns:
+            Tensor of shape (len(clips), 1) with one probability per clip
+        """
+        lengths = torch.tensor([clip.size(0) for clip in clips], dtype=torch.long)
+        features = self.extract_features(torch.cat(clips, dim=0), chunk_size)
+        r_in = pad_sequence(list(features.split(lengths.tolist())), batch_first=True)
+
+        if bool((lengths == lengths[0]).all()):
+            return self.classify_features(r_in)
+        return self.classify_features(r_in, lengths)
+
+    def forward(self, x, chunk_size=None):
         """
         Args:
             x: Video tensor of shape (Batch, Seq_Len, Channels, Height, Width)
+            chunk_size: CNN frames per call (see `extract_features`).
         """
         batch_size, seq_len, c, h, w = x.shape
         
@@ -71,28 +171,10 @@ class DeepFakeDetector(nn.Module):
         c_in = x.view(batch_size * seq_len, c, h, w)
         
         # Extract features with CNN
-        # Output: (Batch * Seq, 1280, 1, 1) -> Squeeze -> (Batch * Seq, 1280)
-        c_out = self.cnn(c_in)
-        c_out = c_out.squeeze(-1).squeeze(-1)
+        c_out = self.extract_features(c_in, chunk_size)
         
         # Unfold to (Batch, Seq, Features) for LSTM
         r_in = c_out.view(batch_size, seq_len, -1)
         
-        # Process with LSTM
-        # output: (Batch, Seq, Num_Directions * Hidden_Size)
-        # hn: (Num_Layers * Num_Directions, Batch, Hidden_Size)
-        lstm_out, (hn, cn) = self.lstm(r_in)
-        
-        # We can use the last hidden state or pool the outputs. 
-        # Using the last output of the sequence (for both directions)
-        # However, a common strategy for video classification is global average pooling over time
-        # or just taking the last time step.
-        # Let's take the output of the last time step.
-        
-        # Take the last time step's output
-        final_feature = lstm_out[:, -1, :] 
-        
-        # Classification
-        probability = self.fc(final_feature)
-        
-        return probability
+        # Process with LSTM and classify on the last time step
+        return self.classify_features(r_in)
@@ -1,68 +1,378 @@
 
 import os
+import time
+import uuid
+import logging
+import threading
 import torch
 import torch.nn.functional as F
 from .ai_models import DeepFakeDetector
-from .preprocessing import process_video
+from .model_artifact import load_artifact
+from .backends import create_backend
+from .embedding_cache import EmbeddingCache
+from .preprocessing import process_video, iter_frame_chunks, plan_keyframes
+from .windowing import score_windows, suspicious_segments, aggregate_windows
+from .batching import BatchScheduler
+from .result_cache import file_fingerprint
+from .memory import PeakMemory
+from .config import CONFIG
+from . import metrics, profiling
+
+logger = logging.getLogger(__name__)
 
 # Global model instance for caching
 _model_instance = None
+_model_lock = threading.Lock()
+_model_load_timings = {}
+_backend_instance = None
+_embedding_cache = None
+if CONFIG['embedding_cache_enabled']:
+    _embedding_cache = EmbeddingCache(max_bytes=CONFIG['embedding_cache_mb'] * 1024 * 1024)
+_scheduler_instance = None
+_cache_namespace = None
+
+def _weights_dir():
+    # Path to weights - assuming a standard location relative to this file
+    # Service is in backend/services/, so weights in backend/weights/
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_dir, "weights")
+
+def _weights_path():
+    """
+    The file the model is loaded from: the packaged artifact when present,
+    otherwise the raw state dict saved by train.py.
+    """
+    artifact_path = CONFIG['model_artifact_path'] or os.path.join(_weights_dir(), "model.pt")
+    if os.path.exists(artifact_path):
+        return artifact_path
+    return os.path.join(_weights_dir(), "model.pth")
 
 def get_model():
     """
     Singleton pattern to load the model once.
     """
     global _model_instance
-    if _model_instance is None:
-        # Path to weights - assuming a standard location relative to this file
-        # Service is in backend/services/, so weights in backend/weights/
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        weights_path = os.path.join(base_dir, "weights", "model.pth")
-        
-        _model_instance = DeepFakeDetector(weights_path=weights_path)
-        
-        # Move to GPU if available
-        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        _model_instance.to(device)
-        _model_instance.eval() # Set to evaluation mode
-        
+    if _model_instance is not None:
+        return _model_instance
+
+    with _model_lock:
+        if _model_instance is None:
+            timings = {}
+            weights_path = _weights_path()
+
+            if weights_path.endswith(".pt"):
+                model = load_artifact(weights_path, timings=timings)
+            else:
+                # No ImageNet download: the state dict replaces the backbone anyway
+                started = time.perf_counter()
+                model = DeepFakeDetector(weights_path=weights_path, pretrained_backbone=False)
+                timings['construct_and_load'] = time.perf_counter() - started
+
+            # Move to GPU if available
+            started = time.perf_counter()
+            device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            model.to(device)
+            model.eval() # Set to evaluation mode
+            timings['to_device'] = time.perf_counter() - started
+
+            _model_load_timings.update(timings)
+            metrics.record_model_load(_model_load_timings)
+            _model_instance = model
+
     return _model_instance
 
-def analyze_video(video_path: str):
+def warm_up():
+    """
+    Load the model and run one dummy inference so the first real request pays
+    neither the load cost nor one-time allocator/kernel setup. Logs how long
+    each startup phase took.
+    """
+    get_backend()
+
+    started = time.perf_counter()
+    get_cache_namespace()
+    _model_load_timings['fingerprint'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    dummy = torch.zeros(CONFIG['warmup_frames'], 224, 224, 3, dtype=torch.uint8)
+    get_backend().run_batch([dummy])
+    _model_load_timings['warmup_inference'] = time.perf_counter() - started
+
+    metrics.record_model_load(_model_load_timings)
+    phases = ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in _model_load_timings.items())
+    logger.info(f"Model ready ({phases})")
+
+def get_cache_namespace():
+    """
+    Identifies the model that produced a result, for content-addressed caching.
+    Without a weights file every process gets a fresh namespace, since randomly
+    initialised predictions must never be reused.
+
+    Built from the config and files only (no model or backend is loaded), so
+    the API process can compute it while process workers hold the model.
+    """
+    global _cache_namespace
+    if _cache_namespace is None:
+        weights_path = _weights_path()
+        if os.path.exists(weights_path):
+            fingerprint = file_fingerprint(weights_path)
+        else:
+            fingerprint = f"untrained-{uuid.uuid4().hex[:16]}"
+        # Exported backends match eager only within tolerance, progressive
+        # mode may score a shorter prefix of the clip, face crops change what
+        # the model sees and adaptive sampling picks other frames
+        crop = "face" if CONFIG['face_crop_enabled'] else "full"
+        backend_name, backend_path = _resolve_backend()
+        if backend_path is not None:
+            # The export is what actually runs: a re-export or re-quantization
+            # of the same checkpoint must not reuse old scores
+            backend_name = f"{backend_name}.{file_fingerprint(backend_path)}"
+        _cache_namespace = (
+            f"{fingerprint}-{backend_name}-{CONFIG['analysis_mode']}-{crop}-{CONFIG['frame_policy']}"
+        )
+    return _cache_namespace
+
+def _backend_path(name):
+    configured = CONFIG[f'{name}_path']
+    extension = {'torchscript': 'ts', 'onnx': 'onnx', 'int8': 'int8.ts'}[name]
+    return configured or os.path.join(_weights_dir(), f"model.{extension}")
+
+def _resolve_backend():
+    """
+    (name, path) of the configured inference backend, or ('eager', None) when
+    its export is missing.
+    """
+    name = CONFIG['inference_backend']
+    if name == 'eager':
+        return name, None
+    path = _backend_path(name)
+    if not os.path.exists(path):
+        return 'eager', None
+    return name, path
+
+def get_backend():
+    """
+    Singleton inference backend (eager, TorchScript or ONNX Runtime) wrapping
+    the loaded model. Falls back to eager PyTorch if the export is missing.
+    """
+    global _backend_instance
+    if _backend_instance is not None:
+        return _backend_instance
+
+    model = get_model()
+    with _model_lock:
+        if _backend_instance is None:
+            name, path = _resolve_backend()
+            if name != CONFIG['inference_backend']:
+                logger.warning(f"No {CONFIG['inference_backend']} export at "
+                               f"{_backend_path(CONFIG['inference_backend'])}, falling back to eager PyTorch")
+
+            started = time.perf_counter()
+            _backend_instance = create_backend(name, model, path, chunk_size=CONFIG['cnn_chunk_frames'])
+            _model_load_timings[f'{name}_backend'] = time.perf_counter() - started
+            logger.info(f"Using {name} inference backend")
+
+    return _backend_instance
+
+def _run_batch(clips):
+    """
+    Run a list of preprocessed uint8 clips (Seq_Len_i, H, W, 3) through the
+    backend in a single forward pass and return one probability per clip.
+    Frames already in the embedding cache skip the CNN.
+    """
+    return get_backend().run_batch(clips, embedding_cache=_embedding_cache)
+
+def get_scheduler():
+    """
+    Singleton micro-batching scheduler shared by all concurrent analyses.
+    """
+    global _scheduler_instance
+    if _scheduler_instance is None:
+        _scheduler_instance = BatchScheduler(
+            _run_batch,
+            max_batch_size=CONFIG['batch_max_size'],
+            max_wait_ms=CONFIG['batch_max_wait_ms'],
+        )
+    return _scheduler_instance
+
+def get_stats():
+    """
+    Runtime statistics for the serving pipeline.
+    """
+    stats = {}
+    if _model_load_timings:
+        stats['model_load_ms'] = {name: round(seconds * 1000, 1) for name, seconds in _model_load_timings.items()}
+    if _backend_instance is not None:
+        stats['backend'] = _backend_instance.stats()
+    if _embedding_cache is not None:
+        stats['embedding_cache'] = _embedding_cache.stats()
+    if _scheduler_instance is not None:
+        stats['batching'] = _scheduler_instance.stats()
+    return stats
+
+def _report(progress, step_id, status):
+    if progress is not None:
+        progress(step_id, status)
+
+CONFIDENCE_LEVELS = ("low", "medium", "high")
+
+def _confidence(probability):
+    # If prob is 0.9, confidence is high. If 0.51, low.
+    dist_from_center = abs(probability - 0.5)
+    if dist_from_center > 0.35: # < 0.15 or > 0.85
+        return "high"
+    elif dist_from_center > 0.15: # < 0.35 or > 0.65
+        return "medium"
+    return "low"
+
+def _score_progressive(video_path, embedding_cache=None):
+    """
+    Score growing prefixes of the clip, one chunk of frames at a time, and
+    stop decoding as soon as the verdict reaches the exit confidence band.
+    Ambiguous videos still use every sampled frame.
+
+    Each chunk goes through the CNN once; only the (cheap) BiLSTM head is
+    re-run over the whole prefix. Returns (probability, frames_used, early_exit).
+    """
+    backend = get_backend()
+    exit_level = CONFIDENCE_LEVELS.index(CONFIG['progressive_exit_confidence'])
+    chunk_size = max(1, CONFIG['progressive_chunk_frames'])
+
+    features = []
+    frames_used = 0
+    probability = None
+    for chunk in iter_frame_chunks(video_path, chunk_size):
+        features.append(backend.embed_frames(chunk, embedding_cache))
+        frames_used += chunk.size(0)
+        prefix = torch.cat(features, dim=0).unsqueeze(0)
+        probability = backend.run_head(prefix).view(-1).item()
+
+        if (frames_used >= CONFIG['progressive_min_frames']
+                and CONFIDENCE_LEVELS.index(_confidence(probability)) >= exit_level):
+            # Leaving the loop closes the generator, which releases the video
+            return probability, frames_used, True
+
+    if probability is None:
+        raise ValueError("No frames could be extracted from the video.")
+    return probability, frames_used, False
+
+def analyze_video(video_path: str, progress=None, profile=False, fast=False):
     """
     Analyze a video using the DeepFakeDetector (EfficientNet + BiLSTM).
+
+    Args:
+        video_path: Path to the video file.
+        progress: Optional callable (step_id, status) invoked as each entry of
+                  the result's `steps` list starts and finishes.
+        profile: Run under torch.profiler and save a trace to the configured
+                 profile dir; the response gets a `profile` summary with its id.
+        fast: Fast screen: score the clip from keyframes only (see
+              `plan_keyframes`), in place of the configured analysis mode.
+              `inference.sampling` says whether keyframes were actually used.
     """
+    if not profile:
+        return _analyze_video(video_path, progress, fast=fast)
+
+    response, summary = profiling.run_profiled(
+        lambda: _analyze_video(video_path, progress, profile=True, fast=fast),
+        CONFIG['profile_dir'],
+    )
+    response["profile"] = {key: value for key, value in summary.items() if key != "top_operators"}
+    return response
+
+def _analyze_video(video_path, progress=None, profile=False, fast=False):
     try:
-        model = get_model()
-        device = next(model.parameters()).device
-        
-        # 1. Preprocess
-        # Returns tensor (1, Seq, C, H, W)
-        video_tensor = process_video(video_path)
-        video_tensor = video_tensor.to(device)
-        
-        # 2. Inference
-        with torch.no_grad():
-            probability_tensor = model(video_tensor)
-            probability = probability_tensor.item()
+        backend = get_backend()
+        mode = 'full' if fast else CONFIG['analysis_mode']
+        sampling = 'uniform'
+        early_exit = False
+        details = {}
+        # A profiled run measures this video alone: no shared batches, and
+        # every frame goes through the CNN
+        embedding_cache = None if profile else _embedding_cache
+
+        # Peak memory of decoding + inference, reported with the result
+        with PeakMemory() as peak:
+            if mode == 'progressive':
+                # Decoding and inference are interleaved, so latency_ms covers both
+                _report(progress, 1, "running")
+                _report(progress, 2, "skipped")
+                _report(progress, 3, "running")
+                started = time.perf_counter()
+                with profiling.stage("progressive_analysis"):
+                    probability, frames_used, early_exit = _score_progressive(video_path, embedding_cache)
+                inference_ms = (time.perf_counter() - started) * 1000
+                _report(progress, 1, "completed")
+            elif mode == 'windowed':
+                # The whole video, in overlapping windows streamed through the model
+                _report(progress, 1, "running")
+                _report(progress, 2, "skipped")
+                _report(progress, 3, "running")
+                started = time.perf_counter()
+                with profiling.stage("windowed_analysis"):
+                    windows, frames_used = score_windows(
+                        video_path, backend,
+                        window_seconds=CONFIG['window_seconds'],
+                        stride_seconds=CONFIG['window_stride_seconds'],
+                        batch_size=CONFIG['window_batch_size'],
+                        embedding_cache=embedding_cache,
+                    )
+                inference_ms = (time.perf_counter() - started) * 1000
+                _report(progress, 1, "completed")
+                probability = aggregate_windows(windows, CONFIG['window_aggregate'])
+                details["windows"] = windows
+                details["segments"] = suspicious_segments(windows, CONFIG['window_threshold'])
+            else:
+                # 1. Preprocess
+                # Returns uint8 tensor (1, Seq, H, W, 3)
+                _report(progress, 1, "running")
+                started = time.perf_counter()
+                # Falls back to uniform sampling when the GOP is too long
+                keyframes = plan_keyframes(video_path) if fast else None
+                sampling = 'keyframes' if keyframes is not None else CONFIG['frame_policy']
+                with profiling.stage("process_video"):
+                    video_tensor = process_video(video_path, keyframes=keyframes)
+                profiling.record_stage("process_video", time.perf_counter() - started)
+                frames_used = video_tensor.size(1)
+                _report(progress, 1, "completed")
+                _report(progress, 2, "skipped")
+                _report(progress, 3, "running")
+
+                # 2. Inference
+                started = time.perf_counter()
+                with profiling.stage("inference"):
+                    if CONFIG['batching_enabled'] and not profile:
+                        # Shares a forward pass with other requests arriving in the same window
+                        probability = get_scheduler().infer(video_tensor[0])
+                    else:
+                        probability = get_backend().run_batch([video_tensor[0]], embedding_cache=embedding_cache)[0]
+                inference_ms = (time.perf_counter() - started) * 1000
+                profiling.record_stage("inference", inference_ms / 1000)
+        memory = peak.report()
+        if 'rss_growth_mb' in memory:
+            metrics.measure(metrics.ANALYSIS_MEMORY, memory['rss_growth_mb'] * 1024 * 1024)
+        _report(progress, 3, "completed")
+        _report(progress, 4, "skipped")
             
         # 3. Format Result
         label = "fake" if probability > 0.5 else "real"
-        
-        # Calculate confidence
-        # If prob is 0.9, confidence is high. If 0.51, low.
-        dist_from_center = abs(probability - 0.5)
-        if dist_from_center > 0.35: # < 0.15 or > 0.85
-            confidence = "high"
-        elif dist_from_center > 0.15: # < 0.35 or > 0.65
-            confidence = "medium"
-        else:
-            confidence = "low"
+        confidence = _confidence(probability)
 
         result = {
             "label": label,
             "probability": round(probability, 4),
             "confidence": confidence,
+            "inference": {
+                "backend": backend.name,
+                "latency_ms": round(inference_ms, 1),
+                "mode": mode,
+                "fast_screen": fast,
+                "sampling": sampling,
+                "frames_used": frames_used,
+                "early_exit": early_exit,
+                "memory": memory,
+            },
+            **details,
             "steps": [
                 {"id": 1, "status": "completed"}, # Extracting Frames (implicit)
                 {"id": 2, "status": "skipped"},   # Physics-based
@@ -72,9 +382,11 @@ def analyze_video(video_path: str):
         }
         
         print(f"Analysis complete for {video_path}: {result}")
+        metrics.count(metrics.ANALYSES, outcome="completed")
         return {"status": "completed", "result": result}
 
     except Exception as e:
         print(f"Error analyzing video {video_path}: {e}")
+        metrics.count(metrics.ANALYSES, outcome="failed")
         # Return error structure but don't crash not to crash the server
         return {"status": "failed", "error": str(e)}
@@ -0,0 +1,351 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import torch
+import torch.nn as nn
+from torch.nn.utils.rnn import pad_sequence
+
+try:
+    from .ai_models import DeepFakeDetector, classify_sequence
+    from .preprocessing import normalize_frames
+    from .memory import PeakMemory
+    from . import metrics
+except ImportError:
+    # Fallback for running script directly from backend/services
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from services.ai_models import DeepFakeDetector, classify_sequence
+    from services.preprocessing import normalize_frames
+    from services.memory import PeakMemory
+    from services import metrics
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('eager', 'torchscript', 'onnx', 'int8')
+
+
+class InferenceBackend:
+    """
+    Runs a DeepFakeDetector checkpoint for serving.
+
+    The EfficientNet stage dominates the cost, so that is what the exported
+    backends replace; the BiLSTM + head runs from the same checkpoint in
+    PyTorch (it is cheap and needs packed sequences for batching).
+
+    Subclasses implement `embed(frames) -> (N, 1280)`.
+
+    With `chunk_size` set, frames are normalised and embedded at most
+    `chunk_size` at a time, keeping only each chunk's features, which bounds
+    the peak memory of a forward pass regardless of how many frames (or
+    batched clips) it covers.
+    """
+    name = None
+    chunk_size = None
+
+    def __init__(self, model):
+        self.model = model
+        self.device = next(model.parameters()).device
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._frames = 0
+        self._embed_seconds = 0.0
+        self._total_seconds = 0.0
+
+    def embed(self, frames):
+        raise NotImplementedError
+
+    def classify(self, features, lengths=None):
+        with torch.no_grad():
+            return self.model.classify_features(features, lengths)
+
+    def embed_frames(self, frames, embedding_cache=None):
+        """
+        `embed` for uint8 (N, H, W, 3) frames from preprocessing (or already
+        normalised float frames), going through an EmbeddingCache when one is
+        given. Frames are normalised only after the cache lookup.
+        """
+        with metrics.timed('cnn_forward'):
+            if embedding_cache is None:
+                return self._embed_raw(frames)
+            return embedding_cache.embed(frames, self._embed_raw).to(self.device)
+
+    def _embed_raw(self, frames):
+        if self.chunk_size and frames.size(0) > self.chunk_size:
+            # The float copy and the CNN activations only ever exist for one chunk
+            return torch.cat([self._embed_raw(chunk) for chunk in frames.split(self.chunk_size)])
+        # Moved while still uint8 (4x less to copy), normalised in one batched op
+        return self.embed(normalize_frames(frames.to(self.device)))
+
+    def run_head(self, features, lengths=None):
+        """
+        `classify`, recorded as the head stage.
+        """
+        with metrics.timed('head'):
+            return self.classify(features, lengths)
+
+    def run_batch(self, clips, embedding_cache=None):
+        """
+        Score a list of uint8 (Seq_Len_i, H, W, 3) clips from preprocessing in
+        one pass; they are normalised here, after the embedding cache lookup.
+        (Already normalised (Seq_Len_i, C, H, W) float clips also work.)
+        Returns one probability (float) per clip.
+
+        With an EmbeddingCache, only frames missing from the cache go
+        through the CNN.
+        """
+        started = time.perf_counter()
+        lengths = torch.tensor([clip.size(0) for clip in clips], dtype=torch.long)
+
+        features = self.embed_frames(torch.cat(clips, dim=0), embedding_cache)
+        embedded = time.perf_counter()
+
+        r_in = pad_sequence(list(features.split(lengths.tolist())), batch_first=True)
+        same_length = bool((lengths == lengths[0]).all())
+        probabilities = self.run_head(r_in, None if same_length else lengths)
+        finished = time.perf_counter()
+
+        with self._lock:
+            self._calls += 1
+            self._frames += int(lengths.sum())
+            self._embed_seconds += embedded - started
+            self._total_seconds += finished - started
+
+        return probabilities.view(-1).tolist()
+
+    def stats(self):
+        with self._lock:
+            calls = self._calls
+            return {
+                'backend': self.name,
+                'batches': calls,
+                'frames': self._frames,
+                'avg_embed_ms': round(self._embed_seconds * 1000 / calls, 3) if calls else 0.0,
+                'avg_batch_ms': round(self._total_seconds * 1000 / calls, 3) if calls else 0.0,
+                'avg_ms_per_frame': round(self._total_seconds * 1000 / self._frames, 3) if self._frames else 0.0,
+            }
+
+
+class EagerBackend(InferenceBackend):
+    name = 'eager'
+
+    def embed(self, frames):
+        with torch.no_grad():
+            return self.model.extract_features(frames.to(self.device))
+
+
+class TorchScriptBackend(InferenceBackend):
+    name = 'torchscript'
+
+    def __init__(self, model, path):
+        super(TorchScriptBackend, self).__init__(model)
+        self.cnn = torch.jit.load(path, map_location=self.device)
+        self.cnn.eval()
+
+    def embed(self, frames):
+        with torch.no_grad():
+            return self.cnn(frames.to(self.device))
+
+
+class OnnxBackend(InferenceBackend):
+    name = 'onnx'
+
+    def __init__(self, model, path, num_threads=0):
+        super(OnnxBackend, self).__init__(model)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def embed(self, frames):
+        (features,) = self.session.run(None, {self.input_name: frames.detach().cpu().float().numpy()})
+        return torch.from_numpy(features).to(self.device)
+
+
+class Int8Backend(TorchScriptBackend):
+    """
+    CPU int8 inference: a statically quantized CNN exported by
+    services/quantize.py, plus the BiLSTM and linear head dynamically
+    quantized from the same checkpoint at load time.
+    """
+    name = 'int8'
+
+    def __init__(self, model, path):
+        super(Int8Backend, self).__init__(model.cpu(), path)
+        self.head = quantize_head(model)
+
+    def classify(self, features, lengths=None):
+        with torch.no_grad():
+            return classify_sequence(self.head['lstm'], self.head['fc'], features.cpu(), lengths)
+
+
+def quantize_head(model):
+    """
+    Dynamic int8 copies of the model's BiLSTM and classifier head.
+    """
+    from torch.ao.quantization import quantize_dynamic
+
+    head = nn.ModuleDict({'lstm': model.lstm, 'fc': model.fc}).cpu().eval()
+    return quantize_dynamic(head, {nn.LSTM, nn.Linear}, dtype=torch.qint8, inplace=False)
+
+
+def create_backend(name, model, path=None, chunk_size=None, **kwargs):
+    """
+    Build the configured backend. `path` is the exported CNN for
+    'torchscript'/'onnx'/'int8' and is ignored for 'eager'. `chunk_size`
+    caps the frames per CNN call (None or 0 for no limit).
+    """
+    if name == 'eager':
+        backend = EagerBackend(model)
+    elif name == 'torchscript':
+        backend = TorchScriptBackend(model, path)
+    elif name == 'onnx':
+        backend = OnnxBackend(model, path, **kwargs)
+    elif name == 'int8':
+        backend = Int8Backend(model, path)
+    else:
+        raise ValueError(f"Unknown inference backend: {name} (expected one of {BACKENDS})")
+    backend.chunk_size = chunk_size or None
+    return backend
+
+
+class _FeatureExtractor(nn.Module):
+    # Exported graph: normalised frames (N, 3, 224, 224) -> features (N, 1280)
+    def __init__(self, model):
+        super(_FeatureExtractor, self).__init__()
+        self.model = model
+
+    def forward(self, frames):
+        return self.model.extract_features(frames)
+
+
+def export_cnn(model, fmt, output_path, frame_size=224):
+    """
+    Export the EfficientNet stage of `model` as TorchScript or ONNX with a
+    dynamic frame dimension.
+    """
+    model = model.cpu().eval()
+    extractor = _FeatureExtractor(model).eval()
+    example = torch.randn(2, 3, frame_size, frame_size)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    with torch.no_grad():
+        if fmt == 'torchscript':
+            traced = torch.jit.trace(extractor, example)
+            traced.save(output_path)
+        elif fmt == 'onnx':
+            torch.onnx.export(
+                extractor, (example,), output_path,
+                input_names=['frames'], output_names=['features'],
+                dynamic_axes={'frames': {0: 'frames'}, 'features': {0: 'frames'}},
+                opset_version=17,
+                dynamo=False,
+            )
+        else:
+            raise ValueError(f"Cannot export to {fmt}")
+
+
+def check_parity(reference, candidate, tolerance=1e-4, seq_lens=(3, 8, 5), frame_size=224, seed=0):
+    """
+    Compare two backends on the same random clips (including a padded batch).
+
+    Returns (passed, max_abs_diff) over the per-clip probabilities.
+    """
+    generator = torch.Generator().manual_seed(seed)
+    clips = [torch.randn(n, 3, frame_size, frame_size, generator=generator) for n in seq_lens]
+
+    expected = torch.tensor(reference.run_batch(clips))
+    actual = torch.tensor(candidate.run_batch(clips))
+    max_diff = float((expected - actual).abs().max())
+    return max_diff <= tolerance, max_diff
+
+
+def _load_model(path):
+    # Artifacts (.pt) carry their own config; anything else is a train.py state dict
+    if path.endswith('.pt'):
+        try:
+            from .model_artifact import load_artifact
+        except ImportError:
+            from services.model_artifact import load_artifact
+        return load_artifact(path).eval()
+    return DeepFakeDetector(weights_path=path, pretrained_backbone=False).eval()
+
+
+def _chunk_benchmark_run(weights, chunk_size, frames, frame_size, repeats):
+    model = _load_model(weights) if weights else DeepFakeDetector(pretrained_backbone=False).eval()
+    backend = create_backend('eager', model, chunk_size=chunk_size)
+    clip = torch.randint(0, 256, (frames, frame_size, frame_size, 3), dtype=torch.uint8)
+
+    # The first pass sets the peak; later ones reuse memory the allocator kept
+    with PeakMemory() as peak:
+        backend.run_batch([clip])
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        backend.run_batch([clip])
+        best = min(best, time.perf_counter() - started)
+    return {'rss_growth_mb': peak.report().get('rss_growth_mb'), 'latency_ms': round(best * 1000, 1)}
+
+
+def benchmark_chunks(chunk_sizes, weights=None, frames=90, frame_size=224, repeats=3):
+    """
+    Peak memory and latency of one eager forward pass over `frames` frames
+    for each CNN chunk size (0 = unchunked). Every size runs in a fresh
+    process, so memory kept from an earlier run can't hide a later peak.
+
+    Returns {chunk_size: {'rss_growth_mb', 'latency_ms'}}.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for chunk_size in chunk_sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[chunk_size] = pool.submit(
+                _chunk_benchmark_run, weights, chunk_size, frames, frame_size, repeats,
+            ).result()
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Export the CNN stage for a serving backend and check parity with eager PyTorch.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Export, then run the parity check')
+    check_parser = subparsers.add_parser('check', help='Run the parity check on an existing export')
+    for sub in (export_parser, check_parser):
+        sub.add_argument('--weights', type=str, required=True, help='Model artifact (.pt) or state dict (.pth)')
+        sub.add_argument('--format', type=str, required=True, choices=['torchscript', 'onnx'])
+        sub.add_argument('--output', type=str, required=True, help='Exported CNN path (e.g. weights/model.onnx)')
+        sub.add_argument('--tolerance', type=float, default=1e-4, help='Max allowed probability difference')
+    chunks_parser = subparsers.add_parser('chunks', help='Peak memory / latency per CNN chunk size (VOXEAR_CNN_CHUNK_FRAMES)')
+    chunks_parser.add_argument('--weights', type=str, default=None, help='Model artifact or state dict (random weights if omitted)')
+    chunks_parser.add_argument('--chunk-sizes', type=str, default='0,8,16,32', help='Comma separated chunk sizes, 0 = unchunked')
+    chunks_parser.add_argument('--frames', type=int, default=90, help='Frames per forward pass')
+    chunks_parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == 'chunks':
+        sizes = [int(value) for value in args.chunk_sizes.split(',')]
+        for chunk_size, result in benchmark_chunks(sizes, args.weights, args.frames, repeats=args.repeats).items():
+            logger.info(
+                f"chunk={chunk_size or 'all'}: peak RSS +{result['rss_growth_mb']}MB, "
+                f"{result['latency_ms']}ms for {args.frames} frames"
+            )
+        sys.exit(0)
+
+    model = _load_model(args.weights)
+    if args.command == 'export':
+        export_cnn(model, args.format, args.output)
+        logger.info(f"Exported {args.format} CNN to {args.output}")
+
+    passed, max_diff = check_parity(EagerBackend(model), create_backend(args.format, model, args.output), args.tolerance)
+    if not passed:
+        logger.error(f"Parity check FAILED: max probability difference {max_diff:.2e} > {args.tolerance:.2e}")
+        sys.exit(1)
+    logger.info(f"Parity check passed: max probability difference {max_diff:.2e} <= {args.tolerance:.2e}")
@@ -0,0 +1,133 @@
+import threading
+import time
+import queue
+import logging
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingClip:
+    __slots__ = ('clip', 'future', 'enqueued_at')
+
+    def __init__(self, clip):
+        self.clip = clip
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchScheduler:
+    """
+    Dynamic micro-batching in front of the model.
+
+    Callers submit one preprocessed clip each (from any thread) and block until
+    their probability is ready. A single worker thread collects clips until
+    either `max_batch_size` clips are waiting or the oldest clip has waited
+    `max_wait_ms`, then runs them through `run_batch` in one forward pass.
+
+    Args:
+        run_batch: Callable taking a list of uint8 (Seq_Len_i, H, W, 3) clips
+                   (normalised inside the backend) and returning one
+                   probability (float) per clip, in order.
+        max_batch_size: Upper bound on clips per forward pass.
+        max_wait_ms: How long the first clip of a batch may wait for company.
+    """
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=10.0):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+        self._worker = threading.Thread(target=self._run, name='batch-scheduler', daemon=True)
+        self._worker.start()
+
+    def submit(self, clip):
+        """
+        Queue a clip and return a Future resolving to its probability.
+        """
+        pending = _PendingClip(clip)
+        self._queue.put(pending)
+        return pending.future
+
+    def infer(self, clip):
+        """
+        Blocking convenience wrapper around `submit`.
+        """
+        return self.submit(clip).result()
+
+    def stats(self):
+        with self._stats_lock:
+            batches = self._batches
+            clips = self._clips
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'queued': self._queue.qsize(),
+                'batches': batches,
+                'clips': clips,
+                'avg_batch_size': round(clips / batches, 3) if batches else 0.0,
+                'batch_size_histogram': dict(sorted(self._size_histogram.items())),
+                'avg_wait_ms': round(self._wait_total * 1000.0 / clips, 3) if clips else 0.0,
+                'max_wait_observed_ms': round(self._wait_max * 1000.0, 3),
+                'avg_forward_ms': round(self._forward_total * 1000.0 / batches, 3) if batches else 0.0,
+                'errors': self._errors,
+            }
+
+    def _reset_stats(self):
+        self._batches = 0
+        self._clips = 0
+        self._size_histogram = {}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._forward_total = 0.0
+        self._errors = 0
+
+    def _collect(self):
+        # Block for the first clip, then gather more until the window closes
+        batch = [self._queue.get()]
+        deadline = batch[0].enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    # Window closed, but still take whatever is already waiting
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+
+            try:
+                probabilities = self.run_batch([pending.clip for pending in batch])
+                if len(probabilities) != len(batch):
+                    raise RuntimeError(f"run_batch returned {len(probabilities)} results for {len(batch)} clips")
+            except Exception as e:
+                logger.error(f"Batched inference failed for {len(batch)} clips: {e}")
+                with self._stats_lock:
+                    self._errors += 1
+                for pending in batch:
+                    pending.future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            for pending, probability in zip(batch, probabilities):
+                pending.future.set_result(probability)
+
+            with self._stats_lock:
+                self._batches += 1
+                self._clips += len(batch)
+                self._size_histogram[len(batch)] = self._size_histogram.get(len(batch), 0) + 1
+                self._forward_total += finished - started
+                for pending in batch:
+                    wait = started - pending.enqueued_at
+                    self._wait_total += wait
+                    self._wait_max = max(self._wait_max, wait)
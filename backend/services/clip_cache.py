@@ -0,0 +1,177 @@
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+import weakref
+import torch
+from torch.utils.data import Dataset
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 * 1024
+
+
+class CachedDataset(Dataset):
+    """
+    Keeps the items of a dataset whose output is deterministic (a 'val'
+    DeepFakeDataset or ShardDataset), so only the first pass over it decodes
+    and resizes frames.
+
+    Items are held in memory until `max_memory_mb` is used. Items past that
+    spill to disk: into `cache_dir` when one is given, otherwise into a
+    private temporary directory that is removed with the cache. With a
+    `cache_dir`, every item is also written there, named after a hash of the
+    dataset's `cache_key(idx)` (video, folder mtime, frame count, seq_len
+    and transform). Other runs on the same split, such as evaluate.py
+    pointed at the same directory, then load the clips instead of the
+    images, and a changed video or transform is a miss.
+
+    Items are stored as they come out of the dataset (a float32 20-frame
+    224px clip is about 12MB), so the disk tier is capped at `max_disk_mb`:
+    the least recently used files are removed first.
+
+    Each DataLoader worker has its own memory cache and spill directory; use
+    persistent_workers so they survive from one epoch to the next.
+
+    Args:
+        dataset: Dataset with deterministic items and a `cache_key(idx)` method.
+        cache_dir (str, optional): Persistent directory for the disk tier.
+        max_memory_mb (int): Memory cap for items, per process.
+        max_disk_mb (int): Size cap for the disk tier.
+    """
+    def __init__(self, dataset, cache_dir=None, max_memory_mb=1024, max_disk_mb=8192):
+        if getattr(dataset, 'mode', None) == 'train':
+            raise ValueError("CachedDataset needs deterministic items; wrap a mode='val' dataset")
+        self.dataset = dataset
+        self.cache_dir = cache_dir
+        self.max_memory = max_memory_mb * _MB
+        self.max_disk = max_disk_mb * _MB
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = {}
+        self._memory_bytes = 0
+        self._spill_dir = None
+        self._disk_bytes = None
+
+    def __getstate__(self):
+        # Workers fill their own cache (and spill directory)
+        state = self.__dict__.copy()
+        state['_memory'] = {}
+        state['_memory_bytes'] = 0
+        state['_spill_dir'] = None
+        state['_disk_bytes'] = None
+        return state
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, idx):
+        item = self._memory.get(idx)
+        if item is not None:
+            self.hits += 1
+            return item
+
+        path = self._path(idx)
+        item = self._load(path) if path else None
+        if item is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            item = self.dataset[idx]
+
+        if not self._remember(idx, item) or self.cache_dir:
+            if path is None:
+                path = self._path(idx, spill=True)
+            if not os.path.exists(path):
+                self._save(path, item)
+        return item
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'memory_mb': round(self._memory_bytes / _MB, 1),
+        }
+
+    def _disk_dir(self, spill=False):
+        if self.cache_dir:
+            return self.cache_dir
+        if self._spill_dir is None and spill:
+            self._spill_dir = tempfile.mkdtemp(prefix='voxear-clips-')
+            weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        return self._spill_dir
+
+    def _path(self, idx, spill=False):
+        disk_dir = self._disk_dir(spill)
+        if disk_dir is None:
+            return None
+        key = hashlib.sha1(self.dataset.cache_key(idx).encode()).hexdigest()
+        return os.path.join(disk_dir, f"{key}.pt")
+
+    def _load(self, path):
+        try:
+            item = torch.load(path, weights_only=True)
+            os.utime(path)  # Keep recently used entries from being evicted
+            return item
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def _save(self, path, item):
+        # Write then rename, so concurrent workers never read half a file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            torch.save(item, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._trim(os.path.dirname(path), os.path.getsize(path))
+
+    def _trim(self, disk_dir, added):
+        if self._disk_bytes is None:
+            self._disk_bytes = _entries_size(disk_dir)
+        else:
+            self._disk_bytes += added
+        if self._disk_bytes <= self.max_disk:
+            return
+
+        # Other workers write here too: rescan before evicting
+        entries = sorted(_entries(disk_dir), key=lambda entry: entry.stat().st_mtime)
+        self._disk_bytes = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self._disk_bytes <= self.max_disk:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            self._disk_bytes -= size
+
+    def _remember(self, idx, item):
+        # True when the item now lives in memory
+        size = sum(t.element_size() * t.nelement() for t in item if torch.is_tensor(t))
+        if self._memory_bytes + size > self.max_memory:
+            return False
+        self._memory[idx] = item
+        self._memory_bytes += size
+        return True
+
+
+def _entries(disk_dir):
+    return [entry for entry in os.scandir(disk_dir) if entry.name.endswith('.pt')]
+
+
+def _entries_size(disk_dir):
+    return sum(entry.stat().st_size for entry in _entries(disk_dir))
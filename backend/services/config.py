@@ -0,0 +1,145 @@
+import os
+import tempfile
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value not in (None, '') else default
+
+
+def _env_str(name, default):
+    value = os.environ.get(name)
+    return value if value not in (None, '') else default
+
+
+# Serving configuration
+# Every key can be overridden with a VOXEAR_<KEY> environment variable,
+# e.g. VOXEAR_BATCH_MAX_SIZE=16
+CONFIG = {
+    # Model loading
+    # Artifact path defaults to backend/weights/model.pt (falls back to model.pth)
+    'model_artifact_path': _env_str('VOXEAR_MODEL_ARTIFACT_PATH', ''),
+    'preload_model': _env_bool('VOXEAR_PRELOAD_MODEL', True),
+    'warmup_frames': _env_int('VOXEAR_WARMUP_FRAMES', 8),
+
+    # Inference backend: 'eager', 'torchscript', 'onnx' or 'int8'
+    # Export paths default to backend/weights/model.ts, model.onnx and model.int8.ts
+    'inference_backend': _env_str('VOXEAR_INFERENCE_BACKEND', 'eager'),
+    'torchscript_path': _env_str('VOXEAR_TORCHSCRIPT_PATH', ''),
+    'onnx_path': _env_str('VOXEAR_ONNX_PATH', ''),
+    'int8_path': _env_str('VOXEAR_INT8_PATH', ''),
+    # Frames per CNN call (0 = all frames of a batch at once). Smaller chunks
+    # bound peak memory per analysis at some cost in latency; compare with
+    # python -m services.backends chunks
+    'cnn_chunk_frames': _env_int('VOXEAR_CNN_CHUNK_FRAMES', 16),
+
+    # Micro-batching scheduler in front of the model
+    'batching_enabled': _env_bool('VOXEAR_BATCHING_ENABLED', True),
+    'batch_max_size': _env_int('VOXEAR_BATCH_MAX_SIZE', 8),
+    'batch_max_wait_ms': _env_float('VOXEAR_BATCH_MAX_WAIT_MS', 10.0),
+
+    # How frames between samples are skipped: 'grab' (decode only), 'seek'
+    # (jump to each sampled frame) or 'read' (full decode + convert)
+    # Compare them with: python -m services.preprocessing <video>
+    'frame_sampler': _env_str('VOXEAR_FRAME_SAMPLER', 'grab'),
+
+    # Decoder: 'opencv' (cv2.VideoCapture) or 'ffmpeg' (frame selection and
+    # resizing inside an ffmpeg subprocess; falls back to OpenCV without ffmpeg)
+    'decode_backend': _env_str('VOXEAR_DECODE_BACKEND', 'opencv'),
+
+    # Frame policy for full analyses: 'uniform' (every n-th frame) or
+    # 'adaptive' (near-duplicate frames are dropped and the same frame budget
+    # stretches over up to adaptive_max_seconds of video). A frame is kept when
+    # its 32x32 grayscale thumbnail differs from the last kept one by at least
+    # adaptive_min_change (mean, 0-255), or adaptive_max_gap_seconds have passed
+    'frame_policy': _env_str('VOXEAR_FRAME_POLICY', 'uniform'),
+    'adaptive_min_change': _env_float('VOXEAR_ADAPTIVE_MIN_CHANGE', 1.0),
+    'adaptive_max_gap_seconds': _env_float('VOXEAR_ADAPTIVE_MAX_GAP_SECONDS', 2.0),
+    'adaptive_max_seconds': _env_int('VOXEAR_ADAPTIVE_MAX_SECONDS', 120),
+
+    # Fast screening (?fast=1): decode only keyframes near the sampling
+    # timestamps (needs ffmpeg). Videos whose GOP is too long to give this
+    # many frames are sampled uniformly instead
+    'screen_min_keyframes': _env_int('VOXEAR_SCREEN_MIN_KEYFRAMES', 8),
+
+    # Parallel decoding: up to decode_workers threads, one per
+    # decode_segment_seconds of sampled video (1 = always sequential; face-cropped
+    # videos always decode sequentially)
+    'decode_workers': _env_int('VOXEAR_DECODE_WORKERS', 1),
+    'decode_segment_seconds': _env_float('VOXEAR_DECODE_SEGMENT_SECONDS', 10.0),
+
+    # Crop sampled frames to the face, like the training data (extract_frames.py)
+    # The detector runs every n-th sampled frame; the box is tracked in between
+    'face_crop_enabled': _env_bool('VOXEAR_FACE_CROP_ENABLED', True),
+    'face_detect_every': _env_int('VOXEAR_FACE_DETECT_EVERY', 5),
+    'face_margin': _env_float('VOXEAR_FACE_MARGIN', 0.2),
+
+    # Analysis mode
+    # 'full' scores the sampled clip (first 30 s); 'progressive' scores growing
+    # prefixes chunk by chunk and stops once the verdict reaches the exit
+    # confidence band ('high', or 'medium' to also stop on medium);
+    # 'windowed' scores the whole video in overlapping windows
+    'analysis_mode': _env_str('VOXEAR_ANALYSIS_MODE', 'full'),
+    'progressive_chunk_frames': _env_int('VOXEAR_PROGRESSIVE_CHUNK_FRAMES', 15),
+    'progressive_min_frames': _env_int('VOXEAR_PROGRESSIVE_MIN_FRAMES', 15),
+    'progressive_exit_confidence': _env_str('VOXEAR_PROGRESSIVE_EXIT_CONFIDENCE', 'high'),
+    # Windows above the threshold are reported as suspicious segments; the
+    # verdict is the 'max' or 'mean' of the window probabilities
+    'window_seconds': _env_float('VOXEAR_WINDOW_SECONDS', 10.0),
+    'window_stride_seconds': _env_float('VOXEAR_WINDOW_STRIDE_SECONDS', 5.0),
+    'window_batch_size': _env_int('VOXEAR_WINDOW_BATCH_SIZE', 8),
+    'window_threshold': _env_float('VOXEAR_WINDOW_THRESHOLD', 0.5),
+    'window_aggregate': _env_str('VOXEAR_WINDOW_AGGREGATE', 'max'),
+
+    # Per-request profiling (?profile=1 or X-Voxear-Profile: 1)
+    # Traces are written to the profile dir (empty = <tmp>/voxear-profiles)
+    'profiling_enabled': _env_bool('VOXEAR_PROFILING_ENABLED', False),
+    'profile_dir': _env_str('VOXEAR_PROFILE_DIR', '') or os.path.join(tempfile.gettempdir(), 'voxear-profiles'),
+
+    # Per-frame CNN embedding cache shared across requests
+    'embedding_cache_enabled': _env_bool('VOXEAR_EMBEDDING_CACHE_ENABLED', True),
+    'embedding_cache_mb': _env_int('VOXEAR_EMBEDDING_CACHE_MB', 128),
+
+    # Worker pool running analyses off the event loop
+    # 'thread' shares one model (and the batching scheduler) across workers,
+    # 'process' gives every worker its own model copy, 'replicas' runs
+    # worker_count model processes each pinned to its own cores
+    'worker_kind': _env_str('VOXEAR_WORKER_KIND', 'thread'),
+    'worker_count': _env_int('VOXEAR_WORKER_COUNT', 4),
+    'worker_queue_size': _env_int('VOXEAR_WORKER_QUEUE_SIZE', 16),
+    # Cores / intra-op threads per replica (0 = split the cores evenly)
+    'replica_threads': _env_int('VOXEAR_REPLICA_THREADS', 0),
+
+    # Upload ingestion
+    # Uploads below the threshold are spooled to the tmpfs memory dir,
+    # larger ones to the spool dir (empty = system temp dir)
+    'upload_max_mb': _env_int('VOXEAR_UPLOAD_MAX_MB', 500),
+    'upload_memory_threshold_mb': _env_int('VOXEAR_UPLOAD_MEMORY_THRESHOLD_MB', 64),
+    'upload_memory_dir': _env_str('VOXEAR_UPLOAD_MEMORY_DIR', '/dev/shm'),
+    'upload_spool_dir': _env_str('VOXEAR_UPLOAD_SPOOL_DIR', ''),
+
+    # Content-addressed cache of analysis results
+    # Leave the directory empty to keep the cache in memory only
+    'result_cache_enabled': _env_bool('VOXEAR_RESULT_CACHE_ENABLED', True),
+    'result_cache_size': _env_int('VOXEAR_RESULT_CACHE_SIZE', 256),
+    'result_cache_dir': _env_str('VOXEAR_RESULT_CACHE_DIR', ''),
+    'result_cache_disk_size': _env_int('VOXEAR_RESULT_CACHE_DISK_SIZE', 10000),
+
+    # Asynchronous job API (POST /jobs)
+    'job_backlog_size': _env_int('VOXEAR_JOB_BACKLOG_SIZE', 64),
+    # Most videos one POST /jobs may carry (each capped at upload_max_mb)
+    'job_max_files': _env_int('VOXEAR_JOB_MAX_FILES', 16),
+    'job_retention_seconds': _env_int('VOXEAR_JOB_RETENTION_SECONDS', 3600),
+}
@@ -1,5 +1,8 @@
 import os
-import glob
+import json
+import time
+import uuid
+import numpy as np
 import torch
 from torch.utils.data import Dataset
 from PIL import Image
@@ -9,6 +12,248 @@ import random
 
 logger = logging.getLogger(__name__)
 
+CLASSES = (('real', 0), ('fake', 1))
+FRAME_EXTENSIONS = ('.jpg', '.png')
+MANIFEST_VERSION = 2
+_MANIFEST_ARRAYS = ('videos', 'labels', 'offsets', 'frames', 'video_mtimes')
+
+
+class FrameManifest:
+    """
+    Every video folder of a dataset with its label and sorted frame list,
+    held as a few flat numpy arrays:
+
+        videos        (N,) bytes    video folder, relative to the root
+        labels        (N,) int8     0 = real, 1 = fake
+        offsets       (N+1,) int64  video i's frames are frames[offsets[i]:offsets[i+1]]
+        frames        (F,) bytes    frame file names, sorted per video
+        video_mtimes  (N,) int64    folder mtime (ns) when it was listed
+
+    Saved as one .npy file per array plus a meta.json, and opened with
+    mmap_mode='r': loading takes milliseconds, and every DataLoader worker
+    (forked or spawned) reads the same page cache instead of its own copy.
+    Flat arrays also avoid the per-object refcount writes that make forked
+    workers gradually copy Python lists of strings.
+
+    Every save is a new build: its arrays are named `<array>.<build>.npy`
+    and meta.json names the current build, so readers never pair one
+    build's meta with another's arrays, and concurrent builders (e.g. DDP
+    ranks) never overwrite each other's files. `build` is None for a
+    manifest that only lives in memory.
+    """
+    def __init__(self, arrays, class_mtimes, build=None):
+        for name in _MANIFEST_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.class_mtimes = class_mtimes
+        self.build = build
+
+    def __len__(self):
+        return len(self.videos)
+
+    def frame_count(self, i):
+        return int(self.offsets[i + 1] - self.offsets[i])
+
+    def frame_names(self, i):
+        return [name.decode() for name in self.frames[self.offsets[i]:self.offsets[i + 1]]]
+
+    def save(self, manifest_dir):
+        """
+        Write the arrays as a new build, then switch meta.json to it.
+
+        Builds that were already superseded when this save started are
+        removed. The build current at that point (workers may still be
+        opening it) and anything written since, such as another process's
+        build that isn't published yet, are kept.
+        """
+        os.makedirs(manifest_dir, exist_ok=True)
+        meta_path = os.path.join(manifest_dir, "meta.json")
+        current = _read_meta(meta_path).get('build')
+        current_published = _mtime_ns(meta_path)
+
+        build = uuid.uuid4().hex
+        for name in _MANIFEST_ARRAYS:
+            path = os.path.join(manifest_dir, f"{name}.{build}.npy")
+            tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, getattr(self, name))
+            os.replace(tmp_path, path)
+
+        previous = _read_meta(meta_path).get('build')
+        meta = {'version': MANIFEST_VERSION, 'build': build, 'previous': previous,
+                'videos': len(self), 'class_mtimes': self.class_mtimes}
+        tmp_path = f"{meta_path}.{os.getpid()}.{build}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+        self.build = build
+
+        if current_published is None:
+            return
+        keep = {build, previous, current}
+        for entry in os.scandir(manifest_dir):
+            parts = entry.name.split('.')
+            if parts[0] not in _MANIFEST_ARRAYS or parts[-1] != 'npy' or len(parts) > 3:
+                continue
+            # Version 1's <array>.npy, or <array>.<build>.npy of a build
+            # written before the one current when this save started
+            if len(parts) == 3 and (parts[1] in keep or entry.stat().st_mtime_ns >= current_published):
+                continue
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    @classmethod
+    def open(cls, manifest_dir, build=None):
+        """
+        Memory-map a saved manifest: the build meta.json names, or a given
+        `build` (while its files are kept). Returns None if it is missing,
+        from another version or incomplete.
+        """
+        meta = _read_meta(os.path.join(manifest_dir, "meta.json"))
+        if meta.get('version') != MANIFEST_VERSION:
+            meta = {}
+        if build is None:
+            build = meta.get('build')
+            if build is None:
+                return None
+        try:
+            arrays = {
+                name: np.load(os.path.join(manifest_dir, f"{name}.{build}.npy"), mmap_mode='r')
+                for name in _MANIFEST_ARRAYS
+            }
+        except (OSError, ValueError):
+            return None
+        if len(arrays['offsets']) != len(arrays['videos']) + 1:
+            return None
+        class_mtimes = meta['class_mtimes'] if meta.get('build') == build else {}
+        return cls(arrays, class_mtimes, build)
+
+
+def _read_meta(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _list_frames(video_folder):
+    # Same order as sorting the full paths, without a glob per extension
+    return sorted(entry.name for entry in os.scandir(video_folder)
+                  if entry.is_file() and entry.name.endswith(FRAME_EXTENSIONS))
+
+
+def _bytes_array(names):
+    # Fixed-width UTF-8 bytes: 1 byte per character instead of numpy's 4 for str
+    if not names:
+        return np.empty(0, dtype='S1')
+    return np.array([name.encode() for name in names], dtype=np.bytes_)
+
+
+def build_manifest(root_dir, previous=None):
+    """
+    List every video folder under root_dir/real and root_dir/fake.
+
+    With a `previous` manifest, folders whose mtime hasn't changed keep
+    their stored frame list, so only new or modified videos are listed again.
+    """
+    reuse = {}
+    if previous is not None:
+        for i, video in enumerate(previous.videos):
+            reuse[video.decode()] = (int(previous.video_mtimes[i]), i)
+
+    videos, labels, mtimes, frames, offsets = [], [], [], [], [0]
+    class_mtimes = {}
+    relisted = 0
+    for class_name, label in CLASSES:
+        class_path = os.path.join(root_dir, class_name)
+        class_mtimes[class_name] = _mtime_ns(class_path)
+        if class_mtimes[class_name] is None:
+            logger.warning(f"Path not found: {class_path}")
+            continue
+
+        for entry in sorted(os.scandir(class_path), key=lambda entry: entry.name):
+            if not entry.is_dir():
+                continue
+            video = f"{class_name}/{entry.name}"
+            mtime = entry.stat().st_mtime_ns
+            if video in reuse and reuse[video][0] == mtime:
+                names = previous.frame_names(reuse[video][1])
+            else:
+                names = _list_frames(entry.path)
+                relisted += 1
+            if not names:
+                continue
+
+            videos.append(video)
+            labels.append(label)
+            mtimes.append(mtime)
+            frames.extend(names)
+            offsets.append(len(frames))
+
+    logger.info(f"Frame manifest: {len(videos)} videos, {len(frames)} frames ({relisted} folders listed)")
+    arrays = {
+        'videos': _bytes_array(videos),
+        'labels': np.array(labels, dtype=np.int8),
+        'offsets': np.array(offsets, dtype=np.int64),
+        'frames': _bytes_array(frames),
+        'video_mtimes': np.array(mtimes, dtype=np.int64),
+    }
+    return FrameManifest(arrays, class_mtimes)
+
+
+def load_manifest(root_dir, manifest_dir=None, verify=False):
+    """
+    The dataset's frame manifest, rebuilt only when it is stale.
+
+    The saved manifest is reused while the mtimes of root_dir/real and
+    root_dir/fake are unchanged (a video folder was added, removed or
+    renamed otherwise). With `verify`, every video folder's mtime is checked
+    too, which catches frames added to or deleted from existing folders at
+    the cost of one stat per video. Only stale folders are listed again.
+
+    Args:
+        root_dir: Dataset root (real/ and fake/ video folders).
+        manifest_dir: Where the manifest is stored; defaults to
+                      root_dir/.manifest. If it can't be written (e.g. a
+                      read-only dataset), the manifest is kept in memory.
+        verify: Also compare every video folder's mtime.
+    """
+    manifest_dir = manifest_dir or os.path.join(root_dir, '.manifest')
+    started = time.perf_counter()
+    manifest = FrameManifest.open(manifest_dir)
+
+    if manifest is not None:
+        fresh = all(_mtime_ns(os.path.join(root_dir, name)) == manifest.class_mtimes.get(name)
+                    for name, _ in CLASSES)
+        if fresh and verify:
+            fresh = all(_mtime_ns(os.path.join(root_dir, video.decode())) == mtime
+                        for video, mtime in zip(manifest.videos, manifest.video_mtimes))
+        if fresh:
+            logger.info(f"Loaded frame manifest for {len(manifest)} videos in "
+                        f"{(time.perf_counter() - started) * 1000:.1f}ms")
+            return manifest
+
+    manifest = build_manifest(root_dir, previous=manifest)
+    try:
+        manifest.save(manifest_dir)
+    except OSError as e:
+        logger.warning(f"Could not save frame manifest to {manifest_dir}: {e}")
+    saved = FrameManifest.open(manifest_dir, manifest.build) if manifest.build else None
+    if saved is not None:
+        return saved
+    # Only in memory: DataLoader workers get the arrays, not a build to open
+    manifest.build = None
+    return manifest
+
+
 class DeepFakeDataset(Dataset):
     """
     Dataset class for Deepfake Detection.
@@ -25,63 +270,80 @@ class DeepFakeDataset(Dataset):
       fake/
         video_01_fake/
           frame_0.jpg
+
+    Folder listings come from a cached `FrameManifest` (see `load_manifest`),
+    so neither construction nor __getitem__ lists directories once the
+    manifest exists.
     """
-    def __init__(self, root_dir, seq_len=20, transform=None, mode='train'):
+    def __init__(self, root_dir, seq_len=20, transform=None, mode='train', manifest_dir=None, verify_manifest=False):
         """
         Args:
             root_dir (str): Path to the dataset root.
             seq_len (int): Number of frames to retrieve per video (for LSTM).
             transform (callable, optional): PyTorch transforms.
             mode (str): 'train' or 'val'. used for split or augmentation logic.
+            manifest_dir (str, optional): Manifest location (default root_dir/.manifest).
+            verify_manifest (bool): Check every video folder's mtime, not
+                just the class folders', before trusting the manifest.
         """
         self.root_dir = root_dir
         self.seq_len = seq_len
         self.transform = transform
         self.mode = mode
-        
-        self.video_paths = []
-        self.labels = []
-        
-        # 1. Load Real Videos (Label: 0)
-        real_path = os.path.join(root_dir, 'real')
-        if os.path.exists(real_path):
-            self._load_class_videos(real_path, label=0)
-        else:
-            logger.warning(f"Path not found: {real_path}")
+        self.manifest_dir = manifest_dir or os.path.join(root_dir, '.manifest')
 
-        # 2. Load Fake Videos (Label: 1)
-        fake_path = os.path.join(root_dir, 'fake')
-        if os.path.exists(fake_path):
-            self._load_class_videos(fake_path, label=1)
-        else:
-            logger.warning(f"Path not found: {fake_path}")
+        self.manifest = load_manifest(root_dir, self.manifest_dir, verify=verify_manifest)
+
+        # Filter out videos with too few frames
+        counts = np.diff(self.manifest.offsets)
+        self.indices = np.flatnonzero(counts >= self.seq_len)
             
-        if not self.video_paths:
+        if not len(self.indices):
             logger.error(f"No videos found in {root_dir}. Check structure!")
 
-    def _load_class_videos(self, class_path, label):
-        # List all subdirectories (each is a video)
-        video_folders = [f.path for f in os.scandir(class_path) if f.is_dir()]
-        for video_folder in video_folders:
-            # Check if video folder has images
-            frames = sorted(glob.glob(os.path.join(video_folder, '*.jpg')) + 
-                          glob.glob(os.path.join(video_folder, '*.png')))
-            
-            # Filter out videos with too few frames
-            if len(frames) >= self.seq_len:
-                self.video_paths.append(video_folder)
-                self.labels.append(label)
+    def __getstate__(self):
+        # Spawned workers re-open the same build's memory map instead of
+        # receiving a copy. A manifest that couldn't be saved (read-only
+        # dataset) is sent whole rather than listed again in every worker.
+        state = self.__dict__.copy()
+        if self.manifest.build is not None:
+            state['manifest'] = self.manifest.build
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if isinstance(self.manifest, str):
+            build = self.manifest
+            self.manifest = FrameManifest.open(self.manifest_dir, build)
+            if self.manifest is None:
+                raise RuntimeError(f"Frame manifest build {build} in {self.manifest_dir} is gone "
+                                   f"(rebuilt twice since); recreate the dataset")
 
     def __len__(self):
-        return len(self.video_paths)
+        return len(self.indices)
+
+    def cache_key(self, idx):
+        """
+        Identity of item `idx` for CachedDataset: the video folder and its
+        mtime, frame count, seq_len and transform.
+        """
+        row = int(self.indices[idx])
+        return "|".join([
+            os.path.abspath(self.root_dir),
+            self.manifest.videos[row].decode(),
+            str(int(self.manifest.video_mtimes[row])),
+            str(self.manifest.frame_count(row)),
+            str(self.seq_len),
+            repr(self.transform),
+        ])
 
     def __getitem__(self, idx):
-        video_path = self.video_paths[idx]
-        label = self.labels[idx]
+        row = int(self.indices[idx])
+        video_path = os.path.join(self.root_dir, self.manifest.videos[row].decode())
+        label = int(self.manifest.labels[row])
         
         # Get all frames
-        all_frames = sorted(glob.glob(os.path.join(video_path, '*.jpg')) + 
-                          glob.glob(os.path.join(video_path, '*.png')))
+        all_frames = [os.path.join(video_path, name) for name in self.manifest.frame_names(row)]
         
         # Sampling Strategy
         # If we have more frames than needed, sample uniformly
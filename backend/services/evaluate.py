@@ -3,25 +3,29 @@ import torch
 import torch.nn as nn
 from torch.utils.data import DataLoader
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-import seaborn as sns
-import matplotlib.pyplot as plt
 import numpy as np
 import logging
 
 try:
     from backend.services.ai_models import DeepFakeDetector
     from backend.services.dataset import DeepFakeDataset, get_transforms
+    from backend.services.shards import ShardDataset
+    from backend.services.clip_cache import CachedDataset
 except ImportError:
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
     from backend.services.ai_models import DeepFakeDetector
     from backend.services.dataset import DeepFakeDataset, get_transforms
+    from backend.services.shards import ShardDataset
+    from backend.services.clip_cache import CachedDataset
 
 # Configuration
 CONFIG = {
     'data_dir': 'dataset_ready', # Same as train folder
+    'shard_dir': None, # Packed shards of the evaluation split, used instead of data_dir when set
     'batch_size': 4,
     'seq_len': 20,
+    'cache_dir': None, # Clip cache on disk (e.g. train.py's val_cache_dir); skips image decoding on later runs
     'weights_path': 'best_model.pth',
     'device': 'cuda' if torch.cuda.is_available() else 'cpu'
 }
@@ -29,43 +33,66 @@ CONFIG = {
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-def evaluate_model():
-    # 1. Load Data
-    # In practice, point to a specific 'test' folder
-    dataset = DeepFakeDataset(
-        root_dir=CONFIG['data_dir'], 
-        seq_len=CONFIG['seq_len'],
-        transform=get_transforms(mode='val'),
-        mode='val'
-    )
-    
-    loader = DataLoader(dataset, batch_size=CONFIG['batch_size'], shuffle=False, num_workers=4)
-    
-    # 2. Load Model
-    model = DeepFakeDetector(weights_path=CONFIG['weights_path'])
-    model.to(CONFIG['device'])
-    model.eval()
+def build_loader(data_dir=None, batch_size=None, num_workers=4, shard_dir=None, cache_dir=None):
+    """
+    DataLoader over the evaluation split, with the deterministic 'val' transforms.
+    Reads packed shards instead of JPEG folders when a shard dir is given, and
+    goes through the clip cache when a cache dir is given.
+    """
+    shard_dir = shard_dir or CONFIG['shard_dir']
+    if shard_dir and not data_dir:
+        dataset = ShardDataset(shard_dir, seq_len=CONFIG['seq_len'], mode='val')
+    else:
+        # In practice, point to a specific 'test' folder
+        dataset = DeepFakeDataset(
+            root_dir=data_dir or CONFIG['data_dir'], 
+            seq_len=CONFIG['seq_len'],
+            transform=get_transforms(mode='val'),
+            mode='val'
+        )
+
+    cache_dir = cache_dir or CONFIG['cache_dir']
+    if cache_dir:
+        dataset = CachedDataset(dataset, cache_dir)
     
+    return DataLoader(dataset, batch_size=batch_size or CONFIG['batch_size'], shuffle=False, num_workers=num_workers)
+
+def predict(score_batch, loader):
+    """
+    Run `score_batch` (inputs (B, Seq, C, H, W) -> probabilities (B, 1)) over
+    the loader and return flat (predictions, labels) arrays.
+    """
     all_preds = []
     all_labels = []
     
-    logger.info("Starting Evaluation...")
-    
     with torch.no_grad():
         for inputs, labels in loader:
-            inputs = inputs.to(CONFIG['device'])
-            labels = labels.to(CONFIG['device'])
-            
-            outputs = model(inputs)
+            outputs = score_batch(inputs)
             preds = (outputs > 0.5).float()
             
             all_preds.extend(preds.cpu().numpy())
             all_labels.extend(labels.cpu().numpy())
+
+    return np.array(all_preds).flatten(), np.array(all_labels).flatten()
+
+def evaluate_model():
+    # Plotting libraries are only needed for the full report
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+
+    # 1. Load Data
+    loader = build_loader()
+    
+    # 2. Load Model
+    model = DeepFakeDetector(weights_path=CONFIG['weights_path'])
+    model.to(CONFIG['device'])
+    model.eval()
+    
+    logger.info("Starting Evaluation...")
+    
+    all_preds, all_labels = predict(lambda inputs: model(inputs.to(CONFIG['device'])), loader)
             
     # 3. Compute Metrics
-    all_preds = np.array(all_preds).flatten()
-    all_labels = np.array(all_labels).flatten()
-    
     acc = accuracy_score(all_labels, all_preds)
     report = classification_report(all_labels, all_preds, target_names=['Real', 'Fake'])
     conf_matrix = confusion_matrix(all_labels, all_preds)
@@ -87,7 +114,7 @@ def evaluate_model():
 if __name__ == "__main__":
     if not os.path.exists(CONFIG['weights_path']):
          logger.error(f"Weights file {CONFIG['weights_path']} not found. Train the model first.")
-    elif not os.path.exists(CONFIG['data_dir']):
+    elif not os.path.exists(CONFIG['shard_dir'] or CONFIG['data_dir']):
          logger.error(f"Dataset path {CONFIG['data_dir']} does not exist.")
     else:
         evaluate_model()
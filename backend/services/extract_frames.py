@@ -1,12 +1,52 @@
 import cv2
 import os
+import sys
 import glob
 from tqdm import tqdm
 import argparse
 
-def extract_faces_from_video(video_path, output_folder, face_cascade, max_frames=20):
+try:
+    from backend.services.face_localizer import FaceLocalizer, load_face_cascade
+    from backend.services import ffmpeg_decode
+except ImportError:
+    # Fallback for running script directly from backend/services
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from backend.services.face_localizer import FaceLocalizer, load_face_cascade
+    from backend.services import ffmpeg_decode
+
+def _opencv_frames(cap, indices):
+    # Decodes every frame, keeps the sampled ones
+    frame_count = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame_count in indices:
+            yield frame_count, frame
+        frame_count += 1
+
+def _ffmpeg_frames(video_path, cap, indices):
+    # Only the sampled frames leave the ffmpeg process, in index order. If
+    # ffmpeg fails, the rest of the video is decoded with OpenCV instead
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    frames = ffmpeg_decode.decode_frames(video_path, ffmpeg_decode.at_indices(indices), width, height)
+    last = -1
+    try:
+        for frame_count, frame in zip(sorted(indices), frames):
+            last = frame_count
+            yield frame_count, frame
+    except ffmpeg_decode.FFmpegDecodeError as e:
+        print(f"Warning: ffmpeg failed on {video_path} ({e}), decoding with OpenCV.")
+        yield from _opencv_frames(cap, {index for index in indices if index > last})
+
+def extract_faces_from_video(video_path, output_folder, face_cascade, max_frames=20, decoder='opencv'):
     """
     Reads a video, detects faces in frames, and saves the crops.
+
+    decoder='ffmpeg' selects the sampled frames inside an ffmpeg subprocess
+    instead of reading every frame through OpenCV (same frames, same crops),
+    falling back to OpenCV for the video if ffmpeg fails.
     """
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
@@ -17,60 +57,45 @@ def extract_faces_from_video(video_path, output_folder, face_cascade, max_frames
     # Simple sampling strategy: take 'max_frames' evenly spaced
     indices = set([int(i * total_frames / max_frames) for i in range(max_frames)])
     
-    frame_count = 0
+    localizer = FaceLocalizer(face_cascade, detect_every=1, detect_width=None)
     saved_count = 0
+
+    if decoder == 'ffmpeg':
+        frames = _ffmpeg_frames(video_path, cap, indices)
+    else:
+        frames = _opencv_frames(cap, indices)
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-            
-        if frame_count in indices or max_frames is None:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-            
-            # If multiple faces, take the largest one
-            if len(faces) > 0:
-                # Retrieve the largest face
-                max_area = 0
-                max_face = None
-                for (x, y, w, h) in faces:
-                    if w * h > max_area:
-                        max_area = w * h
-                        max_face = (x, y, w, h)
-                
-                x, y, w, h = max_face
-                
-                # Add a little margin
-                margin = int(w * 0.2)
-                x1 = max(0, x - margin)
-                y1 = max(0, y - margin)
-                x2 = min(frame.shape[1], x + w + margin)
-                y2 = min(frame.shape[0], y + h + margin)
-                
-                crop = frame[y1:y2, x1:x2]
-                
-                # Save
-                save_path = os.path.join(output_folder, f"frame_{frame_count}.jpg")
-                cv2.imwrite(save_path, crop)
-                saved_count += 1
+    for frame_count, frame in frames:
+        # Sampled frames are far apart, so detect on every one of them
+        # (full resolution); serving uses the same crop via FaceLocalizer
+        crop, found = localizer.crop(frame)
+        
+        # Frames without a face are not used for training
+        if found:
+            # Save
+            save_path = os.path.join(output_folder, f"frame_{frame_count}.jpg")
+            cv2.imwrite(save_path, crop)
+            saved_count += 1
         
-        frame_count += 1
         if saved_count >= max_frames:
             break
             
+    frames.close()
     cap.release()
 
-def main(download_dir, output_root):
+def main(download_dir, output_root, decoder='opencv'):
     # Setup Face Detector (Haar Cascade is fast and built-in to OpenCV distributions usually)
     # Ensure you have the XML file or use cv2.data.haarcascades
-    cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-    face_cascade = cv2.CascadeClassifier(cascade_path)
-    
-    if face_cascade.empty():
-        print("Error: Could not load Haar Cascade XML. Make sure opencv-python is installed correctly.")
+    try:
+        face_cascade = load_face_cascade()
+    except RuntimeError as e:
+        print(f"Error: {e}")
         return
 
+    if decoder == 'ffmpeg' and not ffmpeg_decode.available():
+        print("Warning: ffmpeg not installed, decoding with OpenCV.")
+        decoder = 'opencv'
+
     # Define Mappings
     # Source Folder Name -> Target Class ('real' or 'fake')
     mapping = {
@@ -104,12 +129,13 @@ def main(download_dir, output_root):
             if len(os.listdir(save_dir)) > 0:
                 continue
                 
-            extract_faces_from_video(video_path, save_dir, face_cascade)
+            extract_faces_from_video(video_path, save_dir, face_cascade, decoder=decoder)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--input', type=str, required=True, help='Root directory where you downloaded FF++ (folder containing original_sequences, etc)')
     parser.add_argument('--output', type=str, required=True, help='Root directory for the ready-to-train dataset')
+    parser.add_argument('--decoder', choices=['opencv', 'ffmpeg'], default='opencv', help='Frame decoder (ffmpeg skips unsampled frames in the decoder)')
     args = parser.parse_args()
     
-    main(args.input, args.output)
+    main(args.input, args.output, args.decoder)
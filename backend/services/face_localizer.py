@@ -0,0 +1,143 @@
+import cv2
+
+
+def load_face_cascade():
+    """
+    OpenCV's bundled frontal face Haar cascade.
+    """
+    if not hasattr(cv2, 'CascadeClassifier'):
+        # OpenCV 5 moved the Haar cascades out of the main package
+        raise RuntimeError(f"OpenCV {cv2.__version__} has no CascadeClassifier. Install opencv-python 4.x.")
+    cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+    face_cascade = cv2.CascadeClassifier(cascade_path)
+    if face_cascade.empty():
+        raise RuntimeError("Could not load Haar Cascade XML. Make sure opencv-python is installed correctly.")
+    return face_cascade
+
+
+def largest_face(faces):
+    """
+    The (x, y, w, h) box with the largest area, or None.
+    """
+    best = None
+    for (x, y, w, h) in faces:
+        if best is None or w * h > best[2] * best[3]:
+            best = (int(x), int(y), int(w), int(h))
+    return best
+
+
+def expand_box(box, frame_shape, margin=0.2):
+    """
+    Grow an (x, y, w, h) face box by `margin` of its width on every side,
+    clipped to the frame. Returns (x1, y1, x2, y2).
+    """
+    x, y, w, h = box
+    pad = int(w * margin)
+    x1 = max(0, x - pad)
+    y1 = max(0, y - pad)
+    x2 = min(frame_shape[1], x + w + pad)
+    y2 = min(frame_shape[0], y + h + pad)
+    return x1, y1, x2, y2
+
+
+class FaceLocalizer:
+    """
+    Finds the main face in a sequence of frames and crops around it, the same
+    way for dataset extraction and for serving.
+
+    The Haar detector only runs on keyframes (every `detect_every` calls, or
+    when tracking is lost). In between, the previous face patch is followed
+    with template matching in a small search area around the last box, which
+    is far cheaper than detection, so detection cost stays flat as more frames
+    are sampled.
+
+    Args:
+        face_cascade: Detector (defaults to `load_face_cascade()`).
+        detect_every: Run detection on every n-th frame; 1 detects on all.
+        margin: Crop margin as a fraction of the face width.
+        detect_width: Frames wider than this are downscaled for detection.
+        min_track_score: Normalised match score below which tracking is
+                         considered lost and the detector runs again.
+    """
+    def __init__(self, face_cascade=None, detect_every=5, margin=0.2, detect_width=640, min_track_score=0.6):
+        self.face_cascade = face_cascade if face_cascade is not None else load_face_cascade()
+        self.detect_every = max(1, int(detect_every))
+        self.margin = margin
+        self.detect_width = detect_width
+        self.min_track_score = min_track_score
+
+        self.detections = 0
+        self.tracked = 0
+        self.misses = 0
+        self._since_detect = 0
+        self._box = None
+        self._template = None
+
+    def locate(self, frame):
+        """
+        (x, y, w, h) of the main face in a BGR frame, or None.
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        box = None
+        if self._box is not None and self._since_detect < self.detect_every:
+            box = self._track(gray)
+            if box is not None:
+                self.tracked += 1
+        if box is None:
+            box = self._detect(gray)
+            self._since_detect = 0
+            if box is not None:
+                self.detections += 1
+
+        self._since_detect += 1
+        if box is None:
+            self.misses += 1
+            self._box = self._template = None
+            return None
+
+        x, y, w, h = box
+        self._box = box
+        self._template = gray[y:y + h, x:x + w].copy()
+        return box
+
+    def crop(self, frame):
+        """
+        Face crop (with margin) of a BGR frame, or the full frame when no face
+        is found. Returns (image, found).
+        """
+        box = self.locate(frame)
+        if box is None:
+            return frame, False
+        x1, y1, x2, y2 = expand_box(box, frame.shape, self.margin)
+        return frame[y1:y2, x1:x2], True
+
+    def stats(self):
+        return {'detections': self.detections, 'tracked': self.tracked, 'misses': self.misses}
+
+    def _detect(self, gray):
+        scale = 1.0
+        if self.detect_width and gray.shape[1] > self.detect_width:
+            scale = self.detect_width / gray.shape[1]
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        box = largest_face(self.face_cascade.detectMultiScale(gray, 1.1, 4))
+        if box is None:
+            return None
+        return tuple(int(round(value / scale)) for value in box)
+
+    def _track(self, gray):
+        x, y = self._box[:2]
+        h, w = self._template.shape
+        # Search within one face size around the previous box
+        sx1, sy1 = max(0, x - w), max(0, y - h)
+        sx2, sy2 = min(gray.shape[1], x + 2 * w), min(gray.shape[0], y + 2 * h)
+        search = gray[sy1:sy2, sx1:sx2]
+        if search.shape[0] < h or search.shape[1] < w:
+            return None
+
+        scores = cv2.matchTemplate(search, self._template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (mx, my) = cv2.minMaxLoc(scores)
+        if score < self.min_track_score:
+            return None
+        return sx1 + mx, sy1 + my, w, h
@@ -0,0 +1,73 @@
+import os
+import hashlib
+import tempfile
+import logging
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_bytes):
+        super(UploadTooLarge, self).__init__(f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+        self.max_bytes = max_bytes
+
+
+def choose_spool_dir(expected_size, memory_threshold, memory_dir='/dev/shm', disk_dir=None):
+    """
+    Pick where to spool an upload.
+
+    Uploads known to be below `memory_threshold` bytes go to a tmpfs directory
+    (RAM backed on Linux) so writing and then decoding them never touches the
+    disk. Everything else, including uploads of unknown size, goes to
+    `disk_dir` (None means the system temp directory).
+    """
+    if (expected_size is not None and expected_size <= memory_threshold
+            and memory_dir and os.path.isdir(memory_dir) and os.access(memory_dir, os.W_OK)):
+        return memory_dir
+    return disk_dir or None
+
+
+async def spool_chunks(chunks, suffix='', max_bytes=None, spool_dir=None):
+    """
+    Write an async iterator of byte chunks to a temporary file.
+
+    The content is hashed as it is written and the size cap is enforced per
+    chunk, so an oversized upload is rejected as soon as it crosses the limit.
+    On any failure (size cap, client disconnect, I/O error) the partial file
+    is removed before the exception propagates.
+
+    Returns:
+        (path, sha256 hex digest, size in bytes)
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=spool_dir)
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                hasher.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    return path, hasher.hexdigest(), size
+
+
+async def iter_upload_file(upload, chunk_size=CHUNK_SIZE):
+    """
+    Async chunk iterator over a FastAPI UploadFile.
+    """
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+import uuid
+import queue
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Same ids as the `steps` list returned by analyze_video
+STEP_IDS = [1, 2, 3, 4]
+TERMINAL_STATUSES = ('completed', 'failed')
+
+
+class Job:
+    """
+    One submitted video. Mutated only through JobStore, which bumps `version`
+    on every change so watchers can cheaply tell whether anything happened.
+    """
+    def __init__(self, filename, video_path):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.video_path = video_path
+        self.status = 'queued'
+        self.steps = [{"id": step_id, "status": "pending"} for step_id in STEP_IDS]
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.version = 0
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "steps": [dict(step) for step in self.steps],
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class JobStore:
+    """
+    In-memory job registry plus a dispatcher feeding jobs into an AnalysisPool.
+
+    Submitted jobs wait in a bounded backlog; the dispatcher thread blocks on
+    the pool's admission queue, so bulk submissions never bypass the pool's
+    concurrency limit. Finished jobs are kept for `retention_seconds`.
+
+    Args:
+        pool: AnalysisPool running the analyses.
+        analyze: Callable (video_path, progress=None) -> analyze_video style dict.
+        max_pending: Backlog size for jobs not yet admitted into the pool.
+        retention_seconds: How long finished jobs stay queryable.
+    """
+    def __init__(self, pool, analyze, max_pending=64, retention_seconds=3600):
+        self.pool = pool
+        self.analyze = analyze
+        self.retention_seconds = retention_seconds
+
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pending = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._submit_lock = threading.Lock()
+
+        self._dispatcher = threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True)
+        self._dispatcher.start()
+
+    def free_slots(self):
+        return self._pending.maxsize - self._pending.qsize()
+
+    def create(self, filename, video_path):
+        """
+        Register a job for an already spooled video and queue it.
+        Raises queue.Full if the backlog is full.
+        """
+        return self.create_many([(filename, video_path)])[0]
+
+    def create_many(self, uploads):
+        """
+        Register and queue one job per (filename, video_path), all or none:
+        raises queue.Full without queueing anything if the backlog can't take
+        every job.
+        """
+        self._prune()
+        jobs = [Job(filename, video_path) for filename, video_path in uploads]
+        # The dispatcher only takes from the backlog, so under the submit lock
+        # the free slots can't shrink between the check and the puts
+        with self._submit_lock:
+            if self.free_slots() < len(jobs):
+                raise queue.Full
+            with self._lock:
+                for job in jobs:
+                    self._jobs[job.id] = job
+            for job in jobs:
+                self._pending.put_nowait(job)
+        return jobs
+
+    def get(self, job_id):
+        """
+        Returns (snapshot dict, version) or (None, None) for unknown ids.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None, None
+            return job.to_dict(), job.version
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"backlog": self._pending.qsize(), "jobs": counts}
+
+    def _update(self, job, **changes):
+        with self._lock:
+            for key, value in changes.items():
+                setattr(job, key, value)
+            job.updated_at = time.time()
+            job.version += 1
+
+    def _set_step(self, job, step_id, status):
+        with self._lock:
+            for step in job.steps:
+                if step["id"] == step_id:
+                    step["status"] = status
+            job.updated_at = time.time()
+            job.version += 1
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.status in TERMINAL_STATUSES and job.updated_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def _dispatch(self):
+        while True:
+            job = self._pending.get()
+            self.pool.try_acquire(blocking=True)
+            self._update(job, status='running')
+
+            # Progress callbacks cannot cross a process boundary; process pools
+            # only report the final step statuses.
+            kwargs = {}
+            if self.pool.kind == 'thread':
+                kwargs['progress'] = lambda step_id, status, job=job: self._set_step(job, step_id, status)
+
+            try:
+                future = self.pool.submit(self.analyze, job.video_path, **kwargs)
+            except Exception as e:
+                self.pool.release()
+                self._finish(job, None, e)
+                continue
+
+            def _done(f, job=job):
+                error = f.exception()
+                self._finish(job, f.result() if error is None else None, error)
+
+            future.add_done_callback(_done)
+
+    def _finish(self, job, output, error):
+        if os.path.exists(job.video_path):
+            os.remove(job.video_path)
+
+        if error is None and output.get("status") == "failed":
+            error = output.get("error", "Analysis failed")
+
+        if error is not None:
+            logger.error(f"Job {job.id} failed: {error}")
+            steps = [dict(step, status="failed") if step["status"] == "running" else dict(step) for step in job.steps]
+            self._update(job, status='failed', error=str(error), steps=steps)
+        else:
+            result = output["result"]
+            self._update(job, status='completed', result=result, steps=[dict(step) for step in result["steps"]])
@@ -0,0 +1,99 @@
+import os
+import threading
+import torch
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_MB = 1024 * 1024
+
+# PeakMemory blocks running in this process. torch's CUDA peak counter is
+# per device, not per block, so it is only meaningful for a block that ran alone.
+_live_lock = threading.Lock()
+_live = set()
+
+
+def current_rss():
+    """
+    Resident set size of this process in bytes, or None where /proc is
+    unavailable.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class PeakMemory:
+    """
+    Context manager tracking the peak memory of this process while the block
+    runs, by sampling RSS on a background thread every `interval` seconds
+    (plus torch's own peak counter on CUDA).
+
+    RSS is per process, so with several analyses running on threads of the
+    same process the figures include their memory too; with one analysis per
+    worker process they are that analysis's own. The CUDA peak counter is
+    global to the device and reset on entry, so `peak_cuda_mb` is only
+    reported for blocks that didn't overlap another PeakMemory in this
+    process.
+
+    Args:
+        interval: Seconds between RSS samples. Allocations that come and go
+                  faster than this can be missed.
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start_rss = None
+        self.peak_rss = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._cuda = torch.cuda.is_available()
+        self.overlapped = False
+
+    def __enter__(self):
+        self.start_rss = self.peak_rss = current_rss()
+        if self.start_rss is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        with _live_lock:
+            if _live:
+                # Neither this block's nor the running ones' CUDA peak is
+                # their own any more; don't reset theirs either
+                self.overlapped = True
+                for other in _live:
+                    other.overlapped = True
+            elif self._cuda:
+                torch.cuda.reset_peak_memory_stats()
+            _live.add(self)
+        return self
+
+    def __exit__(self, *exc):
+        with _live_lock:
+            _live.discard(self)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._update()
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._update()
+
+    def _update(self):
+        rss = current_rss()
+        if rss is not None and rss > self.peak_rss:
+            self.peak_rss = rss
+
+    def report(self):
+        """
+        {'peak_rss_mb', 'rss_growth_mb'} (growth over the RSS at entry), plus
+        'peak_cuda_mb' on GPU when this block ran alone. Empty when memory
+        can't be measured here.
+        """
+        report = {}
+        if self.peak_rss is not None:
+            report['peak_rss_mb'] = round(self.peak_rss / _MB, 1)
+            report['rss_growth_mb'] = round((self.peak_rss - self.start_rss) / _MB, 1)
+        if self._cuda and not self.overlapped:
+            report['peak_cuda_mb'] = round(torch.cuda.max_memory_allocated() / _MB, 1)
+        return report
@@ -0,0 +1,175 @@
+import time
+import threading
+from contextlib import contextmanager
+from . import profiling
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, ProcessCollector, CONTENT_TYPE_LATEST, generate_latest,
+)
+
+# Pipeline stages, in order:
+#   upload_save  - spooling the upload to a temp file
+#   video_open   - opening the container and reading stream info
+#   frame_decode - cv2 decode of every frame read (sampled or not), per video
+#   face_crop    - face detection / tracking, per video
+#   transform    - colour conversion, resize and normalisation, per video
+#   cnn_forward  - EfficientNet features (after the embedding cache), per call
+#   head         - BiLSTM + classifier, per call
+#   total        - end-to-end /analyze request
+STAGES = ('upload_save', 'video_open', 'frame_decode', 'face_crop', 'transform', 'cnn_forward', 'head', 'total')
+
+# Own registry rather than the global default, so importing this module under
+# two package paths (services.* and backend.services.*) doesn't clash
+REGISTRY = CollectorRegistry()
+ProcessCollector(registry=REGISTRY)
+
+STAGE_SECONDS = Histogram(
+    'voxear_stage_seconds',
+    'Latency of each analysis pipeline stage',
+    ['stage'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+    registry=REGISTRY,
+)
+
+HTTP_REQUESTS = Counter(
+    'voxear_http_requests_total',
+    'HTTP requests by route and status code',
+    ['method', 'route', 'status'],
+    registry=REGISTRY,
+)
+
+ANALYSES = Counter(
+    'voxear_analyses_total',
+    'Video analyses by outcome (completed, failed, cached)',
+    ['outcome'],
+    registry=REGISTRY,
+)
+
+FRAMES_PROCESSED = Counter(
+    'voxear_frames_processed_total',
+    'Sampled frames decoded and preprocessed',
+    registry=REGISTRY,
+)
+
+ANALYSIS_MEMORY = Histogram(
+    'voxear_analysis_memory_growth_bytes',
+    'Peak RSS growth of the worker process during one analysis (decode + inference)',
+    buckets=tuple(mb * 1024 * 1024 for mb in (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)),
+    registry=REGISTRY,
+)
+
+FRAMES_SKIPPED = Counter(
+    'voxear_frames_skipped_total',
+    'Sampled frames dropped as near-duplicates by adaptive sampling',
+    registry=REGISTRY,
+)
+
+MODEL_LOAD_SECONDS = Gauge(
+    'voxear_model_load_seconds',
+    'Time spent in each model loading / warm-up phase',
+    ['phase'],
+    registry=REGISTRY,
+)
+
+WORKERS_IN_FLIGHT = Gauge('voxear_workers_in_flight', 'Analyses admitted to the worker pool (running + queued)', registry=REGISTRY)
+WORKERS_RUNNING = Gauge('voxear_workers_running', 'Analyses currently running on a worker', registry=REGISTRY)
+WORKERS_QUEUE_DEPTH = Gauge('voxear_workers_queue_depth', 'Analyses waiting for a free worker', registry=REGISTRY)
+JOBS_BACKLOG = Gauge('voxear_jobs_backlog', 'Background jobs waiting for a worker slot', registry=REGISTRY)
+
+
+# Metrics that analyses update from worker processes, by name (see `replay`)
+_WORKER_METRICS = {metric._name: metric for metric in (
+    STAGE_SECONDS, ANALYSES, FRAMES_PROCESSED, ANALYSIS_MEMORY, FRAMES_SKIPPED, MODEL_LOAD_SECONDS,
+)}
+
+# Updates made on this thread while `collecting` (None when off)
+_collected = threading.local()
+
+
+def _update(metric, method, value, labels):
+    getattr(metric.labels(**labels) if labels else metric, method)(value)
+    records = getattr(_collected, 'records', None)
+    if records is not None:
+        records.append((metric._name, method, value, labels))
+
+
+def count(metric, amount=1, **labels):
+    """
+    Increment a counter (use this rather than .inc() for metrics updated
+    during an analysis, so process workers can report them).
+    """
+    _update(metric, 'inc', amount, labels)
+
+
+def measure(metric, value, **labels):
+    """
+    Observe a histogram value (see `count`).
+    """
+    _update(metric, 'observe', value, labels)
+
+
+def observe(stage, seconds):
+    measure(STAGE_SECONDS, seconds, stage=stage)
+    profiling.record_stage(stage, seconds)
+
+
+@contextmanager
+def collecting():
+    """
+    Keep a list of every `count` / `measure` made on this thread inside the
+    block. Worker processes send it back with their result, and the API
+    process applies it to its own registry with `replay`, since /metrics only
+    exports the API process's registry.
+    """
+    _collected.records = records = []
+    try:
+        yield records
+    finally:
+        _collected.records = None
+
+
+def replay(records):
+    """
+    Apply updates collected in another process to this process's metrics.
+    """
+    for name, method, value, labels in records:
+        metric = _WORKER_METRICS[name]
+        getattr(metric.labels(**labels) if labels else metric, method)(value)
+
+
+@contextmanager
+def timed(stage):
+    """
+    Record the duration of the block under `stage`, even if it raises.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - started)
+
+
+def record_model_load(timings):
+    """
+    Export {phase: seconds} model load timings as gauges.
+    """
+    for phase, seconds in timings.items():
+        _update(MODEL_LOAD_SECONDS, 'set', seconds, {'phase': phase})
+
+
+def bind_pool(pool, job_store=None):
+    """
+    Read the worker pool (and job backlog) gauges from their live stats at
+    scrape time.
+    """
+    WORKERS_IN_FLIGHT.set_function(lambda: pool.stats()['in_flight'])
+    WORKERS_RUNNING.set_function(lambda: pool.stats()['running'])
+    WORKERS_QUEUE_DEPTH.set_function(lambda: pool.stats()['queue_depth'])
+    if job_store is not None:
+        JOBS_BACKLOG.set_function(lambda: job_store.stats()['backlog'])
+
+
+def render():
+    """
+    Returns (body, content type) for a /metrics response.
+    """
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
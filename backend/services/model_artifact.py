@@ -0,0 +1,86 @@
+import os
+import time
+import argparse
+import logging
+import torch
+
+try:
+    from .ai_models import DeepFakeDetector
+except ImportError:
+    # Fallback for running script directly from backend/services
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from services.ai_models import DeepFakeDetector
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = 'voxear-detector/1'
+
+
+def save_artifact(model, output_path):
+    """
+    Save architecture config and weights as one self-contained file.
+    """
+    checkpoint = {
+        'format': ARTIFACT_FORMAT,
+        'config': dict(model.config),
+        'state_dict': model.state_dict(),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    torch.save(checkpoint, output_path)
+
+
+def load_artifact(path, timings=None):
+    """
+    Load a DeepFakeDetector from an artifact written by `save_artifact`.
+
+    The file is memory-mapped and the module is built on the meta device, so
+    nothing is randomly initialised or downloaded and weights are paged in
+    lazily instead of being copied into freshly allocated tensors.
+
+    Args:
+        path: Artifact path.
+        timings: Optional dict that receives per-phase durations in seconds.
+    """
+    timings = timings if timings is not None else {}
+
+    started = time.perf_counter()
+    checkpoint = torch.load(path, map_location='cpu', mmap=True, weights_only=True)
+    if checkpoint.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} is not a {ARTIFACT_FORMAT} artifact")
+    timings['read'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with torch.device('meta'):
+        model = DeepFakeDetector(pretrained_backbone=False, **checkpoint['config'])
+    timings['construct'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    model.load_state_dict(checkpoint['state_dict'], assign=True)
+    timings['load_weights'] = time.perf_counter() - started
+
+    logger.info(f"Loaded model artifact {path} ({checkpoint['config']})")
+    return model
+
+
+def export_artifact(weights_path, output_path, hidden_size=128, num_layers=1):
+    """
+    Convert a state dict saved by train.py into a self-contained artifact.
+    """
+    model = DeepFakeDetector(hidden_size=hidden_size, num_layers=num_layers, pretrained_backbone=False)
+    state_dict = torch.load(weights_path, map_location='cpu', weights_only=True)
+    model.load_state_dict(state_dict)
+    save_artifact(model, output_path)
+    logger.info(f"Wrote model artifact {output_path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Package trained weights into a self-contained model artifact.')
+    parser.add_argument('--weights', type=str, required=True, help='State dict saved by train.py (e.g. best_model.pth)')
+    parser.add_argument('--output', type=str, required=True, help='Artifact path (e.g. backend/weights/model.pt)')
+    parser.add_argument('--hidden-size', type=int, default=128)
+    parser.add_argument('--num-layers', type=int, default=1)
+    args = parser.parse_args()
+
+    export_artifact(args.weights, args.output, hidden_size=args.hidden_size, num_layers=args.num_layers)
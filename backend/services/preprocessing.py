@@ -1,80 +1,660 @@
 
 import cv2
+import math
+import time
+import bisect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import torch
 import numpy as np
-from torchvision import transforms
+from . import metrics, ffmpeg_decode
+from .config import CONFIG
+from .face_localizer import FaceLocalizer, load_face_cascade
 
-def process_video(video_path: str, max_duration: int = 30, fps_sample: int = 3) -> torch.Tensor:
+logger = logging.getLogger(__name__)
+
+# One detector per thread: cv2.CascadeClassifier isn't safe to share
+_cascades = threading.local()
+_cascade_error = None
+
+def _face_localizer():
     """
-    Process a video file into a tensor suitable for the AI model.
-    
-    Processing steps:
-    1. Load video.
-    2. Trim to first 'max_duration' seconds.
-    3. Sample frames at 'fps_sample' rate.
-    4. Resize frames to 224x224.
-    5. Normalize using ImageNet mean/std.
-    
+    A fresh FaceLocalizer for one video, or None (full frames) if the face
+    detector can't be loaded.
+    """
+    global _cascade_error
+    if _cascade_error is not None:
+        return None
+    if getattr(_cascades, 'face_cascade', None) is None:
+        try:
+            _cascades.face_cascade = load_face_cascade()
+        except RuntimeError as e:
+            _cascade_error = e
+            logger.warning(f"Face cropping disabled, using full frames: {e}")
+            return None
+    return FaceLocalizer(
+        _cascades.face_cascade,
+        detect_every=CONFIG['face_detect_every'],
+        margin=CONFIG['face_margin'],
+    )
+
+SAMPLERS = ('read', 'grab', 'seek')
+FRAME_SIZE = 224
+
+# ImageNet stats on the 0-255 scale, so uint8 frames normalise in one pass
+_MEAN_255 = torch.tensor([0.485, 0.456, 0.406]).view(1, 3, 1, 1) * 255
+_INV_STD_255 = 1.0 / (torch.tensor([0.229, 0.224, 0.225]).view(1, 3, 1, 1) * 255)
+
+def preprocess_frame(frame, out=None):
+    """
+    Resize a BGR frame (or face crop) to a 224x224 RGB uint8 image.
+
+    Args:
+        frame: BGR uint8 image from OpenCV.
+        out: Optional (224, 224, 3) uint8 array to write into (e.g. one slot
+             of a preallocated batch buffer).
+    """
+    height, width = frame.shape[:2]
+    # Area averaging when shrinking (anti-aliased, like PIL's resize), bilinear when enlarging
+    interpolation = cv2.INTER_AREA if height >= FRAME_SIZE and width >= FRAME_SIZE else cv2.INTER_LINEAR
+    out = cv2.resize(frame, (FRAME_SIZE, FRAME_SIZE), dst=out, interpolation=interpolation)
+    return cv2.cvtColor(out, cv2.COLOR_BGR2RGB, dst=out)
+
+def normalize_frames(frames):
+    """
+    uint8 RGB frames (N, H, W, 3) -> normalised float (N, 3, H, W), as one
+    batched op on whatever device the frames are on. Float frames are assumed
+    to be normalised already and are returned unchanged.
+    """
+    if frames.dtype != torch.uint8:
+        return frames
+    batch = frames.permute(0, 3, 1, 2).to(torch.float32, memory_format=torch.contiguous_format)
+    return batch.sub_(_MEAN_255.to(batch.device)).mul_(_INV_STD_255.to(batch.device))
+
+def sample_frames(cap, frame_interval, sampler='grab', start=0):
+    """
+    Yield (frame index, BGR frame) for every `frame_interval`-th frame of an
+    opened capture, starting at frame `start` (a multiple of the interval).
+
+    All samplers pick the same frames:
+      'read' - decode and convert every frame, keep the sampled ones.
+      'grab' - `grab()` (demux + decode, no retrieve/convert) the skipped frames.
+      'seek' - jump straight to each sampled frame; pays off when the interval
+               is long compared to the keyframe spacing.
+    """
+    if sampler not in SAMPLERS:
+        raise ValueError(f"Unknown frame sampler: {sampler} (expected one of {SAMPLERS})")
+
+    if start and not cap.set(cv2.CAP_PROP_POS_FRAMES, start):
+        return
+
+    if sampler == 'seek':
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        index = start
+        position = start
+        while total <= 0 or index < total:
+            if index != position and not cap.set(cv2.CAP_PROP_POS_FRAMES, index):
+                break
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield index, frame
+            position = index + 1
+            index += frame_interval
+        return
+
+    index = start
+    while True:
+        if sampler == 'grab' and index % frame_interval:
+            if not cap.grab():
+                break
+        else:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index % frame_interval == 0:
+                yield index, frame
+        index += 1
+
+_ffmpeg_available = None
+
+def _ffmpeg_ready():
+    global _ffmpeg_available
+    if _ffmpeg_available is None:
+        _ffmpeg_available = ffmpeg_decode.available()
+        if not _ffmpeg_available:
+            logger.warning("ffmpeg is not installed; decoding with OpenCV (and without keyframe sampling)")
+    return _ffmpeg_available
+
+def _frame_source(cap, video_path, frame_interval, sampler, start_frame, decoder, limit, keep_full, out):
+    """
+    Yields (frame index, image, ready). Ready images were already selected,
+    resized and converted to 224x224 RGB inside ffmpeg (and written into
+    `out` when given); the rest are BGR frames from OpenCV that still need
+    `preprocess_frame`. Falls back to OpenCV when ffmpeg is missing or fails.
+    """
+    if decoder == 'ffmpeg' and _ffmpeg_ready():
+        frames = ffmpeg_decode.decode_frames(
+            video_path,
+            ffmpeg_decode.every_nth(frame_interval, start_frame),
+            width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            # Face crops need the full frame; otherwise scale in the decoder
+            size=None if keep_full else FRAME_SIZE,
+            limit=limit,
+            out=None if keep_full else out,
+        )
+        try:
+            first = next(frames, None)
+        except ffmpeg_decode.FFmpegDecodeError as e:
+            logger.warning(f"{e}; falling back to OpenCV")
+        else:
+            try:
+                index = start_frame
+                while first is not None:
+                    yield index, first, not keep_full
+                    index += frame_interval
+                    first = next(frames, None)
+            finally:
+                frames.close()
+            return
+
+    for index, frame in sample_frames(cap, frame_interval, sampler, start=start_frame):
+        yield index, frame, False
+
+def _keyframe_source(cap, video_path, keyframes, keep_full, out):
+    """
+    `_frame_source` for a `plan_keyframes` plan: ffmpeg skips every
+    non-keyframe before decoding it. If ffmpeg fails, the same frames are
+    read with OpenCV seeks (identical frames, but OpenCV decodes the GOP
+    leading up to each one, so nothing is saved).
+    """
+    frames = ffmpeg_decode.decode_frames(
+        video_path,
+        ffmpeg_decode.at_indices(number for _, number in keyframes),
+        width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        size=None if keep_full else FRAME_SIZE,
+        limit=len(keyframes),
+        out=None if keep_full else out,
+        keyframes_only=True,
+    )
+    try:
+        first = next(frames, None)
+    except ffmpeg_decode.FFmpegDecodeError as e:
+        logger.warning(f"{e}; falling back to OpenCV")
+    else:
+        try:
+            for index, _ in keyframes:
+                if first is None:
+                    break
+                yield index, first, not keep_full
+                first = next(frames, None)
+        finally:
+            frames.close()
+        return
+
+    for index, _ in keyframes:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield index, frame, False
+
+def keyframe_indices(video_path: str, max_frame: int = None):
+    """
+    Frame indices of the video's keyframes below `max_frame`, read from the
+    demuxed packets (nothing is decoded, so this is cheap). None when the
+    OpenCV backend can't report keyframes.
+    """
+    cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+    try:
+        if not cap.isOpened() or not cap.set(cv2.CAP_PROP_FORMAT, -1):
+            return None
+        keyframes = []
+        index = 0
+        while (max_frame is None or index < max_frame) and cap.grab():
+            if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(index)
+            index += 1
+        return keyframes
+    finally:
+        cap.release()
+
+def plan_keyframes(video_path: str, max_duration: int = 30, fps_sample: int = 3, min_frames: int = None):
+    """
+    Fast-screen sampling plan: for every timestamp uniform sampling would
+    use, the nearest keyframe (duplicates dropped), so only keyframes need
+    decoding. Dense keyframes give one per target; long GOPs give every
+    keyframe in range.
+
     Args:
         video_path: Path to the video file.
-        max_duration: Maximum duration in seconds to process.
-        fps_sample: Number of frames per second to sample.
-        
+        max_duration: Seconds covered, as in `process_video`.
+        fps_sample: Target timestamps per second.
+        min_frames: Fewest frames worth screening with. Defaults to
+                    VOXEAR_SCREEN_MIN_KEYFRAMES.
+
     Returns:
-        torch.Tensor: Shape (1, Sequence_Length, 3, 224, 224)
+        [(frame index, keyframe number)] in order, or None when keyframe
+        sampling can't be used here (no ffmpeg, keyframes unknown) or the GOP
+        is too long to give `min_frames` frames. The caller then samples
+        uniformly.
+    """
+    if min_frames is None:
+        min_frames = CONFIG['screen_min_keyframes']
+    if not _ffmpeg_ready():
+        return None
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file: {video_path}")
+    video_fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if video_fps <= 0:
+        video_fps = 30 # Default fallback
+
+    frame_interval = int(max(1, video_fps / fps_sample))
+    targets = range(0, total_frames, frame_interval)[:max_duration * fps_sample]
+    if not targets:
+        return None
+
+    # A keyframe just past the last target can still be its nearest
+    keyframes = keyframe_indices(video_path, max_frame=targets[-1] + frame_interval)
+    if not keyframes:
+        return None
+
+    chosen = set()
+    for target in targets:
+        position = bisect.bisect_left(keyframes, target)
+        candidates = keyframes[max(0, position - 1):position + 1]
+        chosen.add(min(candidates, key=lambda keyframe: abs(keyframe - target)))
+
+    if len(chosen) < min_frames:
+        logger.info(
+            f"Only {len(chosen)} keyframes in range for {video_path} (need {min_frames}), "
+            f"sampling uniformly"
+        )
+        return None
+    number = {keyframe: i for i, keyframe in enumerate(keyframes)}
+    return [(keyframe, number[keyframe]) for keyframe in sorted(chosen)]
+
+class ChangeFilter:
+    """
+    Content-adaptive sampling: drops frames that barely differ from the last
+    kept one, so static stretches (talking heads, fixed cameras) stop using
+    up the frame budget and more of it goes where the content changes.
+
+    Frames are compared on a tiny grayscale thumbnail (mean absolute
+    difference on the 0-255 scale), which costs far less than the resize the
+    kept frames go through anyway. Comparing against the last kept frame
+    (not the previous one) means slow drift is still picked up.
+
+    Args:
+        min_change: Mean thumbnail difference a frame needs to be kept.
+        max_gap: Seconds after which a frame is kept even if nothing
+                 changed, so static shots are still covered. None for no limit.
+        size: Thumbnail side in pixels.
+    """
+    def __init__(self, min_change=1.0, max_gap=None, size=32):
+        self.min_change = min_change
+        self.max_gap = max_gap
+        self.size = size
+        self.kept = 0
+        self.skipped = 0
+        self._last = None
+        self._last_seconds = None
+
+    def keep(self, frame, seconds):
+        """
+        Whether to keep `frame` (H, W, 3 uint8, BGR or RGB) shown at `seconds`.
+        """
+        thumbnail = cv2.resize(frame, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        # Channel mean rather than a colour conversion: works for BGR and RGB
+        signature = thumbnail.mean(axis=2, dtype=np.float32)
+
+        if self._last is not None and (self.max_gap is None or seconds - self._last_seconds < self.max_gap):
+            if np.abs(signature - self._last).mean() < self.min_change:
+                self.skipped += 1
+                return False
+
+        self._last = signature
+        self._last_seconds = seconds
+        self.kept += 1
+        return True
+
+def iter_frames(video_path: str, max_duration: int = 30, fps_sample: int = 3, with_timestamps: bool = False,
+                face_crop: bool = None, sampler: str = None, buffer=None, start_frame: int = 0,
+                decoder: str = None, keyframes=None, change_filter=None):
     """
+    Decode and preprocess frames one at a time, in order.
+
+    Sampling is identical to `process_video`; stopping iteration early stops
+    decoding and releases the video.
+
+    Args:
+        video_path: Path to the video file.
+        max_duration: Maximum duration in seconds to process (None for the whole video).
+        fps_sample: Number of frames per second to sample.
+        with_timestamps: Yield (seconds, frame) pairs instead of bare frames.
+        face_crop: Crop to the tracked face like the training data (full frame
+                   when none is found). Defaults to VOXEAR_FACE_CROP_ENABLED.
+        sampler: How skipped frames are passed over (see `sample_frames`).
+                 Defaults to VOXEAR_FRAME_SAMPLER.
+        buffer: Optional uint8 array (N, 224, 224, 3); frame i is resized
+                straight into buffer[i] and yielded as a view of it. Iteration
+                stops when the buffer is full.
+        start_frame: Frame index to start sampling at (a multiple of the
+                     sampling interval), for decoding one segment of a video.
+        decoder: 'opencv' or 'ffmpeg' (selection and resizing inside an
+                 ffmpeg subprocess). Defaults to VOXEAR_DECODE_BACKEND.
+        keyframes: A `plan_keyframes` plan; only those keyframes are decoded
+                   instead of sampling every n-th frame.
+        change_filter: Optional `ChangeFilter`; sampled frames it rejects are
+                       dropped before preprocessing. `max_duration` then
+                       bounds the sampled span and the buffer bounds the
+                       frames kept.
+
+    Yields:
+        torch.Tensor: uint8 RGB, shape (224, 224, 3). `normalize_frames`
+        turns a batch of them into model input.
+    """
+    started = time.perf_counter()
     cap = cv2.VideoCapture(video_path)
     
     if not cap.isOpened():
         raise ValueError(f"Could not open video file: {video_path}")
 
     video_fps = cap.get(cv2.CAP_PROP_FPS)
+    metrics.observe('video_open', time.perf_counter() - started)
     if video_fps <= 0:
         video_fps = 30 # Default fallback
         
     frame_interval = int(max(1, video_fps / fps_sample))
-    max_frames = max_duration * fps_sample
+    max_frames = max_duration * fps_sample if max_duration is not None else None
     
-    frames = []
-    frame_count = 0
     sampled_count = 0
-    
-    # Transform: Resize -> ToTensor -> Normalize (ImageNet stats)
-    transform = transforms.Compose([
-        transforms.ToPILImage(),
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-    ])
-    
+    decode_seconds = 0.0
+    transform_seconds = 0.0
+    face_seconds = 0.0
+
+    if face_crop is None:
+        face_crop = CONFIG['face_crop_enabled']
+    localizer = _face_localizer() if face_crop else None
+    # Dropped frames don't use up the buffer, so with a filter ffmpeg gets
+    # neither the buffer nor its length
+    direct = buffer if change_filter is None else None
+    limits = [limit for limit in (max_frames, len(direct) if direct is not None else None) if limit is not None]
+    if keyframes is not None:
+        frames = _keyframe_source(
+            cap, video_path, keyframes[:min(limits)] if limits else keyframes,
+            keep_full=localizer is not None,
+            out=direct,
+        )
+    else:
+        frames = _frame_source(
+            cap, video_path, frame_interval,
+            sampler=sampler or CONFIG['frame_sampler'],
+            start_frame=start_frame,
+            decoder=decoder or CONFIG['decode_backend'],
+            limit=min(limits) if limits else None,
+            keep_full=localizer is not None,
+            out=direct,
+        )
+
+    considered = 0
     try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
+        while max_frames is None or considered < max_frames:
+            started = time.perf_counter()
+            sampled = next(frames, None)
+            decode_seconds += time.perf_counter() - started
+            if sampled is None:
                 break
-                
-            # Check if we should sample this frame
-            if frame_count % frame_interval == 0:
-                # Convert BGR (OpenCV) to RGB
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Apply transforms
-                frame_tensor = transform(frame_rgb)
-                frames.append(frame_tensor)
-                
-                sampled_count += 1
-                if sampled_count >= max_frames:
-                    break
+            frame_count, frame, ready = sampled
+            considered += 1
+
+            if localizer is not None:
+                started = time.perf_counter()
+                frame, _ = localizer.crop(frame)
+                face_seconds += time.perf_counter() - started
+
+            # Judged on what the model would see (the face crop)
+            if change_filter is not None and not change_filter.keep(frame, frame_count / video_fps):
+                continue
+
+            started = time.perf_counter()
+            out = buffer[sampled_count] if buffer is not None else None
+            if not ready:
+                # Resize + BGR -> RGB, staying uint8 (normalised later, per batch)
+                frame = preprocess_frame(frame, out)
+            elif out is not None and not np.may_share_memory(frame, out):
+                out[...] = frame
+                frame = out
+            frame_tensor = torch.from_numpy(frame)
+            transform_seconds += time.perf_counter() - started
+            if with_timestamps:
+                yield frame_count / video_fps, frame_tensor
+            else:
+                yield frame_tensor
             
-            frame_count += 1
+            sampled_count += 1
+            if buffer is not None and sampled_count >= len(buffer):
+                break
     finally:
+        frames.close()
         cap.release()
+        metrics.observe('frame_decode', decode_seconds)
+        metrics.observe('transform', transform_seconds)
+        if localizer is not None:
+            metrics.observe('face_crop', face_seconds)
+        metrics.count(metrics.FRAMES_PROCESSED, sampled_count)
+        if change_filter is not None:
+            metrics.count(metrics.FRAMES_SKIPPED, change_filter.skipped)
+
+def iter_frame_chunks(video_path: str, chunk_size: int, max_duration: int = 30, fps_sample: int = 3,
+                      face_crop: bool = None):
+    """
+    Like `iter_frames`, but yields stacked chunks of up to `chunk_size` frames.
+
+    Yields:
+        torch.Tensor: uint8, shape (<= chunk_size, 224, 224, 3)
+    """
+    chunk = []
+    for frame in iter_frames(video_path, max_duration=max_duration, fps_sample=fps_sample, face_crop=face_crop):
+        chunk.append(frame)
+        if len(chunk) == chunk_size:
+            yield torch.stack(chunk)
+            chunk = []
+    if chunk:
+        yield torch.stack(chunk)
+
+def plan_segments(sample_count: int, workers: int):
+    """
+    Split sample slots 0..sample_count-1 into up to `workers` contiguous
+    (first_slot, count) segments of near-equal size.
+    """
+    workers = max(1, min(workers, sample_count))
+    base, extra = divmod(sample_count, workers)
+    segments = []
+    first = 0
+    for i in range(workers):
+        count = base + (1 if i < extra else 0)
+        segments.append((first, count))
+        first += count
+    return segments
+
+def decode_workers_for(duration_seconds: float) -> int:
+    """
+    Decode threads for a span of video: one per VOXEAR_DECODE_SEGMENT_SECONDS,
+    capped at VOXEAR_DECODE_WORKERS, so short clips stay single-threaded.
+    """
+    workers = CONFIG['decode_workers']
+    segment_seconds = max(1e-6, CONFIG['decode_segment_seconds'])
+    return max(1, min(workers, int(duration_seconds // segment_seconds)))
+
+def _fill(frames):
+    count = 0
+    for _ in frames:
+        count += 1
+    return count
+
+def _decode_segments(video_path, buffer, fps_sample, face_crop):
+    """
+    Decode into `buffer` with one VideoCapture per contiguous segment, on a
+    thread pool (OpenCV releases the GIL while decoding). Returns the number
+    of frames written; 0 means the caller should decode sequentially.
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        video_fps = cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+    finally:
+        cap.release()
+    if video_fps <= 0 or total_frames <= 0:
+        return 0
+
+    frame_interval = int(max(1, video_fps / fps_sample))
+    sample_count = min(len(buffer), math.ceil(total_frames / frame_interval))
+    workers = decode_workers_for(sample_count / fps_sample)
+    if workers <= 1:
+        return 0
+
+    segments = plan_segments(sample_count, workers)
+    with ThreadPoolExecutor(max_workers=len(segments), thread_name_prefix='decode') as pool:
+        futures = [
+            pool.submit(_fill, iter_frames(
+                video_path, max_duration=None, fps_sample=fps_sample, face_crop=face_crop,
+                buffer=buffer[first:first + count], start_frame=first * frame_interval,
+            ))
+            for first, count in segments
+        ]
+        decoded = [future.result() for future in futures]
+
+    # The container's frame count can be an estimate: close any gap left by a
+    # segment that came up short so frames stay contiguous and in order
+    written = 0
+    for (first, count), got in zip(segments, decoded):
+        if got and first != written:
+            buffer[written:written + got] = buffer[first:first + got]
+        written += got
+    return written
+
+def process_video(video_path: str, max_duration: int = 30, fps_sample: int = 3, face_crop: bool = None,
+                  keyframes=None, adaptive: bool = None) -> torch.Tensor:
+    """
+    Process a video file into a tensor suitable for the AI model.
+    
+    Processing steps:
+    1. Load video.
+    2. Trim to first 'max_duration' seconds.
+    3. Sample frames at 'fps_sample' rate.
+    4. Crop to the face (detected on keyframes, tracked in between).
+    5. Resize frames to 224x224 RGB, into one preallocated uint8 buffer.
+
+    Frames stay uint8 (4x smaller than float32) until inference, where
+    `normalize_frames` applies the ImageNet mean/std to the whole batch.
+
+    With VOXEAR_DECODE_WORKERS > 1 and face cropping off, long videos are
+    decoded as contiguous segments in parallel (see `decode_workers_for`);
+    frames are identical.
+
+    With a `plan_keyframes` plan, only keyframes near the sampling
+    timestamps are decoded instead (fast screening).
+
+    With adaptive sampling (VOXEAR_FRAME_POLICY=adaptive), frames too similar
+    to the last kept one are dropped (see `ChangeFilter`) and sampling goes
+    on past `max_duration`, up to VOXEAR_ADAPTIVE_MAX_SECONDS, until the same
+    frame budget (max_duration * fps_sample) is used.
+    
+    Args:
+        video_path: Path to the video file.
+        max_duration: Maximum duration in seconds to process.
+        fps_sample: Number of frames per second to sample.
+        face_crop: Crop to the face (see `iter_frames`).
+        keyframes: Optional `plan_keyframes` plan.
+        adaptive: Content-adaptive sampling. Defaults to VOXEAR_FRAME_POLICY.
+        
+    Returns:
+        torch.Tensor: uint8, shape (1, Sequence_Length, 224, 224, 3)
+    """
+    buffer = np.empty((max_duration * fps_sample, FRAME_SIZE, FRAME_SIZE, 3), dtype=np.uint8)
+    count = 0
+    if adaptive is None:
+        adaptive = CONFIG['frame_policy'] == 'adaptive'
+    if face_crop is None:
+        face_crop = CONFIG['face_crop_enabled']
+    if keyframes is not None:
+        count = _fill(iter_frames(video_path, max_duration=max_duration, fps_sample=fps_sample, face_crop=face_crop,
+                                  buffer=buffer, keyframes=keyframes))
+    elif adaptive:
+        change_filter = ChangeFilter(CONFIG['adaptive_min_change'], CONFIG['adaptive_max_gap_seconds'])
+        span = max(max_duration, CONFIG['adaptive_max_seconds'])
+        count = _fill(iter_frames(video_path, max_duration=span, fps_sample=fps_sample, face_crop=face_crop,
+                                  buffer=buffer, change_filter=change_filter))
+    elif CONFIG['decode_workers'] > 1 and CONFIG['decode_backend'] != 'ffmpeg' and not face_crop:
+        # Long spans are split into segments decoded in parallel (ffmpeg
+        # already decodes on its own threads). Not with face cropping: each
+        # segment would start its own tracker, so crops near segment
+        # boundaries would differ from a sequential decode.
+        count = _decode_segments(video_path, buffer, fps_sample, face_crop)
+    if not count:
+        count = _fill(iter_frames(video_path, max_duration=max_duration, fps_sample=fps_sample, face_crop=face_crop, buffer=buffer))
         
-    if not frames:
+    if not count:
         raise ValueError("No frames could be extracted from the video.")
         
-    # Stack frames into a sequence tensor (Seq, Channels, Height, Width)
-    video_sequence = torch.stack(frames)
-    
-    # Add batch dimension: (1, Seq, C, H, W)
-    return video_sequence.unsqueeze(0)
+    # Add batch dimension: (1, Seq, H, W, C)
+    return torch.from_numpy(buffer[:count]).unsqueeze(0)
+
+def benchmark_samplers(video_path: str, max_duration: int = 30, fps_sample: int = 3, repeats: int = 3):
+    """
+    Time every sampler (and the ffmpeg decoder, when installed) on one video
+    and check each picks the same frames as 'read'. Returns
+    {name: {'seconds', 'frames', 'identical', 'mean_abs_diff'}}, with the best
+    of `repeats` runs. ffmpeg resizes and converts colour itself, so its pixels
+    differ slightly; `mean_abs_diff` (0-255 scale) shows by how much.
+    """
+    runs = [(sampler, sampler, 'opencv') for sampler in SAMPLERS]
+    if ffmpeg_decode.available():
+        runs.append(('ffmpeg', None, 'ffmpeg'))
+
+    results = {}
+    reference = None
+    for name, sampler, decoder in runs:
+        best = float('inf')
+        for _ in range(repeats):
+            started = time.perf_counter()
+            frames = list(iter_frames(video_path, max_duration=max_duration, fps_sample=fps_sample,
+                                      face_crop=False, sampler=sampler, decoder=decoder))
+            best = min(best, time.perf_counter() - started)
+        stacked = torch.stack(frames) if frames else torch.empty(0)
+        if reference is None:
+            reference = stacked
+        same_shape = reference.shape == stacked.shape
+        results[name] = {
+            'seconds': best,
+            'frames': len(frames),
+            'identical': same_shape and torch.equal(reference, stacked),
+            'mean_abs_diff': (reference.float() - stacked.float()).abs().mean().item() if same_shape and len(frames) else None,
+        }
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Compare frame samplers (VOXEAR_FRAME_SAMPLER) and decoders on a video.')
+    parser.add_argument('videos', nargs='+', help='Video files representative of production uploads')
+    parser.add_argument('--max-duration', type=int, default=30)
+    parser.add_argument('--fps-sample', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    for video_path in args.videos:
+        results = benchmark_samplers(video_path, args.max_duration, args.fps_sample, args.repeats)
+        for sampler, result in results.items():
+            logger.info(
+                f"{video_path} {sampler}: {result['seconds'] * 1000:.1f}ms for {result['frames']} frames"
+                f"{'' if result['identical'] else ' (frames differ from read, mean abs diff %s)' % result['mean_abs_diff']}"
+            )
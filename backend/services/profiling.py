@@ -0,0 +1,98 @@
+import os
+import json
+import time
+import uuid
+import threading
+import logging
+from contextlib import nullcontext
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Stage totals of the analysis being profiled on this thread (None when off)
+_active = threading.local()
+
+# torch.profiler is process-wide: overlapping sessions crash in kineto, so
+# only one profiled run at a time
+_lock = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def record_stage(stage, seconds):
+    """
+    Add wall-clock time to `stage` for the analysis being profiled on this
+    thread. Does nothing unless `run_profiled` is active.
+    """
+    stages = getattr(_active, 'stages', None)
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+def stage(name):
+    """
+    Named range in the trace while profiling, a no-op context otherwise.
+    """
+    if getattr(_active, 'stages', None) is None:
+        return nullcontext()
+    return torch.profiler.record_function(name)
+
+
+def run_profiled(fn, profile_dir, top_ops=15):
+    """
+    Run `fn()` under torch.profiler and save a Chrome trace (open it in
+    chrome://tracing or https://ui.perfetto.dev) plus a JSON summary of the
+    stage timers and the most expensive operators.
+
+    Returns (fn's return value, summary dict). The summary's `id` names the
+    files: `<id>.trace.json` and `<id>.json` in `profile_dir`.
+
+    The profiler records every thread of the process, so analyses running
+    alongside (unprofiled ones on other workers) show up in the trace too.
+
+    Raises:
+        ProfilerBusy: Another run is being profiled in this process.
+    """
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy("Another analysis is being profiled, please retry later.")
+    try:
+        return _run_profiled(fn, profile_dir, top_ops)
+    finally:
+        _lock.release()
+
+
+def _run_profiled(fn, profile_dir, top_ops):
+    os.makedirs(profile_dir, exist_ok=True)
+    profile_id = uuid.uuid4().hex
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+
+    _active.stages = {}
+    started = time.perf_counter()
+    try:
+        with torch.profiler.profile(activities=activities, record_shapes=True) as prof:
+            value = fn()
+        wall_seconds = time.perf_counter() - started
+        stages = _active.stages
+    finally:
+        _active.stages = None
+
+    prof.export_chrome_trace(os.path.join(profile_dir, f"{profile_id}.trace.json"))
+    operators = sorted(prof.key_averages(), key=lambda event: event.self_cpu_time_total, reverse=True)
+    summary = {
+        "id": profile_id,
+        "wall_ms": round(wall_seconds * 1000, 1),
+        "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in stages.items()},
+        "top_operators": [
+            {"name": event.key, "calls": event.count, "self_cpu_ms": round(event.self_cpu_time_total / 1000, 2)}
+            for event in operators[:top_ops]
+        ],
+    }
+    with open(os.path.join(profile_dir, f"{profile_id}.json"), 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    logger.info(f"Saved profile {profile_id} to {profile_dir}")
+    return value, summary
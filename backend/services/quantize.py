@@ -0,0 +1,144 @@
+import os
+import sys
+import copy
+import shutil
+import argparse
+import logging
+import tempfile
+import torch
+from torch.utils.data import DataLoader, random_split
+from sklearn.metrics import accuracy_score
+
+try:
+    from backend.services.ai_models import DeepFakeDetector
+    from backend.services.backends import EagerBackend, Int8Backend, _FeatureExtractor
+    from backend.services.evaluate import build_loader, predict
+except ImportError:
+    # Fallback for running script directly from backend/services
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from backend.services.ai_models import DeepFakeDetector
+    from backend.services.backends import EagerBackend, Int8Backend, _FeatureExtractor
+    from backend.services.evaluate import build_loader, predict
+
+# Configuration
+CONFIG = {
+    'data_dir': 'dataset_ready', # Same as train/evaluate folder
+    'weights_path': 'best_model.pth',
+    'output_path': 'backend/weights/model.int8.ts',
+    'calibration_batches': 16,
+    'max_accuracy_drop': 0.01, # Absolute accuracy points (0.01 = 1%)
+    'batch_size': 4,
+}
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+def quantize_cnn(model, calibration_loader, calibration_batches, static=True, frame_size=224):
+    """
+    Trace the EfficientNet stage, statically quantized to int8 (FX graph mode,
+    x86 qconfig) after calibrating activation ranges on real clips.
+    With static=False the fp32 CNN is traced unchanged, so only the head is
+    quantized by the int8 backend.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    extractor = _FeatureExtractor(copy.deepcopy(model).cpu()).eval()
+    example = torch.randn(2, 3, frame_size, frame_size)
+
+    with torch.no_grad():
+        if static:
+            torch.backends.quantized.engine = 'x86'
+            prepared = prepare_fx(extractor, get_default_qconfig_mapping('x86'), (example,))
+            for i, (inputs, _) in enumerate(calibration_loader):
+                if i >= calibration_batches:
+                    break
+                prepared(inputs.flatten(0, 1))
+            extractor = convert_fx(prepared)
+
+        return torch.jit.trace(extractor, example)
+
+
+def split_calibration(dataset, calibration_clips, seed=0):
+    """
+    Hold out a random calibration subset (at most half the clips) so the
+    accuracy gate never scores the clips the activation ranges were fitted
+    on. Returns (calibration, gate) subsets; the split is fixed by `seed`.
+    """
+    calibration_size = max(1, min(calibration_clips, len(dataset) // 2))
+    return random_split(dataset, [calibration_size, len(dataset) - calibration_size],
+                        generator=torch.Generator().manual_seed(seed))
+
+
+def _accuracy(backend, loader):
+    def score_batch(inputs):
+        return torch.tensor(backend.run_batch(list(inputs))).view(-1, 1)
+
+    preds, labels = predict(score_batch, loader)
+    return accuracy_score(labels, preds)
+
+
+def quantize_and_gate(weights_path, data_dir, output_path, max_accuracy_drop, calibration_batches, static=True):
+    """
+    Build the int8 artifact, evaluate it against fp32 on the evaluation split
+    (minus the clips held out for calibration, see `split_calibration`) and
+    only write it to `output_path` if accuracy drops by at most
+    `max_accuracy_drop`. Returns (fp32_accuracy, int8_accuracy, published).
+    """
+    model = DeepFakeDetector(weights_path=weights_path, pretrained_backbone=False).cpu().eval()
+    eval_loader = build_loader(data_dir=data_dir, batch_size=CONFIG['batch_size'])
+
+    # Calibration clips are held out of the gate, so it measures int8
+    # accuracy on data the activation ranges weren't fitted to
+    calibration_set, gate_set = split_calibration(eval_loader.dataset, calibration_batches * CONFIG['batch_size'])
+    logger.info(f"Calibrating on {len(calibration_set)} clips, gating on {len(gate_set)} clips")
+    calibration_loader = DataLoader(calibration_set, batch_size=CONFIG['batch_size'], shuffle=False)
+    loader = DataLoader(gate_set, batch_size=CONFIG['batch_size'], shuffle=False,
+                        num_workers=eval_loader.num_workers)
+    traced = quantize_cnn(model, calibration_loader, calibration_batches, static=static)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Evaluate exactly what would be served: the saved file, loaded by the int8 backend
+        candidate_path = os.path.join(tmp, 'model.int8.ts')
+        traced.save(candidate_path)
+
+        fp32_accuracy = _accuracy(EagerBackend(model), loader)
+        int8_accuracy = _accuracy(Int8Backend(model, candidate_path), loader)
+        logger.info(f"fp32 accuracy: {fp32_accuracy:.4f}, int8 accuracy: {int8_accuracy:.4f}")
+
+        drop = fp32_accuracy - int8_accuracy
+        if drop > max_accuracy_drop:
+            logger.error(f"Accuracy dropped by {drop:.4f} (> {max_accuracy_drop:.4f}); not publishing {output_path}")
+            return fp32_accuracy, int8_accuracy, False
+
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        shutil.copyfile(candidate_path, output_path)
+
+    logger.info(f"Published int8 artifact to {output_path} (accuracy drop {drop:.4f})")
+    return fp32_accuracy, int8_accuracy, True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Quantize a trained model to int8 and publish it only if accuracy holds.')
+    parser.add_argument('--weights', type=str, default=CONFIG['weights_path'], help='State dict saved by train.py')
+    parser.add_argument('--data-dir', type=str, default=CONFIG['data_dir'], help='Evaluation dataset (same layout as evaluate.py)')
+    parser.add_argument('--output', type=str, default=CONFIG['output_path'])
+    parser.add_argument('--max-accuracy-drop', type=float, default=CONFIG['max_accuracy_drop'])
+    parser.add_argument('--calibration-batches', type=int, default=CONFIG['calibration_batches'])
+    parser.add_argument('--dynamic-only', action='store_true', help='Keep the CNN in fp32 and only quantize the LSTM/linear head')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.weights):
+        logger.error(f"Weights file {args.weights} not found. Train the model first.")
+        sys.exit(1)
+    if not os.path.exists(args.data_dir):
+        logger.error(f"Dataset path {args.data_dir} does not exist.")
+        sys.exit(1)
+
+    _, _, published = quantize_and_gate(
+        args.weights, args.data_dir, args.output,
+        args.max_accuracy_drop, args.calibration_batches,
+        static=not args.dynamic_only,
+    )
+    sys.exit(0 if published else 1)
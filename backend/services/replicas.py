@@ -0,0 +1,210 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import threading
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+import torch
+
+try:
+    from .workers import AnalysisPool, _timed_call, _noop
+except ImportError:
+    # Fallback for running script directly from backend/services
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from services.workers import AnalysisPool, _timed_call, _noop
+
+logger = logging.getLogger(__name__)
+
+
+def available_cores():
+    """
+    Cores this process may run on (respects taskset / cgroup cpusets).
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_core_sets(replicas, threads_per_replica=0, cores=None):
+    """
+    Split the available cores into one disjoint set per replica.
+
+    Args:
+        replicas: Number of replicas.
+        threads_per_replica: Cores (and intra-op threads) per replica;
+                             0 divides the available cores evenly.
+        cores: Core ids to split (defaults to `available_cores()`).
+
+    Returns:
+        A list of `replicas` core id lists. If more cores are asked for than
+        exist, sets wrap around and overlap (with a warning).
+    """
+    cores = list(cores) if cores is not None else available_cores()
+    replicas = max(1, int(replicas))
+    threads = int(threads_per_replica) or max(1, len(cores) // replicas)
+
+    if replicas * threads > len(cores):
+        logger.warning(
+            f"{replicas} replicas x {threads} threads exceeds the {len(cores)} available cores; "
+            f"core sets will overlap"
+        )
+    return [[cores[(i * threads + j) % len(cores)] for j in range(threads)] for i in range(replicas)]
+
+
+def _init_replica(cores, initializer=None):
+    # Runs first thing in each replica process
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only allowed before any parallel work has started in this process
+        pass
+    if initializer is not None:
+        initializer()
+
+
+class ReplicaPool(AnalysisPool):
+    """
+    Worker pool of single-process model replicas, each pinned to its own set
+    of cores with `torch.set_num_threads` matching the set, so replicas don't
+    oversubscribe the CPU by fighting over the same cores. Tasks go to the
+    replica with the fewest in-flight tasks.
+
+    Admission (`try_acquire`/`release`), stats and Retry-After work exactly
+    like AnalysisPool; `max_workers` is the number of replicas.
+
+    Args:
+        replicas: Number of replica processes.
+        max_queue: Number of admitted tasks allowed to wait for a replica.
+        threads_per_replica: Cores per replica (0 splits evenly).
+        initializer: Optional callable run once in every replica after
+                     pinning (e.g. to preload the model).
+        cores: Core ids to split (defaults to all available).
+    """
+    def __init__(self, replicas=2, max_queue=8, threads_per_replica=0, initializer=None, cores=None):
+        self.core_sets = plan_core_sets(replicas, threads_per_replica, cores)
+        super(ReplicaPool, self).__init__(
+            max_workers=len(self.core_sets), max_queue=max_queue, kind='replicas', initializer=initializer,
+        )
+
+    def _create_executor(self, initializer):
+        self._replicas = [
+            ProcessPoolExecutor(max_workers=1, initializer=partial(_init_replica, cores, initializer))
+            for cores in self.core_sets
+        ]
+        self._loads = [0] * len(self._replicas)
+        self._served = [0] * len(self._replicas)
+        self._routing_lock = threading.Lock()
+
+    def _dispatch(self, fn, args, kwargs):
+        with self._routing_lock:
+            index = min(range(len(self._loads)), key=lambda i: self._loads[i])
+            self._loads[index] += 1
+            self._served[index] += 1
+
+        def _done(_):
+            with self._routing_lock:
+                self._loads[index] -= 1
+
+        try:
+            future = self._replicas[index].submit(_timed_call, fn, args, kwargs, True)
+        except BaseException:
+            _done(None)
+            raise
+        future.add_done_callback(_done)
+        return future
+
+    def stats(self):
+        stats = super(ReplicaPool, self).stats()
+        with self._routing_lock:
+            stats['replicas'] = [
+                {'cores': cores, 'in_flight': load, 'served': served}
+                for cores, load, served in zip(self.core_sets, self._loads, self._served)
+            ]
+        return stats
+
+    def prestart(self):
+        """
+        Start (pin and initialise) every replica now.
+        """
+        futures = [replica.submit(_noop) for replica in self._replicas]
+        for future in futures:
+            future.result()
+
+    def shutdown(self, wait=True):
+        for replica in self._replicas:
+            replica.shutdown(wait=wait)
+
+
+def _bench_task(frames, frame_size):
+    # One synthetic clip through the configured backend, inside a replica
+    try:
+        from .analyzer import get_backend
+    except ImportError:
+        from services.analyzer import get_backend
+    # The uint8 (T, H, W, 3) layout preprocessing produces, so the timing
+    # includes the backend's normalize_frames like serving does
+    clip = torch.randint(0, 256, (frames, frame_size, frame_size, 3), dtype=torch.uint8)
+    return get_backend().run_batch([clip])[0]
+
+
+def _bench_warm_up():
+    try:
+        from .analyzer import get_backend
+    except ImportError:
+        from services.analyzer import get_backend
+    get_backend()
+
+
+def benchmark(replicas, threads_per_replica=0, clips=32, frames=16, frame_size=224):
+    """
+    Throughput of one replica configuration on synthetic clips, with enough
+    clips queued to keep every replica busy. Returns clips per second.
+    """
+    pool = ReplicaPool(replicas, max_queue=clips, threads_per_replica=threads_per_replica, initializer=_bench_warm_up)
+    try:
+        pool.prestart()
+        # One clip per replica first, so one-time allocator setup isn't timed
+        warmup = []
+        for _ in range(pool.max_workers):
+            pool.try_acquire(blocking=True)
+            warmup.append(pool.submit(_bench_task, frames, frame_size))
+        for future in warmup:
+            future.result()
+
+        started = time.perf_counter()
+        futures = []
+        for _ in range(clips):
+            pool.try_acquire(blocking=True)
+            futures.append(pool.submit(_bench_task, frames, frame_size))
+        for future in futures:
+            future.result()
+        return clips / (time.perf_counter() - started)
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Benchmark replica count / thread splits for CPU inference.')
+    parser.add_argument('--replicas', type=str, default='1,2,4', help='Comma separated replica counts to try')
+    parser.add_argument('--threads', type=int, default=0, help='Threads per replica (0 = split cores evenly)')
+    parser.add_argument('--clips', type=int, default=32, help='Clips per configuration')
+    parser.add_argument('--frames', type=int, default=16, help='Frames per clip')
+    parser.add_argument('--frame-size', type=int, default=224)
+    args = parser.parse_args()
+
+    cores = len(available_cores())
+    baseline = None
+    for replicas in [int(value) for value in args.replicas.split(',')]:
+        throughput = benchmark(replicas, args.threads, clips=args.clips, frames=args.frames, frame_size=args.frame_size)
+        baseline = baseline or throughput
+        threads = args.threads or max(1, cores // replicas)
+        logger.info(
+            f"replicas={replicas} threads/replica={threads}: {throughput:.2f} clips/s "
+            f"({throughput / baseline:.2f}x of the first configuration)"
+        )
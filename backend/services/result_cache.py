@@ -0,0 +1,182 @@
+import os
+import json
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def file_fingerprint(path, chunk_size=1024 * 1024):
+    """
+    Short sha256 of a file on disk (used to tie cache entries to model weights).
+    """
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of analysis results keyed by content hash, with an
+    optional on-disk tier and coalescing of concurrent identical requests.
+
+    Keys should combine the upload's content hash with a fingerprint of the
+    model weights (see analyzer.get_cache_namespace) so a model update never
+    serves stale verdicts.
+
+    Args:
+        max_entries: Entries kept in memory.
+        disk_dir: Optional directory for the second tier (one JSON per key).
+        max_disk_entries: Entries kept on disk; oldest are removed first.
+    """
+    def __init__(self, max_entries=256, disk_dir=None, max_disk_entries=10000):
+        self.max_entries = max(1, int(max_entries))
+        self.disk_dir = disk_dir or None
+        self.max_disk_entries = max(1, int(max_disk_entries))
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+        self._memory = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._disk_evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                return self._memory[key]
+
+        result = self._disk_get(key)
+        with self._lock:
+            if result is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+            self._remember(key, result)
+        return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._remember(key, result)
+        self._disk_put(key, result)
+
+    def coalesce(self, key, start):
+        """
+        Share one in-flight computation between concurrent requests for `key`.
+
+        `start` is called only if no computation for `key` is running and must
+        return a concurrent.futures.Future. Successful results ("status":
+        "completed") are stored in the cache when the future resolves.
+
+        Returns (future, started) where `started` tells the caller whether it
+        owns the new computation.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._coalesced += 1
+                return future, False
+            future = start()
+            self._in_flight[key] = future
+
+        def _done(f):
+            result = f.result() if f.exception() is None else None
+            completed = result is not None and result.get("status") == "completed"
+            # Cache before leaving the in-flight map, so an identical request
+            # always finds one or the other
+            with self._lock:
+                if completed:
+                    self._remember(key, result)
+                self._in_flight.pop(key, None)
+            if completed:
+                self._disk_put(key, result)
+
+        future.add_done_callback(_done)
+        return future, True
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                'entries': len(self._memory),
+                'max_entries': self.max_entries,
+                'disk_enabled': self.disk_dir is not None,
+                'hits': self._hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'hit_ratio': round((self._hits + self._disk_hits) / lookups, 4) if lookups else 0.0,
+                'coalesced': self._coalesced,
+                'in_flight': len(self._in_flight),
+                'evictions': self._evictions,
+                'disk_evictions': self._disk_evictions,
+            }
+
+    def _remember(self, key, result):
+        # Caller holds self._lock
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._evictions += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r') as f:
+                result = json.load(f)
+            os.utime(path)  # Keep recently used entries from being evicted
+            return result
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def _disk_put(self, key, result):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(result, f)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write cache entry {path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self._disk_trim()
+
+    def _disk_trim(self):
+        with self._disk_lock:
+            entries = [entry for entry in os.scandir(self.disk_dir) if entry.name.endswith('.json')]
+            excess = len(entries) - self.max_disk_entries
+            if excess <= 0:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:excess]:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                with self._lock:
+                    self._disk_evictions += 1
@@ -0,0 +1,315 @@
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import Dataset, DataLoader
+
+try:
+    from backend.services.dataset import DeepFakeDataset, load_manifest, get_transforms
+    from backend.services.preprocessing import normalize_frames
+except ImportError:
+    # Fallback for running script directly from backend/services
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from backend.services.dataset import DeepFakeDataset, load_manifest, get_transforms
+    from backend.services.preprocessing import normalize_frames
+
+logger = logging.getLogger(__name__)
+
+SHARD_VERSION = 1
+
+
+def _shard_name(k):
+    return f"shard_{k:05d}.npy"
+
+
+# ImageNet mean colour: normalises to (about) the zero frame DeepFakeDataset
+# substitutes for unreadable images
+_MEAN_PIXEL = np.array([124, 116, 104], dtype=np.uint8)
+
+
+def _load_frame(path, frame_size):
+    # Same resize as get_transforms' Resize on a PIL image (bilinear), so the
+    # packed pixels are the ones the JPEG pipeline would produce
+    try:
+        with Image.open(path) as img:
+            return np.asarray(img.convert('RGB').resize((frame_size, frame_size), Image.BILINEAR))
+    except Exception as e:
+        logger.error(f"Error loading image {path}: {e}")
+        return _MEAN_PIXEL
+
+
+def _replace_file(path, write):
+    # Write to a private temp file, then atomically move it into place
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def pack_dataset(root_dir, output_dir, frame_size=224, shard_frames=4096, manifest_dir=None):
+    """
+    Pack the extracted frames of a DeepFakeDataset root into pre-resized
+    uint8 shards, so training reads pixels instead of decoding and resizing
+    JPEGs.
+
+    Layout of `output_dir`:
+        shard_00000.npy, ...  (n, frame_size, frame_size, 3) uint8 RGB frames
+        index.npz             videos, labels, shard, start, count per video
+        meta.json             version and frame size
+
+    meta.json is removed first and written last, so a pack that is
+    interrupted (or racing another) leaves a directory ShardDataset refuses
+    to open rather than an index that doesn't match its shards.
+
+    Every video's frames are stored contiguously, in order, inside one shard;
+    shards hold about `shard_frames` frames (a longer video gets its own).
+
+    Returns the number of frames packed.
+    """
+    manifest = load_manifest(root_dir, manifest_dir)
+    counts = np.diff(manifest.offsets)
+
+    # Fill each shard with whole videos until the next one doesn't fit
+    shard_of = np.zeros(len(counts), dtype=np.int32)
+    starts = np.zeros(len(counts), dtype=np.int64)
+    sizes = []
+    for i, count in enumerate(counts):
+        if not sizes or (sizes[-1] and sizes[-1] + count > shard_frames):
+            sizes.append(0)
+        shard_of[i] = len(sizes) - 1
+        starts[i] = sizes[-1]
+        sizes[-1] += int(count)
+
+    os.makedirs(output_dir, exist_ok=True)
+    # No meta.json means "not a complete pack": readers fail loudly instead of
+    # pairing an old index with new shards if this run is interrupted
+    meta_path = os.path.join(output_dir, "meta.json")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    started = time.perf_counter()
+    for k, size in enumerate(sizes):
+        tmp_path = os.path.join(output_dir, f"shard_{k:05d}.{os.getpid()}.tmp.npy")
+        shard = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8, shape=(size, frame_size, frame_size, 3))
+        try:
+            for i in np.flatnonzero(shard_of == k):
+                folder = os.path.join(root_dir, manifest.videos[i].decode())
+                for j, name in enumerate(manifest.frame_names(i)):
+                    shard[starts[i] + j] = _load_frame(os.path.join(folder, name), frame_size)
+            shard.flush()
+        except BaseException:
+            del shard
+            os.remove(tmp_path)
+            raise
+        del shard
+        os.replace(tmp_path, os.path.join(output_dir, _shard_name(k)))
+        logger.info(f"Packed shard {k + 1}/{len(sizes)} ({size} frames)")
+
+    # Shards left over from a larger previous pack
+    k = len(sizes)
+    while os.path.exists(os.path.join(output_dir, _shard_name(k))):
+        os.remove(os.path.join(output_dir, _shard_name(k)))
+        k += 1
+
+    _replace_file(os.path.join(output_dir, "index.npz"), lambda f: np.savez(
+        f,
+        videos=np.asarray(manifest.videos),
+        labels=np.asarray(manifest.labels),
+        shard=shard_of,
+        start=starts,
+        count=counts.astype(np.int32),
+    ))
+    meta = {'version': SHARD_VERSION, 'frame_size': frame_size, 'shards': len(sizes)}
+    _replace_file(meta_path, lambda f: f.write(json.dumps(meta).encode()))
+
+    total = int(counts.sum())
+    logger.info(f"Packed {len(counts)} videos ({total} frames) in {time.perf_counter() - started:.1f}s")
+    return total
+
+
+class ClipJitter:
+    """
+    Training augmentation for a whole uint8 clip (T, H, W, 3) in a few
+    tensor ops: each frame independently gets a random horizontal flip and
+    brightness / contrast factors, like `get_transforms('train')` applies per
+    frame to PIL images (brightness is always applied before contrast here).
+    """
+    def __init__(self, flip=0.5, brightness=0.1, contrast=0.1):
+        self.flip = flip
+        self.brightness = brightness
+        self.contrast = contrast
+
+    def _factors(self, count, amount):
+        return torch.empty(count, 1, 1, 1).uniform_(1 - amount, 1 + amount)
+
+    def __call__(self, clip):
+        count = clip.size(0)
+        frames = clip.float()
+
+        # Brightness b then contrast c is one affine map per frame:
+        # c * (b * x) + (1 - c) * grey(b * x) = c * b * x + (1 - c) * b * grey(x)
+        # (skipping ColorJitter's clamp between the two, which only touches
+        # already saturated pixels)
+        grey = (frames.mean((1, 2)) * frames.new_tensor([0.299, 0.587, 0.114])).sum(1).view(count, 1, 1, 1)
+        brightness = self._factors(count, self.brightness)
+        contrast = self._factors(count, self.contrast)
+        frames.mul_(contrast * brightness).add_((1 - contrast) * brightness * grey).clamp_(0, 255)
+        clip = frames.to(torch.uint8)
+
+        flipped = torch.rand(count) < self.flip
+        clip[flipped] = clip[flipped].flip(2)
+        return clip
+
+
+def get_shard_transforms(mode='train'):
+    """
+    Clip augmentation for ShardDataset matching the random part of
+    `get_transforms` (the resize is done at pack time and normalisation once
+    per clip). None for 'val'.
+    """
+    if mode == 'train':
+        return ClipJitter()
+    return None
+
+
+class ShardDataset(Dataset):
+    """
+    DeepFakeDataset over shards written by `pack_dataset`.
+
+    A clip is one strided slice of a memory-mapped shard (the same uniformly
+    spaced frames DeepFakeDataset picks), so there is no JPEG decoding or
+    resizing in the training loop, and workers share the page cache. Items
+    are the same normalised (Seq_Len, 3, H, W) float clips and float labels.
+
+    Args:
+        shard_dir (str): Output directory of `pack_dataset`.
+        seq_len (int): Number of frames to retrieve per video (for LSTM).
+        transform (callable, optional): Augmentation of the uint8
+            (T, H, W, 3) clip, e.g. `get_shard_transforms('train')`.
+        mode (str): 'train' or 'val'.
+    """
+    def __init__(self, shard_dir, seq_len=20, transform=None, mode='train'):
+        self.shard_dir = shard_dir
+        self.seq_len = seq_len
+        self.transform = transform
+        self.mode = mode
+
+        with open(os.path.join(shard_dir, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get('version') != SHARD_VERSION:
+            raise ValueError(f"Unsupported shard format in {shard_dir}: {meta.get('version')}")
+        self.frame_size = meta['frame_size']
+        self.packed_at = os.stat(os.path.join(shard_dir, "meta.json")).st_mtime_ns
+
+        with np.load(os.path.join(shard_dir, "index.npz")) as index:
+            self.videos = index['videos']
+            self.labels = index['labels']
+            self.shard = index['shard']
+            self.start = index['start']
+            self.count = index['count']
+
+        # Filter out videos with too few frames
+        self.indices = np.flatnonzero(self.count >= seq_len)
+        self._shards = {}
+
+    def __getstate__(self):
+        # Workers map the shards themselves
+        state = self.__dict__.copy()
+        state['_shards'] = {}
+        return state
+
+    def _open_shard(self, k):
+        if k not in self._shards:
+            self._shards[k] = np.load(os.path.join(self.shard_dir, _shard_name(k)), mmap_mode='r')
+        return self._shards[k]
+
+    def __len__(self):
+        return len(self.indices)
+
+    def cache_key(self, idx):
+        """
+        Identity of item `idx` for CachedDataset: the packed video, when the
+        shards were written, frame size, seq_len and transform.
+        """
+        row = int(self.indices[idx])
+        return "|".join([
+            os.path.abspath(self.shard_dir),
+            self.videos[row].decode(),
+            str(self.packed_at),
+            str(self.frame_size),
+            str(self.seq_len),
+            repr(self.transform),
+        ])
+
+    def __getitem__(self, idx):
+        row = int(self.indices[idx])
+        total = int(self.count[row])
+        length = min(self.seq_len, total)
+        # Uniform sampling, as in DeepFakeDataset: every step-th frame
+        step = total // self.seq_len if total > self.seq_len else 1
+        begin = int(self.start[row])
+
+        shard = self._open_shard(int(self.shard[row]))
+        # One read out of the memory map (a copy, so the clip owns its memory)
+        clip = torch.from_numpy(np.array(shard[begin:begin + step * length:step]))
+
+        if self.transform:
+            clip = self.transform(clip)
+
+        return normalize_frames(clip), torch.tensor(float(self.labels[row]), dtype=torch.float32)
+
+
+def benchmark_loaders(data_dir, shard_dir, seq_len=20, batch_size=4, num_workers=0, batches=20, mode='train'):
+    """
+    Clips per second through a DataLoader over the JPEG folders
+    (DeepFakeDataset) and over the packed shards (ShardDataset), with the
+    same augmentation mode. Returns {'jpeg': clips/s, 'shards': clips/s}.
+    """
+    datasets = {
+        'jpeg': DeepFakeDataset(data_dir, seq_len=seq_len, transform=get_transforms(mode), mode=mode),
+        'shards': ShardDataset(shard_dir, seq_len=seq_len, transform=get_shard_transforms(mode), mode=mode),
+    }
+    results = {}
+    for name, dataset in datasets.items():
+        loader = DataLoader(dataset, batch_size=batch_size, shuffle=True, num_workers=num_workers)
+        clips = 0
+        started = time.perf_counter()
+        for i, (inputs, _) in enumerate(loader):
+            clips += inputs.size(0)
+            if i + 1 >= batches:
+                break
+        results[name] = clips / (time.perf_counter() - started)
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Pack extracted frames into memory-mapped shards for training.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pack_parser = subparsers.add_parser('pack', help='Pack dataset_ready/ into shards')
+    pack_parser.add_argument('--data-dir', type=str, default='dataset_ready', help='Root with real/ and fake/ frame folders')
+    pack_parser.add_argument('--output', type=str, default='dataset_shards')
+    pack_parser.add_argument('--frame-size', type=int, default=224)
+    pack_parser.add_argument('--shard-frames', type=int, default=4096, help='Frames per shard (about 600MB at 224px)')
+
+    bench_parser = subparsers.add_parser('bench', help='Compare loading from JPEG folders and from shards')
+    bench_parser.add_argument('--data-dir', type=str, default='dataset_ready')
+    bench_parser.add_argument('--shard-dir', type=str, default='dataset_shards')
+    bench_parser.add_argument('--seq-len', type=int, default=20)
+    bench_parser.add_argument('--batch-size', type=int, default=4)
+    bench_parser.add_argument('--workers', type=int, default=0)
+    bench_parser.add_argument('--batches', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        pack_dataset(args.data_dir, args.output, frame_size=args.frame_size, shard_frames=args.shard_frames)
+    else:
+        results = benchmark_loaders(args.data_dir, args.shard_dir, args.seq_len, args.batch_size, args.workers, args.batches)
+        for name, clips_per_second in results.items():
+            logger.info(f"{name}: {clips_per_second:.2f} clips/s ({clips_per_second / results['jpeg']:.1f}x jpeg)")
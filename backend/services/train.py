@@ -2,7 +2,7 @@ import os
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, Subset
 from tqdm import tqdm
 import time
 import copy
@@ -12,21 +12,30 @@ import logging
 try:
     from backend.services.ai_models import DeepFakeDetector
     from backend.services.dataset import DeepFakeDataset, get_transforms
+    from backend.services.shards import ShardDataset, get_shard_transforms
+    from backend.services.clip_cache import CachedDataset
 except ImportError:
     # Fallback for running script directly from backend/services
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
     from backend.services.ai_models import DeepFakeDetector
     from backend.services.dataset import DeepFakeDataset, get_transforms
+    from backend.services.shards import ShardDataset, get_shard_transforms
+    from backend.services.clip_cache import CachedDataset
 
 # Configuration
 CONFIG = {
     'data_dir': 'dataset_ready', # Updated to point to the prepared dataset
+    'shard_dir': None, # Packed shards (python -m services.shards pack) are used instead of data_dir when set
     'batch_size': 4, # RTX 3050 optimized (Low VRAM due to sequences)
     'num_epochs': 10,
     'learning_rate': 1e-4,
     'num_workers': 4,
     'seq_len': 20,
+    'cache_val': False, # Keep validation clips after the first epoch instead of decoding them again
+    'val_cache_dir': None, # Persistent copy of every clip (share with evaluate.py's cache_dir); a temp dir otherwise
+    'val_cache_memory_mb': 1024, # Per loader worker; clips beyond this spill to disk
+    'val_cache_disk_mb': 8192, # Size cap of the disk copy (least recently used clips are removed)
     'weights_save_path': 'best_model.pth',
     'device': 'cuda' if torch.cuda.is_available() else 'cpu'
 }
@@ -35,16 +44,31 @@ CONFIG = {
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def build_dataset(mode):
+    """
+    The training data with the transforms for `mode` ('train' augments,
+    'val' is deterministic).
+    """
+    if CONFIG['shard_dir']:
+        # Pre-resized frames, no JPEG decoding in the loop
+        return ShardDataset(
+            CONFIG['shard_dir'],
+            seq_len=CONFIG['seq_len'],
+            transform=get_shard_transforms(mode=mode),
+            mode=mode
+        )
+    return DeepFakeDataset(
+        root_dir=CONFIG['data_dir'], 
+        seq_len=CONFIG['seq_len'],
+        transform=get_transforms(mode=mode),
+        mode=mode
+    )
+
 def train_model():
     logger.info(f"Using device: {CONFIG['device']}")
     
     # 1. Dataset & Dataloaders
-    train_dataset = DeepFakeDataset(
-        root_dir=CONFIG['data_dir'], 
-        seq_len=CONFIG['seq_len'],
-        transform=get_transforms(mode='train'),
-        mode='train'
-    )
+    train_dataset = build_dataset('train')
     
     # Simple validation using a subset or separate folder if available
     # For now, we assume user might split folders or we use a subset
@@ -52,16 +76,26 @@ def train_model():
     # In a real scenario, use torch.utils.data.random_split
     train_size = int(0.8 * len(train_dataset))
     val_size = len(train_dataset) - train_size
-    train_subset, val_subset = torch.utils.data.random_split(train_dataset, [train_size, val_size])
+    train_subset, val_split = torch.utils.data.random_split(train_dataset, [train_size, val_size])
+
+    # Validation clips come from the same videos without augmentation, so
+    # they are identical every epoch and can be cached
+    val_dataset = build_dataset('val')
+    if CONFIG['cache_val']:
+        val_dataset = CachedDataset(val_dataset, CONFIG['val_cache_dir'], CONFIG['val_cache_memory_mb'],
+                                    CONFIG['val_cache_disk_mb'])
+    val_subset = Subset(val_dataset, val_split.indices)
     
     train_loader = DataLoader(
         train_subset, batch_size=CONFIG['batch_size'], 
         shuffle=True, num_workers=CONFIG['num_workers'], pin_memory=True
     )
     
+    # Persistent workers keep their cached clips between epochs
     val_loader = DataLoader(
         val_subset, batch_size=CONFIG['batch_size'], 
-        shuffle=False, num_workers=CONFIG['num_workers'], pin_memory=True
+        shuffle=False, num_workers=CONFIG['num_workers'], pin_memory=True,
+        persistent_workers=CONFIG['cache_val'] and CONFIG['num_workers'] > 0
     )
     
     logger.info(f"Training on {len(train_subset)} videos, Validating on {len(val_subset)} videos")
@@ -143,7 +177,7 @@ def train_model():
     logger.info(f"Best Validation Loss: {best_vloss:.4f}")
 
 if __name__ == "__main__":
-    if not os.path.exists(CONFIG['data_dir']):
+    if not os.path.exists(CONFIG['shard_dir'] or CONFIG['data_dir']):
         logger.error(f"Dataset path {CONFIG['data_dir']} does not exist. Please update CONFIG in train.py")
     else:
         train_model()
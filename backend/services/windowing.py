@@ -0,0 +1,148 @@
+import torch
+from collections import deque
+from torch.nn.utils.rnn import pad_sequence
+
+from .preprocessing import iter_frames
+
+
+def iter_windows(timed_features, window_size, stride, frame_seconds):
+    """
+    Group a stream of (seconds, feature) pairs into overlapping windows.
+
+    Only the last `window_size` features are held, so memory is bounded by the
+    window length rather than the video length. If the regular stride does not
+    end on the last frame, one extra window covering the tail is emitted so the
+    end of the video is always scored.
+
+    Args:
+        timed_features: Iterable of (timestamp in seconds, feature tensor).
+        window_size: Frames per window.
+        stride: Frames between the starts of consecutive windows.
+        frame_seconds: Duration covered by one sampled frame.
+
+    Yields:
+        (start_seconds, end_seconds, features (<= window_size, D))
+    """
+    buffer = deque(maxlen=window_size)
+    seen = 0
+    last_emitted = 0
+    for timestamp, feature in timed_features:
+        buffer.append((timestamp, feature))
+        seen += 1
+        if seen >= window_size and (seen - window_size) % stride == 0:
+            last_emitted = seen
+            yield _window(buffer, frame_seconds)
+
+    if buffer and last_emitted != seen:
+        yield _window(buffer, frame_seconds)
+
+
+def _window(buffer, frame_seconds):
+    start = buffer[0][0]
+    end = buffer[-1][0] + frame_seconds
+    return start, end, torch.stack([feature for _, feature in buffer])
+
+
+def _timed_features(video_path, backend, fps_sample, chunk_size, embedding_cache):
+    # Every frame goes through the CNN once, however many windows it falls in
+    timestamps, frames = [], []
+    for timestamp, frame in iter_frames(video_path, max_duration=None, fps_sample=fps_sample, with_timestamps=True):
+        timestamps.append(timestamp)
+        frames.append(frame)
+        if len(frames) == chunk_size:
+            yield from zip(timestamps, backend.embed_frames(torch.stack(frames), embedding_cache))
+            timestamps, frames = [], []
+    if frames:
+        yield from zip(timestamps, backend.embed_frames(torch.stack(frames), embedding_cache))
+
+
+def _classify_windows(backend, windows):
+    lengths = torch.tensor([features.size(0) for _, _, features in windows], dtype=torch.long)
+    padded = pad_sequence([features for _, _, features in windows], batch_first=True)
+    same_length = bool((lengths == lengths[0]).all())
+    probabilities = backend.run_head(padded, None if same_length else lengths).view(-1).tolist()
+    return [
+        {"start": round(start, 2), "end": round(end, 2), "probability": round(probability, 4)}
+        for (start, end, _), probability in zip(windows, probabilities)
+    ]
+
+
+def score_windows(video_path, backend, window_seconds=10, stride_seconds=5, fps_sample=3,
+                  batch_size=8, embedding_cache=None):
+    """
+    Score the whole video in overlapping windows.
+
+    Frames are decoded and embedded in chunks, windows are cut from a bounded
+    buffer of frame features, and `batch_size` windows at a time go through
+    the BiLSTM head together.
+
+    Args:
+        video_path: Path to the video file.
+        backend: InferenceBackend used for the CNN and the head.
+        window_seconds: Window length in seconds.
+        stride_seconds: Seconds between window starts.
+        fps_sample: Number of frames per second to sample.
+        batch_size: Windows classified per forward pass.
+        embedding_cache: Optional EmbeddingCache for frame features.
+
+    Returns:
+        (windows, frames_used) where windows is a list of
+        {"start", "end", "probability"} dicts in time order.
+    """
+    window_size = max(1, round(window_seconds * fps_sample))
+    stride = max(1, round(stride_seconds * fps_sample))
+    frame_seconds = 1.0 / fps_sample
+
+    frames_used = 0
+
+    def _counted(timed_features):
+        nonlocal frames_used
+        for item in timed_features:
+            frames_used += 1
+            yield item
+
+    features = _counted(_timed_features(video_path, backend, fps_sample, window_size, embedding_cache))
+
+    windows = []
+    pending = []
+    for window in iter_windows(features, window_size, stride, frame_seconds):
+        pending.append(window)
+        if len(pending) == batch_size:
+            windows.extend(_classify_windows(backend, pending))
+            pending = []
+    if pending:
+        windows.extend(_classify_windows(backend, pending))
+
+    if not windows:
+        raise ValueError("No frames could be extracted from the video.")
+    return windows, frames_used
+
+
+def suspicious_segments(windows, threshold=0.5):
+    """
+    Merge overlapping or touching windows scored above `threshold` into time
+    ranges, each with the highest window probability inside it.
+    """
+    segments = []
+    for window in windows:
+        if window["probability"] <= threshold:
+            continue
+        if segments and window["start"] <= segments[-1]["end"]:
+            segments[-1]["end"] = max(segments[-1]["end"], window["end"])
+            segments[-1]["max_probability"] = max(segments[-1]["max_probability"], window["probability"])
+        else:
+            segments.append({"start": window["start"], "end": window["end"], "max_probability": window["probability"]})
+    return segments
+
+
+def aggregate_windows(windows, method='max'):
+    """
+    Whole-video probability from the window scores: 'max' flags a video if any
+    window looks fake, 'mean' averages over the whole video.
+    """
+    probabilities = [window["probability"] for window in windows]
+    if method == 'max':
+        return max(probabilities)
+    if method == 'mean':
+        return sum(probabilities) / len(probabilities)
+    raise ValueError(f"Unknown window aggregate: {method} (expected 'max' or 'mean')")
@@ -0,0 +1,172 @@
+import threading
+import time
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _timed_call(fn, args, kwargs, collect=False):
+    # Module level so it can be pickled into a worker process.
+    # time.time() rather than perf_counter() because the parent compares it.
+    # With `collect` (worker processes), the metric updates made by `fn` are
+    # returned too, for the parent to replay into the registry it exports.
+    started = time.time()
+    if not collect:
+        return fn(*args, **kwargs), started, time.time(), None
+    with metrics.collecting() as records:
+        result = fn(*args, **kwargs)
+    return result, started, time.time(), records
+
+
+def _noop():
+    return None
+
+
+class AnalysisPool:
+    """
+    Bounded worker pool for blocking analysis work.
+
+    At most `max_workers` tasks run at once and at most `max_queue` more may
+    wait for a worker. Admission is checked with `try_acquire()` *before* the
+    caller does any expensive work (e.g. spooling an upload to disk), so a
+    saturated server rejects requests instead of piling up temp files.
+
+    Args:
+        max_workers: Number of worker threads/processes.
+        max_queue: Number of admitted tasks allowed to wait for a worker.
+        kind: 'thread' or 'process'.
+        initializer: Optional callable run once in every worker process
+                     (e.g. to preload the model). Ignored for threads, which
+                     share the parent's state.
+    """
+    def __init__(self, max_workers=2, max_queue=8, kind='thread', initializer=None):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.kind = kind
+        self._create_executor(initializer)
+
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._busy_seconds = 0.0
+        self._task_seconds = 0.0
+        self._started_at = time.time()
+
+    def _create_executor(self, initializer):
+        if self.kind == 'process':
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=initializer)
+        elif self.kind == 'thread':
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='analysis')
+        else:
+            raise ValueError(f"Unknown worker pool kind: {self.kind}")
+
+    def _dispatch(self, fn, args, kwargs):
+        # Returns a future resolving to _timed_call's (result, started, finished, records)
+        return self._executor.submit(_timed_call, fn, args, kwargs, self.kind != 'thread')
+
+    def try_acquire(self, blocking=False, timeout=None):
+        """
+        Reserve an admission slot. Returns False (and counts a rejection) when
+        the pool and its queue are full. Every successful call must be paired
+        with either `submit()` or `release()`.
+        """
+        if timeout is not None:
+            acquired = self._slots.acquire(timeout=timeout)
+        else:
+            acquired = self._slots.acquire(blocking=blocking)
+
+        with self._lock:
+            if acquired:
+                self._admitted += 1
+            else:
+                self._rejected += 1
+        return acquired
+
+    def release(self):
+        """
+        Give back a slot reserved with `try_acquire()` that will not be submitted.
+        """
+        with self._lock:
+            self._admitted -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Run `fn` on the pool using a slot reserved with `try_acquire()`.
+        Returns a concurrent.futures.Future for the result of `fn`. If this
+        raises, the slot is still held and must be given back with `release()`.
+        """
+        submitted_at = time.time()
+        outer = Future()
+        inner = self._dispatch(fn, args, kwargs)
+
+        def _done(f):
+            error = f.exception()
+            with self._lock:
+                self._admitted -= 1
+                self._completed += 1
+                if error is None:
+                    result, started, finished, records = f.result()
+                    self._busy_seconds += finished - started
+                    self._task_seconds += finished - submitted_at
+            self._slots.release()
+            if error is None and records:
+                metrics.replay(records)
+
+            if error is None:
+                outer.set_result(result)
+            else:
+                outer.set_exception(error)
+
+        inner.add_done_callback(_done)
+        return outer
+
+    def retry_after(self):
+        """
+        Rough number of seconds until a slot frees up, for the Retry-After header.
+        """
+        with self._lock:
+            completed = self._completed
+            task_seconds = self._task_seconds
+        if not completed:
+            return 5
+        avg_task = task_seconds / completed
+        return max(1, int(round(avg_task * (self.max_queue + 1) / self.max_workers)))
+
+    def stats(self):
+        with self._lock:
+            in_flight = self._admitted
+            running = min(in_flight, self.max_workers)
+            uptime = max(time.time() - self._started_at, 1e-9)
+            return {
+                'kind': self.kind,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'in_flight': in_flight,
+                'running': running,
+                'queue_depth': in_flight - running,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'utilisation': round(running / self.max_workers, 3),
+                'busy_ratio': round(self._busy_seconds / (uptime * self.max_workers), 3),
+                'avg_task_seconds': round(self._task_seconds / self._completed, 3) if self._completed else 0.0,
+            }
+
+    def prestart(self):
+        """
+        Start every worker now (process pools spawn lazily), so initializers
+        such as model preloading run before the first request arrives.
+        """
+        if self.kind != 'process':
+            return
+        futures = [self._executor.submit(_noop) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
@@ -0,0 +1,110 @@
+import sys
+import os
+import tempfile
+import pytest
+import torch
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services.ai_models import DeepFakeDetector
+from services.backends import EagerBackend, create_backend, export_cnn, check_parity
+
+
+def _model():
+    torch.manual_seed(0)
+    return DeepFakeDetector(pretrained_backbone=False).eval()
+
+
+def test_eager_backend_matches_model_forward():
+    model = _model()
+    clips = [torch.randn(n, 3, 64, 64) for n in (3, 5)]
+    probabilities = EagerBackend(model).run_batch(clips)
+
+    with torch.no_grad():
+        expected = [model(clip.unsqueeze(0)).item() for clip in clips]
+    assert probabilities == pytest.approx(expected, abs=1e-5)
+
+
+@pytest.mark.parametrize("fmt,extension", [("torchscript", "ts"), ("onnx", "onnx")])
+def test_exported_backend_parity(fmt, extension):
+    if fmt == "onnx":
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("onnx")
+
+    model = _model()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"model.{extension}")
+        export_cnn(model, fmt, path, frame_size=64)
+
+        passed, max_diff = check_parity(EagerBackend(model), create_backend(fmt, model, path), frame_size=64)
+        assert passed, max_diff
+
+
+def test_int8_backend_tracks_fp32():
+    from services.backends import Int8Backend
+    from services.quantize import quantize_cnn
+
+    model = _model()
+    calibration = [(torch.randn(1, 4, 3, 64, 64), None) for _ in range(2)]
+    traced = quantize_cnn(model, calibration, calibration_batches=2, frame_size=64)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.int8.ts")
+        traced.save(path)
+
+        passed, max_diff = check_parity(EagerBackend(model), Int8Backend(model, path), tolerance=0.05, frame_size=64)
+        assert passed, max_diff
+
+
+def test_calibration_clips_are_held_out_of_the_gate():
+    from services.quantize import split_calibration
+
+    dataset = list(range(10))
+    calibration, gate = split_calibration(dataset, calibration_clips=64)
+    assert len(calibration) == 5 and len(gate) == 5
+    assert not set(calibration.indices) & set(gate.indices)
+    assert split_calibration(dataset, 3)[0].indices == split_calibration(dataset, 3)[0].indices
+
+
+def test_chunked_cnn_forward_matches_single_call():
+    model = _model()
+    clips = [torch.randint(0, 256, (n, 64, 64, 3), dtype=torch.uint8) for n in (7, 4)]
+    expected = EagerBackend(model).run_batch(clips)
+    chunked = create_backend('eager', model, chunk_size=3)
+    assert chunked.run_batch(clips) == pytest.approx(expected, abs=1e-6)
+
+    frames = torch.randn(2, 5, 3, 64, 64)
+    with torch.no_grad():
+        assert torch.allclose(model(frames, chunk_size=2), model(frames), atol=1e-6)
+
+
+def test_peak_memory_reports_growth():
+    from services.memory import PeakMemory, current_rss
+    if current_rss() is None:
+        pytest.skip("RSS not available on this platform")
+
+    with PeakMemory(interval=0.001) as peak:
+        block = torch.ones(64 * 1024 * 1024 // 4)
+        del block
+    report = peak.report()
+    assert report['rss_growth_mb'] >= 32
+    assert report['peak_rss_mb'] >= report['rss_growth_mb']
+
+
+def test_overlapping_peak_memory_blocks_skip_the_cuda_peak(monkeypatch):
+    from services.memory import PeakMemory
+
+    with PeakMemory() as outer:
+        with PeakMemory() as inner:
+            pass
+    with PeakMemory() as alone:
+        pass
+    assert outer.overlapped and inner.overlapped and not alone.overlapped
+
+    # Pretend to be on a GPU: only the block that ran alone reports its peak
+    monkeypatch.setattr(torch.cuda, 'max_memory_allocated', lambda: 0)
+    for peak in (outer, alone):
+        peak._cuda = True
+    assert 'peak_cuda_mb' not in outer.report()
+    assert alone.report()['peak_cuda_mb'] == 0
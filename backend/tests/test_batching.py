@@ -0,0 +1,51 @@
+import sys
+import os
+import threading
+import torch
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services.batching import BatchScheduler
+
+
+def test_scheduler_returns_each_caller_its_own_result():
+    seen_batches = []
+
+    def run_batch(clips):
+        seen_batches.append(len(clips))
+        # Probability encodes the clip length so callers can check they got theirs
+        return [clip.size(0) / 100.0 for clip in clips]
+
+    scheduler = BatchScheduler(run_batch, max_batch_size=4, max_wait_ms=200)
+    results = {}
+
+    def worker(seq_len):
+        results[seq_len] = scheduler.infer(torch.zeros(seq_len, 3, 8, 8))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(1, 9)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {n: n / 100.0 for n in range(1, 9)}
+    assert max(seen_batches) > 1
+    assert max(seen_batches) <= 4
+
+    stats = scheduler.stats()
+    assert stats['clips'] == 8
+    assert stats['batches'] == len(seen_batches)
+
+
+def test_scheduler_propagates_errors():
+    def run_batch(clips):
+        raise RuntimeError("boom")
+
+    scheduler = BatchScheduler(run_batch, max_batch_size=2, max_wait_ms=1)
+    try:
+        scheduler.infer(torch.zeros(1, 3, 8, 8))
+        assert False, "Expected the batch error to reach the caller"
+    except RuntimeError as e:
+        assert "boom" in str(e)
+    assert scheduler.stats()['errors'] == 1
@@ -0,0 +1,226 @@
+import sys
+import os
+import pickle
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+from torchvision import transforms
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services import dataset as dataset_module
+from services.clip_cache import CachedDataset
+from services.dataset import DeepFakeDataset, FrameManifest, load_manifest
+
+
+def _make_video(root, class_name, name, frames):
+    folder = os.path.join(root, class_name, name)
+    os.makedirs(folder, exist_ok=True)
+    for i in range(frames):
+        Image.new('RGB', (8, 8), color=(i * 10, 0, 0)).save(os.path.join(folder, f"frame_{i}.jpg"))
+    return folder
+
+
+def _count_listings(monkeypatch):
+    calls = []
+    original = dataset_module._list_frames
+    monkeypatch.setattr(dataset_module, '_list_frames', lambda folder: calls.append(folder) or original(folder))
+    return calls
+
+
+def test_dataset_uses_manifest_and_relists_only_changed_folders(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    _make_video(root, 'real', 'a', 4)
+    _make_video(root, 'fake', 'b', 3)
+    _make_video(root, 'fake', 'too_short', 1)
+    listings = _count_listings(monkeypatch)
+
+    dataset = DeepFakeDataset(root, seq_len=2, transform=transforms.ToTensor())
+    assert len(dataset) == 2 and len(listings) == 3
+    frames, label = dataset[1]
+    assert frames.shape == (2, 3, 8, 8) and label.item() == 1.0
+    assert dataset.manifest.frame_names(0) == ['frame_0.jpg', 'frame_1.jpg', 'frame_2.jpg', 'frame_3.jpg']
+    assert isinstance(dataset.manifest.frames, np.memmap)
+
+    # Unchanged dataset: nothing is listed, not even in __getitem__
+    listings.clear()
+    dataset = DeepFakeDataset(root, seq_len=2, transform=transforms.ToTensor())
+    dataset[0]
+    assert listings == []
+
+    # A new video folder changes the class mtime; only it is listed
+    new_folder = _make_video(root, 'real', 'c', 2)
+    assert len(DeepFakeDataset(root, seq_len=2, transform=transforms.ToTensor())) == 3
+    assert listings == [new_folder]
+
+    # Frames added inside a folder are only seen with verify
+    _make_video(root, 'fake', 'too_short', 3)
+    listings.clear()
+    manifest = load_manifest(root)
+    assert manifest.frame_count(list(manifest.videos).index(b'fake/too_short')) == 1
+    assert listings == []
+    assert len(DeepFakeDataset(root, seq_len=2, transform=transforms.ToTensor(), verify_manifest=True)) == 4
+
+
+def test_pickled_dataset_reopens_the_manifest(tmp_path):
+    root = str(tmp_path)
+    _make_video(root, 'real', 'a', 3)
+    dataset = DeepFakeDataset(root, seq_len=2, transform=transforms.ToTensor())
+
+    # What a spawned DataLoader worker receives
+    state = pickle.dumps(dataset)
+    assert len(state) < 4096
+    copy = pickle.loads(state)
+    assert isinstance(copy.manifest, FrameManifest)
+    assert copy[0][0].shape == dataset[0][0].shape
+
+
+def test_pickled_dataset_keeps_its_manifest_build(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    _make_video(root, 'real', 'a', 3)
+    dataset = DeepFakeDataset(root, seq_len=2, transform=transforms.ToTensor())
+    state = pickle.dumps(dataset)
+
+    # The dataset changes and the manifest is rebuilt before a worker starts:
+    # the worker still opens the build the parent's indices refer to
+    _make_video(root, 'real', 'b', 3)
+    rebuilt = load_manifest(root)
+    assert rebuilt.build != dataset.manifest.build and len(rebuilt) == 2
+    copy = pickle.loads(state)
+    assert copy.manifest.build == dataset.manifest.build and len(copy.manifest) == 1
+
+    # Concurrent builders write separate files; meta names exactly one build
+    first, second = load_manifest(root), load_manifest(root)
+    second.save(dataset.manifest_dir)
+    first.save(dataset.manifest_dir)
+    assert FrameManifest.open(dataset.manifest_dir).build == first.build
+
+
+def test_unsaved_manifest_is_pickled_with_the_dataset(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    _make_video(root, 'real', 'a', 3)
+
+    # Read-only dataset: the manifest can't be saved and only lives in memory
+    def read_only(self, manifest_dir):
+        raise OSError("read-only file system")
+    monkeypatch.setattr(FrameManifest, 'save', read_only)
+    dataset = DeepFakeDataset(root, seq_len=2, transform=transforms.ToTensor())
+    assert dataset.manifest.build is None
+
+    listings = _count_listings(monkeypatch)
+    copy = pickle.loads(pickle.dumps(dataset))
+    assert listings == []
+    assert copy.manifest.frame_names(0) == dataset.manifest.frame_names(0)
+
+
+class _CountingTransform:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, img):
+        self.calls += 1
+        return transforms.functional.to_tensor(img)
+
+    def __repr__(self):
+        return "CountingToTensor()"
+
+
+def test_cached_dataset_decodes_each_clip_once(tmp_path):
+    root, cache_dir = str(tmp_path / "data"), str(tmp_path / "cache")
+    _make_video(root, 'real', 'a', 4)
+    _make_video(root, 'fake', 'b', 3)
+
+    transform = _CountingTransform()
+    cached = CachedDataset(DeepFakeDataset(root, seq_len=2, transform=transform, mode='val'), cache_dir)
+    first = [cached[i] for i in range(len(cached))]
+    assert transform.calls == 4
+    # Later epochs come from memory
+    second = [cached[i] for i in range(len(cached))]
+    assert transform.calls == 4
+    assert cached.stats()['hits'] == 2 and cached.stats()['misses'] == 2
+
+    # Another run on the same split (e.g. evaluate.py) reads the disk cache,
+    # also with no room in memory
+    transform = _CountingTransform()
+    rerun = CachedDataset(DeepFakeDataset(root, seq_len=2, transform=transform, mode='val'), cache_dir, max_memory_mb=0)
+    for i in range(len(rerun)):
+        clip, label = rerun[i]
+        assert torch.equal(clip, first[i][0]) and torch.equal(second[i][0], clip)
+        assert label.item() == first[i][1].item()
+    assert transform.calls == 0
+    assert rerun.stats()['disk_hits'] == 2 and rerun.stats()['memory_mb'] == 0
+
+    # A different transform is a different cache entry
+    other = CachedDataset(DeepFakeDataset(root, seq_len=2, transform=transforms.ToTensor(), mode='val'), cache_dir)
+    other[0]
+    assert other.stats()['misses'] == 1
+
+    with pytest.raises(ValueError):
+        CachedDataset(DeepFakeDataset(root, seq_len=2, transform=transform, mode='train'))
+
+
+def test_cached_dataset_spills_past_the_memory_cap(tmp_path):
+    root = str(tmp_path / "data")
+    _make_video(root, 'real', 'a', 4)
+    _make_video(root, 'fake', 'b', 3)
+
+    # No cache dir and no room in memory: clips spill to a private temp dir
+    transform = _CountingTransform()
+    cached = CachedDataset(DeepFakeDataset(root, seq_len=2, transform=transform, mode='val'), max_memory_mb=0)
+    first = [cached[i][0] for i in range(len(cached))]
+    spill_dir = cached._spill_dir
+    assert len(os.listdir(spill_dir)) == 2
+    assert all(torch.equal(cached[i][0], first[i]) for i in range(len(cached)))
+    assert transform.calls == 4 and cached.stats()['disk_hits'] == 2
+
+    del cached
+    assert not os.path.exists(spill_dir)
+
+
+def test_cached_dataset_caps_the_disk_tier(tmp_path):
+    root, cache_dir = str(tmp_path / "data"), str(tmp_path / "cache")
+    for name in 'abc':
+        _make_video(root, 'real', name, 2)
+
+    # Each 2x3x8x8 float clip file is a few KB: a 1 byte cap keeps at most the newest
+    cached = CachedDataset(DeepFakeDataset(root, seq_len=2, transform=transforms.ToTensor(), mode='val'),
+                           cache_dir, max_disk_mb=1 / (1024 * 1024))
+    for i in range(len(cached)):
+        cached[i]
+    assert len(os.listdir(cache_dir)) <= 1
+
+
+def test_manifest_that_cannot_be_reopened_is_kept_in_memory(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    _make_video(root, 'real', 'a', 3)
+
+    # Saved, but its arrays are gone before they can be mapped
+    monkeypatch.setattr(FrameManifest, 'open', classmethod(lambda cls, manifest_dir, build=None: None))
+    manifest = load_manifest(root)
+    assert manifest.build is None and len(manifest) == 1
+
+
+def test_manifest_save_keeps_other_builders_unpublished_arrays(tmp_path):
+    root, manifest_dir = str(tmp_path / "data"), str(tmp_path / "manifest")
+    _make_video(root, 'real', 'a', 3)
+    manifest = dataset_module.build_manifest(root)
+
+    manifest.save(manifest_dir)
+    first = manifest.build
+    manifest.save(manifest_dir)
+    second = manifest.build
+
+    # Another builder has written its arrays but not published meta.json yet
+    other = dataset_module.build_manifest(root)
+    for name in dataset_module._MANIFEST_ARRAYS:
+        np.save(os.path.join(manifest_dir, f"{name}.pending.npy"), getattr(other, name))
+
+    manifest.save(manifest_dir)
+    builds = {name.split('.')[1] for name in os.listdir(manifest_dir) if name.endswith('.npy')}
+    # The build superseded before this save started is gone; the one current
+    # then, the new one and the unpublished one stay
+    assert builds == {second, manifest.build, 'pending'}
+    assert first not in builds
+    assert FrameManifest.open(manifest_dir, 'pending') is not None
@@ -0,0 +1,48 @@
+import sys
+import os
+import torch
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services.embedding_cache import EmbeddingCache
+
+
+def _embed_fn(calls):
+    def embed(frames):
+        calls.append(frames.size(0))
+        # Deterministic stand-in for the CNN: one feature vector per frame
+        return frames.flatten(1)[:, :4] * 2
+    return embed
+
+
+def test_cached_frames_skip_the_cnn():
+    cache = EmbeddingCache()
+    calls = []
+    frames = torch.randn(6, 3, 4, 4)
+
+    first = cache.embed(frames, _embed_fn(calls))
+
+    # Re-upload with two new frames: only those reach the CNN
+    reupload = torch.cat([frames[2:], torch.randn(2, 3, 4, 4)])
+    second = cache.embed(reupload, _embed_fn(calls))
+
+    assert calls == [6, 2]
+    assert torch.equal(second[:4], first[2:])
+    assert torch.equal(second, reupload.flatten(1)[:, :4] * 2)
+
+    stats = cache.stats()
+    assert stats['hits'] == 4
+    assert stats['misses'] == 8
+    assert stats['entries'] == 8
+    assert stats['bytes_used'] == 8 * 4 * 4
+
+
+def test_cache_respects_byte_budget():
+    cache = EmbeddingCache(max_bytes=3 * 4 * 4)
+    cache.embed(torch.randn(5, 3, 4, 4), _embed_fn([]))
+
+    stats = cache.stats()
+    assert stats['entries'] == 3
+    assert stats['evictions'] == 2
+    assert stats['bytes_used'] <= 3 * 4 * 4
@@ -0,0 +1,79 @@
+import sys
+import os
+import numpy as np
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services.face_localizer import FaceLocalizer
+
+
+class _FakeCascade:
+    # Stand-in for cv2.CascadeClassifier that reports fixed boxes
+    def __init__(self, faces):
+        self.faces = faces
+        self.calls = 0
+
+    def detectMultiScale(self, gray, scale_factor, min_neighbors):
+        self.calls += 1
+        return self.faces
+
+
+def _frames(positions, size=40):
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (240, 320, 3), dtype=np.uint8)
+    face = rng.integers(0, 255, (size, size, 3), dtype=np.uint8)
+    for x, y in positions:
+        frame = background.copy()
+        frame[y:y + size, x:x + size] = face
+        yield frame
+
+
+def test_face_is_detected_on_keyframes_and_tracked_in_between():
+    cascade = _FakeCascade([(100, 80, 40, 40)])
+    localizer = FaceLocalizer(cascade, detect_every=5)
+    positions = [(100, 80), (104, 82), (108, 84), (112, 86), (116, 88)]
+
+    boxes = [localizer.locate(frame) for frame in _frames(positions)]
+
+    assert cascade.calls == 1
+    assert [box[:2] for box in boxes] == positions
+    assert localizer.stats() == {'detections': 1, 'tracked': 4, 'misses': 0}
+
+
+def test_no_face_falls_back_to_the_full_frame():
+    localizer = FaceLocalizer(_FakeCascade([]))
+    frame = next(_frames([(0, 0)]))
+
+    image, found = localizer.crop(frame)
+
+    assert not found
+    assert image.shape == frame.shape
+
+
+def test_frame_extraction_falls_back_to_opencv_when_ffmpeg_fails(tmp_path, monkeypatch):
+    import cv2
+    from services import extract_frames
+
+    video_path = str(tmp_path / "clip.mp4")
+    video = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (320, 240))
+    for frame in _frames([(100, 80)] * 40):
+        video.write(frame)
+    video.release()
+
+    ffmpeg_decode = extract_frames.ffmpeg_decode
+    def failing(video_path, select, width, height, **kwargs):
+        # One good frame, then ffmpeg dies
+        yield np.zeros((height, width, 3), dtype=np.uint8)
+        raise ffmpeg_decode.FFmpegDecodeError("boom")
+    monkeypatch.setattr(ffmpeg_decode, 'decode_frames', failing)
+
+    expected, actual = tmp_path / "opencv", tmp_path / "ffmpeg"
+    expected.mkdir()
+    actual.mkdir()
+    cascade = _FakeCascade([(100, 80, 40, 40)])
+    extract_frames.extract_faces_from_video(video_path, str(expected), cascade, max_frames=8)
+    extract_frames.extract_faces_from_video(video_path, str(actual), cascade, max_frames=8, decoder='ffmpeg')
+
+    assert sorted(os.listdir(actual)) == sorted(os.listdir(expected))
+    assert len(os.listdir(actual)) == 8
@@ -0,0 +1,45 @@
+import sys
+import os
+import asyncio
+import hashlib
+import tempfile
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services.ingest import UploadTooLarge, choose_spool_dir, spool_chunks
+
+
+async def _chunks(data, size=1000):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def test_spool_hashes_while_writing():
+    data = os.urandom(10000)
+    path, digest, size = asyncio.run(spool_chunks(_chunks(data), suffix=".mp4"))
+    try:
+        with open(path, 'rb') as f:
+            assert f.read() == data
+        assert digest == hashlib.sha256(data).hexdigest()
+        assert size == len(data)
+        assert path.endswith(".mp4")
+    finally:
+        os.remove(path)
+
+
+def test_spool_rejects_oversized_upload_and_cleans_up():
+    with tempfile.TemporaryDirectory() as spool_dir:
+        try:
+            asyncio.run(spool_chunks(_chunks(os.urandom(5000)), max_bytes=2500, spool_dir=spool_dir))
+            assert False, "Expected the size cap to trigger"
+        except UploadTooLarge:
+            pass
+        assert os.listdir(spool_dir) == []
+
+
+def test_small_uploads_go_to_memory_dir():
+    with tempfile.TemporaryDirectory() as memory_dir:
+        assert choose_spool_dir(100, 1000, memory_dir=memory_dir) == memory_dir
+        assert choose_spool_dir(5000, 1000, memory_dir=memory_dir) is None
+        assert choose_spool_dir(None, 1000, memory_dir=memory_dir) is None
@@ -0,0 +1,92 @@
+import sys
+import os
+import tempfile
+import time
+import queue
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services.jobs import JobStore
+from services.workers import AnalysisPool
+
+
+def _fake_analyze(video_path, progress=None):
+    progress(1, "running")
+    progress(1, "completed")
+    steps = [{"id": 1, "status": "completed"}, {"id": 2, "status": "skipped"},
+             {"id": 3, "status": "completed"}, {"id": 4, "status": "skipped"}]
+    return {"status": "completed", "result": {"label": "real", "probability": 0.1, "confidence": "high", "steps": steps}}
+
+
+def _wait_for(store, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job, _ = store.get(job_id)
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("Job did not finish in time")
+
+
+def test_job_runs_to_completion_and_cleans_up():
+    pool = AnalysisPool(max_workers=1, max_queue=1)
+    store = JobStore(pool, _fake_analyze, max_pending=4)
+
+    fd, path = tempfile.mkstemp(suffix=".mp4")
+    os.close(fd)
+
+    job = store.create("clip.mp4", path)
+    snapshot, _ = store.get(job.id)
+    assert snapshot["status"] in ("queued", "running", "completed")
+
+    finished = _wait_for(store, job.id)
+    assert finished["status"] == "completed"
+    assert finished["result"]["label"] == "real"
+    assert [step["status"] for step in finished["steps"]] == ["completed", "skipped", "completed", "skipped"]
+    assert not os.path.exists(path)
+
+
+def test_failed_analysis_marks_job_failed():
+    def failing(video_path, progress=None):
+        progress(1, "running")
+        return {"status": "failed", "error": "Could not open video file"}
+
+    pool = AnalysisPool(max_workers=1, max_queue=1)
+    store = JobStore(pool, failing, max_pending=4)
+    fd, path = tempfile.mkstemp(suffix=".mp4")
+    os.close(fd)
+
+    job = _wait_for(store, store.create("broken.mp4", path).id)
+    assert job["status"] == "failed"
+    assert "Could not open" in job["error"]
+    assert job["steps"][0]["status"] == "failed"
+
+
+def test_create_many_queues_all_or_nothing():
+    pool = AnalysisPool(max_workers=1, max_queue=1)
+    store = JobStore(pool, _fake_analyze, max_pending=2)
+
+    try:
+        store.create_many([("a.mp4", "/nonexistent/a"), ("b.mp4", "/nonexistent/b"), ("c.mp4", "/nonexistent/c")])
+    except queue.Full:
+        pass
+    else:
+        raise AssertionError("expected queue.Full")
+    assert store.stats() == {"backlog": 0, "jobs": {}}
+
+
+def test_oversized_job_upload_is_rejected_before_spooling(monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+
+    monkeypatch.setattr(main, "MAX_JOB_UPLOAD_BYTES", 1024)
+    client = TestClient(main.app)
+    free_before = main.job_store.free_slots()
+
+    # Well under the per-file cap, so only the Content-Length check can refuse it
+    files = [("files", ("clip.mp4", b"\x00" * 2048, "video/mp4"))]
+    response = client.post("/jobs", files=files)
+
+    assert response.status_code == 413
+    assert main.job_store.free_slots() == free_before
@@ -0,0 +1,28 @@
+import sys
+import os
+import pytest
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services import metrics
+
+
+def _count(stage):
+    return metrics.REGISTRY.get_sample_value('voxear_stage_seconds_count', {'stage': stage}) or 0
+
+
+def test_timed_records_the_stage_even_on_error():
+    before = _count('head')
+    with pytest.raises(RuntimeError):
+        with metrics.timed('head'):
+            raise RuntimeError("boom")
+    after = _count('head')
+    assert after == before + 1
+
+
+def test_metrics_render_in_prometheus_text_format():
+    metrics.observe('cnn_forward', 0.02)
+    body, content_type = metrics.render()
+    assert content_type.startswith("text/plain")
+    assert b'voxear_stage_seconds_bucket{le="0.025",stage="cnn_forward"}' in body
@@ -0,0 +1,42 @@
+import sys
+import os
+import tempfile
+import torch
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services.ai_models import DeepFakeDetector
+from services.model_artifact import save_artifact, load_artifact
+
+
+def _model():
+    torch.manual_seed(0)
+    return DeepFakeDetector(pretrained_backbone=False).eval()
+
+
+def test_forward_batch_matches_single_clip_forward():
+    model = _model()
+    clips = [torch.randn(n, 3, 64, 64) for n in (4, 2, 6)]
+
+    with torch.no_grad():
+        batched = model.forward_batch(clips).view(-1)
+        single = torch.cat([model(clip.unsqueeze(0)).view(-1) for clip in clips])
+
+    assert torch.allclose(batched, single, atol=1e-5)
+
+
+def test_artifact_round_trip():
+    model = _model()
+    frames = torch.randn(1, 3, 3, 64, 64)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.pt")
+        save_artifact(model, path)
+
+        timings = {}
+        loaded = load_artifact(path, timings=timings).eval()
+        assert set(timings) == {"read", "construct", "load_weights"}
+
+        with torch.no_grad():
+            assert torch.allclose(model(frames), loaded(frames), atol=1e-6)
@@ -0,0 +1,164 @@
+import sys
+import os
+import cv2
+import numpy as np
+import pytest
+import torch
+from torchvision import transforms
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services import ffmpeg_decode
+from services.preprocessing import SAMPLERS, sample_frames, benchmark_samplers, preprocess_frame, normalize_frames, iter_frames
+
+
+def _write_video(path, frames=45, fps=30):
+    video = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (64, 48))
+    rng = np.random.default_rng(0)
+    for _ in range(frames):
+        video.write(rng.integers(0, 255, (48, 64, 3), dtype=np.uint8))
+    video.release()
+    return str(path)
+
+
+def test_samplers_pick_the_same_frames(tmp_path):
+    video_path = _write_video(tmp_path / "clip.mp4")
+
+    cap = cv2.VideoCapture(video_path)
+    assert [index for index, _ in sample_frames(cap, 10, 'grab')] == [0, 10, 20, 30, 40]
+    cap.release()
+
+    results = benchmark_samplers(video_path, repeats=1)
+    assert all(results[sampler]['identical'] and results[sampler]['frames'] == 5 for sampler in SAMPLERS)
+
+
+def test_uint8_pipeline_matches_the_torchvision_transform():
+    # The per-frame PIL pipeline preprocessing used to run
+    reference = transforms.Compose([
+        transforms.ToPILImage(),
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+    ])
+    rng = np.random.default_rng(0)
+    # Smooth images, a downscaled frame and an upscaled face crop
+    frames = [cv2.GaussianBlur(rng.integers(0, 255, shape, dtype=np.uint8), (0, 0), 3)
+              for shape in [(480, 640, 3), (150, 120, 3)]]
+
+    buffer = np.empty((len(frames), 224, 224, 3), dtype=np.uint8)
+    for i, frame in enumerate(frames):
+        preprocess_frame(frame, buffer[i])
+    actual = normalize_frames(torch.from_numpy(buffer))
+    expected = torch.stack([reference(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for frame in frames])
+
+    assert actual.shape == expected.shape == (2, 3, 224, 224)
+    diff = (actual - expected).abs()
+    assert diff.mean() < 0.01
+    assert diff.max() < 0.1
+
+
+def test_parallel_segment_decoding_matches_sequential(tmp_path, monkeypatch):
+    from services import preprocessing
+
+    video_path = _write_video(tmp_path / "clip.mp4", frames=90)
+    monkeypatch.setitem(preprocessing.CONFIG, 'face_crop_enabled', False)
+    expected = preprocessing.process_video(video_path)
+
+    monkeypatch.setitem(preprocessing.CONFIG, 'decode_workers', 3)
+    monkeypatch.setitem(preprocessing.CONFIG, 'decode_segment_seconds', 1.0)
+    assert preprocessing.decode_workers_for(3.0) == 3
+    assert preprocessing.decode_workers_for(0.5) == 1
+    actual = preprocessing.process_video(video_path)
+
+    assert torch.equal(actual, expected)
+
+    # Face cropping tracks across the whole clip, so it stays sequential
+    def no_segments(*args):
+        raise AssertionError("segmented decode with face crop")
+    monkeypatch.setattr(preprocessing, '_decode_segments', no_segments)
+    monkeypatch.setitem(preprocessing.CONFIG, 'face_crop_enabled', True)
+    preprocessing.process_video(video_path)
+
+
+@pytest.mark.skipif(not ffmpeg_decode.available(), reason="ffmpeg not installed")
+def test_ffmpeg_decoder_selects_the_same_frames(tmp_path):
+    video_path = _write_video(tmp_path / "clip.mp4", frames=90)
+
+    cap = cv2.VideoCapture(video_path)
+    expected = [frame for _, frame in sample_frames(cap, 10, 'read', start=20)]
+    cap.release()
+    actual = list(ffmpeg_decode.decode_frames(video_path, ffmpeg_decode.every_nth(10, 20), 64, 48))
+    assert len(actual) == len(expected) == 7
+    assert all(np.array_equal(a, b) for a, b in zip(actual, expected))
+
+    scaled = list(iter_frames(video_path, face_crop=False, decoder='ffmpeg'))
+    assert len(scaled) == 9 and scaled[0].shape == (224, 224, 3)
+
+
+def test_ffmpeg_decoder_falls_back_to_opencv(tmp_path, monkeypatch):
+    from services import preprocessing
+
+    def _failing(*args, **kwargs):
+        raise ffmpeg_decode.FFmpegDecodeError("boom")
+        yield
+
+    video_path = _write_video(tmp_path / "clip.mp4")
+    monkeypatch.setattr(preprocessing, '_ffmpeg_available', True)
+    monkeypatch.setattr(ffmpeg_decode, 'decode_frames', _failing)
+
+    expected = list(iter_frames(video_path, face_crop=False, decoder='opencv'))
+    actual = list(iter_frames(video_path, face_crop=False, decoder='ffmpeg'))
+    assert len(actual) == 5
+    assert all(torch.equal(a, b) for a, b in zip(actual, expected))
+
+
+def test_keyframe_plan_picks_nearest_keyframes_and_falls_back(tmp_path, monkeypatch):
+    from services import preprocessing
+
+    video_path = _write_video(tmp_path / "clip.mp4", frames=90)
+    monkeypatch.setattr(preprocessing, '_ffmpeg_available', True)
+    monkeypatch.setattr(preprocessing, 'keyframe_indices', lambda path, max_frame=None: [0, 25, 50, 75])
+
+    # Targets 0, 10, ..., 80 (3 fps of 30) snap to the nearest keyframe
+    plan = preprocessing.plan_keyframes(video_path, min_frames=3)
+    assert plan == [(0, 0), (25, 1), (50, 2), (75, 3)]
+    # GOP too long for the minimum: sample uniformly
+    assert preprocessing.plan_keyframes(video_path, min_frames=5) is None
+
+    def _failing(*args, **kwargs):
+        raise ffmpeg_decode.FFmpegDecodeError("boom")
+        yield
+
+    # Without a working ffmpeg the planned frames are still the ones decoded
+    monkeypatch.setattr(ffmpeg_decode, 'decode_frames', _failing)
+    actual = preprocessing.process_video(video_path, face_crop=False, keyframes=plan)[0]
+
+    cap = cv2.VideoCapture(video_path)
+    expected = [preprocess_frame(frame) for index, frame in sample_frames(cap, 1, 'read') if index in (0, 25, 50, 75)]
+    cap.release()
+    assert torch.equal(actual, torch.from_numpy(np.stack(expected)))
+
+
+def test_adaptive_sampling_skips_near_duplicates(tmp_path, monkeypatch):
+    from services import preprocessing
+
+    # 3 s static, a cut to another static scene for 3 s, then 3 s of noise
+    rng = np.random.default_rng(0)
+    scenes = [np.full((48, 64, 3), 60, np.uint8), np.full((48, 64, 3), 200, np.uint8)]
+    path = str(tmp_path / "clip.avi")
+    video = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (64, 48))
+    for i in range(270):
+        video.write(scenes[i // 90] if i < 180 else rng.integers(0, 255, (48, 64, 3), dtype=np.uint8))
+    video.release()
+
+    monkeypatch.setitem(preprocessing.CONFIG, 'adaptive_max_gap_seconds', 100.0)
+    uniform = preprocessing.process_video(path, face_crop=False, adaptive=False)
+    adaptive = preprocessing.process_video(path, face_crop=False, adaptive=True)
+    # One frame per static scene, every noise frame
+    assert uniform.size(1) == 27
+    assert adaptive.size(1) == 2 + 9
+
+    change_filter = preprocessing.ChangeFilter(min_change=1.0, max_gap=2.0)
+    assert [change_filter.keep(scenes[0], seconds) for seconds in (0, 1, 2.5, 3)] == [True, False, True, False]
+    assert change_filter.keep(scenes[1], 3.5)
@@ -0,0 +1,61 @@
+import sys
+import os
+import json
+import threading
+import torch
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services import profiling
+
+
+def test_run_profiled_saves_trace_and_stage_timers(tmp_path):
+    def work():
+        with profiling.stage("matmul"):
+            torch.randn(64, 64) @ torch.randn(64, 64)
+        profiling.record_stage("decode", 0.25)
+        profiling.record_stage("decode", 0.25)
+        return "done"
+
+    value, summary = profiling.run_profiled(work, str(tmp_path))
+    assert value == "done"
+    assert summary["stages_ms"] == {"decode": 500.0}
+    assert os.path.exists(tmp_path / f"{summary['id']}.trace.json")
+    with open(tmp_path / f"{summary['id']}.json") as f:
+        assert json.load(f)["top_operators"]
+
+
+def test_stage_timers_are_ignored_outside_a_profile():
+    profiling.record_stage("decode", 1.0)
+    assert getattr(profiling._active, 'stages', None) is None
+
+
+def test_concurrent_profiled_runs_are_rejected(tmp_path):
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return torch.ones(4).sum().item()
+
+    first = threading.Thread(target=lambda: results.append(profiling.run_profiled(slow, str(tmp_path))))
+    first.start()
+    assert started.wait(5)
+
+    def second():
+        try:
+            profiling.run_profiled(lambda: "second", str(tmp_path))
+        except profiling.ProfilerBusy as e:
+            results.append(e)
+    thread = threading.Thread(target=second)
+    thread.start()
+    thread.join()
+    release.set()
+    first.join()
+
+    assert isinstance(results[0], profiling.ProfilerBusy)
+    assert results[1][0] == 4.0
+    # The slot is free again
+    assert profiling.run_profiled(lambda: "again", str(tmp_path))[0] == "again"
@@ -0,0 +1,117 @@
+import sys
+import os
+import cv2
+import numpy as np
+import torch
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services import analyzer
+
+
+class _FixedBackend:
+    # Stand-in backend that always returns the same probability
+    name = 'fixed'
+
+    def __init__(self, probability):
+        self.probability = probability
+        self.embedded = 0
+
+    def embed_frames(self, frames, embedding_cache=None):
+        self.embedded += frames.size(0)
+        return torch.zeros(frames.size(0), 4)
+
+    def run_head(self, features, lengths=None):
+        return torch.tensor([[self.probability]])
+
+    def run_batch(self, clips, embedding_cache=None):
+        self.embedded += sum(clip.size(0) for clip in clips)
+        return [self.probability] * len(clips)
+
+
+def _write_video(path, seconds=4, fps=30):
+    video = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (64, 48))
+    for _ in range(seconds * fps):
+        video.write(np.random.randint(0, 255, (48, 64, 3), dtype=np.uint8))
+    video.release()
+    return str(path)
+
+
+def _analyze(monkeypatch, tmp_path, probability):
+    backend = _FixedBackend(probability)
+    monkeypatch.setattr(analyzer, '_backend_instance', backend)
+    monkeypatch.setitem(analyzer.CONFIG, 'analysis_mode', 'progressive')
+    monkeypatch.setitem(analyzer.CONFIG, 'progressive_chunk_frames', 3)
+    monkeypatch.setitem(analyzer.CONFIG, 'progressive_min_frames', 3)
+    monkeypatch.setitem(analyzer.CONFIG, 'progressive_exit_confidence', 'high')
+    response = analyzer.analyze_video(_write_video(tmp_path / "clip.mp4"))
+    assert response["status"] == "completed"
+    return response["result"], backend
+
+
+def test_confident_verdict_exits_after_first_chunk(monkeypatch, tmp_path):
+    result, backend = _analyze(monkeypatch, tmp_path, 0.97)
+    assert result["confidence"] == "high"
+    assert result["inference"]["early_exit"] is True
+    assert result["inference"]["frames_used"] == 3
+    assert backend.embedded == 3
+
+
+def test_ambiguous_verdict_uses_every_sampled_frame(monkeypatch, tmp_path):
+    result, backend = _analyze(monkeypatch, tmp_path, 0.55)
+    assert result["inference"]["early_exit"] is False
+    # 4 seconds sampled at 3 fps
+    assert result["inference"]["frames_used"] == 12
+    assert backend.embedded == 12
+
+
+def test_fast_screen_without_keyframes_samples_uniformly(monkeypatch, tmp_path):
+    from services import preprocessing
+
+    monkeypatch.setattr(analyzer, '_backend_instance', _FixedBackend(0.9))
+    monkeypatch.setitem(analyzer.CONFIG, 'batching_enabled', False)
+    monkeypatch.setitem(analyzer.CONFIG, 'face_crop_enabled', False)
+    monkeypatch.setattr(preprocessing, '_ffmpeg_available', False)
+    response = analyzer.analyze_video(_write_video(tmp_path / "clip.mp4"), fast=True)
+
+    inference = response["result"]["inference"]
+    assert inference["fast_screen"] is True
+    assert inference["sampling"] == "uniform"
+    assert inference["frames_used"] == 12
+
+
+def test_cache_namespace_does_not_load_the_model(tmp_path, monkeypatch):
+    def no_model():
+        raise AssertionError("the namespace must not load the model")
+
+    weights = tmp_path / "model.pth"
+    weights.write_bytes(b"weights")
+    monkeypatch.setattr(analyzer, '_weights_path', lambda: str(weights))
+    monkeypatch.setattr(analyzer, 'get_model', no_model)
+    monkeypatch.setattr(analyzer, 'get_backend', no_model)
+    monkeypatch.setattr(analyzer, '_cache_namespace', None)
+    monkeypatch.setitem(analyzer.CONFIG, 'inference_backend', 'onnx')
+    monkeypatch.setitem(analyzer.CONFIG, 'onnx_path', str(tmp_path / "missing.onnx"))
+
+    # A missing export runs as eager, and is cached as such
+    assert "-eager-" in analyzer.get_cache_namespace()
+
+
+def test_cache_namespace_includes_the_served_export(tmp_path, monkeypatch):
+    weights = tmp_path / "model.pth"
+    weights.write_bytes(b"weights")
+    export = tmp_path / "model.onnx"
+    export.write_bytes(b"export v1")
+    monkeypatch.setattr(analyzer, '_weights_path', lambda: str(weights))
+    monkeypatch.setitem(analyzer.CONFIG, 'inference_backend', 'onnx')
+    monkeypatch.setitem(analyzer.CONFIG, 'onnx_path', str(export))
+
+    monkeypatch.setattr(analyzer, '_cache_namespace', None)
+    before = analyzer.get_cache_namespace()
+    assert "-onnx." in before
+
+    # Re-exported from the same checkpoint
+    export.write_bytes(b"export v2")
+    monkeypatch.setattr(analyzer, '_cache_namespace', None)
+    assert analyzer.get_cache_namespace() != before
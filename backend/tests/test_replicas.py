@@ -0,0 +1,36 @@
+import sys
+import os
+import time
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services.replicas import ReplicaPool, plan_core_sets
+
+
+def _slow_pid():
+    # Long enough that every task is submitted before the first one finishes
+    time.sleep(0.5)
+    return os.getpid()
+
+
+def test_core_sets_are_disjoint_and_cover_the_host():
+    assert plan_core_sets(4, cores=range(8)) == [[0, 1], [2, 3], [4, 5], [6, 7]]
+    assert plan_core_sets(2, threads_per_replica=3, cores=range(8)) == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_tasks_are_routed_to_the_least_loaded_replica():
+    pool = ReplicaPool(replicas=2, max_queue=2, cores=[0, 0])
+    try:
+        futures = []
+        for _ in range(4):
+            assert pool.try_acquire()
+            futures.append(pool.submit(_slow_pid))
+        pids = [future.result(timeout=60) for future in futures]
+
+        # Two replica processes, each serving half of the tasks
+        assert len(set(pids)) == 2
+        assert [replica['served'] for replica in pool.stats()['replicas']] == [2, 2]
+        assert pool.stats()['in_flight'] == 0
+    finally:
+        pool.shutdown()
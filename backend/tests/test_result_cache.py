@@ -0,0 +1,73 @@
+import sys
+import os
+import tempfile
+from concurrent.futures import Future
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services.result_cache import ResultCache
+
+
+def _result(label):
+    return {"status": "completed", "result": {"label": label}}
+
+
+def test_lru_eviction_and_disk_tier():
+    with tempfile.TemporaryDirectory() as disk_dir:
+        cache = ResultCache(max_entries=2, disk_dir=disk_dir)
+        cache.put("a", _result("a"))
+        cache.put("b", _result("b"))
+        assert cache.get("a")["result"]["label"] == "a"
+        cache.put("c", _result("c"))  # evicts "b" from memory
+
+        stats = cache.stats()
+        assert stats['entries'] == 2
+        assert stats['evictions'] == 1
+
+        # Still served from disk, then promoted back into memory
+        assert cache.get("b")["result"]["label"] == "b"
+        assert cache.stats()['disk_hits'] == 1
+        assert cache.get("missing") is None
+        assert cache.stats()['misses'] == 1
+
+
+def test_coalesce_shares_one_computation():
+    cache = ResultCache(max_entries=4)
+    started = []
+
+    def start():
+        future = Future()
+        started.append(future)
+        return future
+
+    first, owner = cache.coalesce("key", start)
+    second, follower = cache.coalesce("key", start)
+    assert owner and not follower
+    assert first is second
+    assert len(started) == 1
+
+    first.set_result(_result("fake"))
+    assert cache.get("key")["result"]["label"] == "fake"
+    assert cache.stats()['coalesced'] == 1
+    assert cache.stats()['in_flight'] == 0
+
+
+def test_finished_computation_is_cached_before_leaving_in_flight():
+    cache = ResultCache(max_entries=4)
+    future = Future()
+    cache.coalesce("k", lambda: future)
+
+    # An identical request arriving while the result is being stored must see
+    # either the cached result or the in-flight future
+    seen = []
+    original = cache._remember
+    def remember(key, result):
+        original(key, result)
+        seen.append("k" in cache._in_flight)
+    cache._remember = remember
+
+    future.set_result(_result("x"))
+    assert seen == [True]
+    assert cache.get("k") == _result("x")
+    assert cache.stats()['in_flight'] == 0
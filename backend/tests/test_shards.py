@@ -0,0 +1,108 @@
+import sys
+import os
+import pickle
+import pytest
+import numpy as np
+import torch
+from PIL import Image
+from torchvision import transforms
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services.dataset import DeepFakeDataset
+from services import shards as shards_module
+from services.shards import ClipJitter, ShardDataset, pack_dataset
+
+
+def _make_video(root, class_name, name, frames):
+    folder = os.path.join(root, class_name, name)
+    os.makedirs(folder, exist_ok=True)
+    rng = np.random.default_rng(len(name) + frames)
+    for i in range(frames):
+        pixels = rng.integers(0, 256, size=(24, 24, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(os.path.join(folder, f"frame_{i}.png"))
+
+
+def test_shard_clips_match_jpeg_pipeline(tmp_path):
+    root, shard_dir = str(tmp_path / "data"), str(tmp_path / "shards")
+    _make_video(root, 'real', 'a', 7)
+    _make_video(root, 'fake', 'bb', 5)
+    _make_video(root, 'fake', 'short', 1)
+
+    # A tiny shard size puts every video in its own shard
+    assert pack_dataset(root, shard_dir, frame_size=16, shard_frames=4) == 13
+    assert sorted(f for f in os.listdir(shard_dir) if f.startswith('shard_')) == [
+        'shard_00000.npy', 'shard_00001.npy', 'shard_00002.npy']
+
+    val_transform = transforms.Compose([
+        transforms.Resize((16, 16)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+    ])
+    folders = DeepFakeDataset(root, seq_len=3, transform=val_transform, mode='val')
+    shards = ShardDataset(shard_dir, seq_len=3, mode='val')
+
+    assert len(shards) == len(folders) == 2
+    for i in range(len(shards)):
+        clip, label = shards[i]
+        expected, expected_label = folders[i]
+        assert clip.shape == expected.shape == (3, 3, 16, 16)
+        assert label.item() == expected_label.item()
+        assert torch.allclose(clip, expected, atol=1e-4)
+
+    # Workers map the shards themselves
+    assert shards._shards
+    copy = pickle.loads(pickle.dumps(shards))
+    assert copy._shards == {}
+    assert torch.equal(copy[0][0], shards[0][0])
+
+
+def test_clip_jitter_keeps_uint8_clips():
+    clip = torch.full((4, 8, 8, 3), 128, dtype=torch.uint8)
+    clip[:, :, :4] = 20
+
+    out = ClipJitter(flip=1.0, brightness=0, contrast=0)(clip)
+    assert out.dtype == torch.uint8 and out.shape == clip.shape
+    assert torch.equal(out, clip.flip(2))
+
+    out = ClipJitter(flip=0, brightness=0.1, contrast=0.1)(clip)
+    assert (out.float() - clip.float()).abs().max() <= 0.25 * 128
+
+
+def test_interrupted_repack_leaves_no_readable_pack(tmp_path, monkeypatch):
+    root, shard_dir = str(tmp_path / "data"), str(tmp_path / "shards")
+    _make_video(root, 'real', 'a', 4)
+    _make_video(root, 'fake', 'bb', 4)
+    pack_dataset(root, shard_dir, frame_size=8, shard_frames=4)
+    assert len(ShardDataset(shard_dir, seq_len=2)) == 2
+
+    calls = []
+    def failing(path, frame_size):
+        calls.append(path)
+        if len(calls) > 2:
+            raise KeyboardInterrupt
+        return np.zeros((frame_size, frame_size, 3), dtype=np.uint8)
+    monkeypatch.setattr(shards_module, '_load_frame', failing)
+    with pytest.raises(KeyboardInterrupt):
+        pack_dataset(root, shard_dir, frame_size=8, shard_frames=4)
+    with pytest.raises(FileNotFoundError):
+        ShardDataset(shard_dir, seq_len=2)
+    assert not [f for f in os.listdir(shard_dir) if f.endswith('.tmp.npy')]
+    monkeypatch.undo()
+
+    # A complete re-pack into fewer shards drops the old ones
+    pack_dataset(root, shard_dir, frame_size=8, shard_frames=64)
+    assert sorted(f for f in os.listdir(shard_dir) if f.startswith('shard_')) == ['shard_00000.npy']
+    assert len(ShardDataset(shard_dir, seq_len=2)) == 2
+
+
+def test_unreadable_frame_normalises_to_about_zero(tmp_path):
+    root, shard_dir = str(tmp_path / "data"), str(tmp_path / "shards")
+    _make_video(root, 'real', 'a', 2)
+    with open(os.path.join(root, 'real', 'a', 'frame_0.png'), 'wb') as f:
+        f.write(b"not an image")
+
+    pack_dataset(root, shard_dir, frame_size=8)
+    clip, _ = ShardDataset(shard_dir, seq_len=2, mode='val')[0]
+    assert clip[0].abs().max() < 0.02
@@ -0,0 +1,45 @@
+import sys
+import os
+import torch
+
+# Add backend to path to import services
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services.windowing import iter_windows, suspicious_segments, aggregate_windows
+
+
+def _timed(n):
+    # One sampled frame per second, feature = frame index
+    return ((float(i), torch.tensor([float(i)])) for i in range(n))
+
+
+def test_windows_overlap_and_cover_the_tail():
+    windows = list(iter_windows(_timed(11), window_size=4, stride=3, frame_seconds=1.0))
+    spans = [(start, end, features.view(-1).tolist()) for start, end, features in windows]
+    assert spans == [
+        (0.0, 4.0, [0, 1, 2, 3]),
+        (3.0, 7.0, [3, 4, 5, 6]),
+        (6.0, 10.0, [6, 7, 8, 9]),
+        (7.0, 11.0, [7, 8, 9, 10]),  # tail window
+    ]
+
+
+def test_short_video_gets_one_partial_window():
+    windows = list(iter_windows(_timed(2), window_size=4, stride=2, frame_seconds=1.0))
+    assert len(windows) == 1
+    assert windows[0][2].size(0) == 2
+
+
+def test_suspicious_windows_merge_into_segments():
+    windows = [
+        {"start": 0.0, "end": 10.0, "probability": 0.1},
+        {"start": 5.0, "end": 15.0, "probability": 0.8},
+        {"start": 10.0, "end": 20.0, "probability": 0.9},
+        {"start": 15.0, "end": 25.0, "probability": 0.2},
+        {"start": 30.0, "end": 40.0, "probability": 0.7},
+    ]
+    assert suspicious_segments(windows, threshold=0.5) == [
+        {"start": 5.0, "end": 20.0, "max_probability": 0.9},
+        {"start": 30.0, "end": 40.0, "max_probability": 0.7},
+    ]
+    assert aggregate_windows(windows, 'max') == 0.9
@@ -5,6 +5,9 @@ export interface AnalysisResult {
         label: string;
         probability: number;
         confidence: string;
+        // Only in windowed analysis mode (times in seconds)
+        windows?: { start: number; end: number; probability: number }[];
+        segments?: { start: number; end: number; max_probability: number }[];
         steps?: {
             id: number;
             status: 'completed' | 'skipped' | 'failed';
@@ -42,3 +45,64 @@ export async function analyzeVideo(file: File): Promise<AnalysisResult> {
         };
     }
 }
+
+export type StepStatus = 'pending' | 'running' | 'completed' | 'skipped' | 'failed';
+
+export interface Job {
+    id: string;
+    filename: string;
+    status: 'queued' | 'running' | 'completed' | 'failed';
+    steps: {
+        id: number;
+        status: StepStatus;
+    }[];
+    result?: AnalysisResult['result'] | null;
+    error?: string | null;
+}
+
+export async function submitJobs(files: File[]): Promise<Pick<Job, 'id' | 'filename' | 'status'>[]> {
+    const formData = new FormData();
+    files.forEach((file) => formData.append('files', file));
+
+    const response = await fetch('http://localhost:8000/jobs', {
+        method: 'POST',
+        body: formData,
+    });
+
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.detail || `Upload failed with status ${response.status}`);
+    }
+
+    const data = await response.json();
+    return data.jobs;
+}
+
+export async function getJob(id: string): Promise<Job> {
+    const response = await fetch(`http://localhost:8000/jobs/${id}`);
+
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.detail || `Request failed with status ${response.status}`);
+    }
+
+    return (await response.json()) as Job;
+}
+
+// Streams job snapshots until the job completes or fails. Returns a function that closes the stream.
+export function watchJob(id: string, onUpdate: (job: Job) => void, onError?: (error: Event) => void): () => void {
+    const source = new EventSource(`http://localhost:8000/jobs/${id}/events`);
+
+    const handle = (event: MessageEvent) => onUpdate(JSON.parse(event.data) as Job);
+    source.addEventListener('progress', handle);
+    source.addEventListener('result', (event) => {
+        handle(event as MessageEvent);
+        source.close();
+    });
+    source.onerror = (event) => {
+        source.close();
+        onError?.(event);
+    };
+
+    return () => source.close();
+}